@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_neighbor_list.py - benchmark of cutoff-based IFIE extraction (dense matrix vs neighbor list)
+"""
+
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mods.PairMatrix import PairMatrix
+from mods.NeighborList import NeighborList
+from mods.geometry_func import min_distance_pairs
+
+
+
+# =============== function =============== #
+def make_system(n_fragment, n_atom_fragment, seed):
+	"""
+	function to make synthetic system (fragments on cubic lattice with 5 angstrom spacing)
+
+	Args:
+		n_fragment (int): number of fragments
+		n_atom_fragment (int): number of atoms per fragment
+		seed (int): random seed
+
+	Returns:
+		list: [coordinates (ndarray), atom_fragment (ndarray), IFIE (PairMatrix), packed distances of fragment centers (ndarray)]
+	"""
+	rng = np.random.default_rng(seed)
+	n_side = int(np.ceil(n_fragment ** (1 / 3)))
+	grid = np.stack(np.meshgrid(*[np.arange(n_side)] * 3, indexing="ij"), axis=-1).reshape(-1, 3)[:n_fragment] * 5.0
+	coordinates = (grid[:, np.newaxis, :] + rng.uniform(-1.5, 1.5, (n_fragment, n_atom_fragment, 3))).reshape(-1, 3)
+	atom_fragment = np.repeat(np.arange(n_fragment), n_atom_fragment)
+
+	IFIE = PairMatrix(n_fragment, ["HF-ES", "MP2-IFIE"], dtype="float32")
+	IFIE.values[:] = rng.standard_normal(IFIE.values.shape, dtype=np.float32)
+
+	# 距離セクションの代わり (フラグメント中心間距離)
+	distances = np.zeros(IFIE.n_pair)
+	for i in range(1, n_fragment):
+		start = i * (i - 1) // 2
+		distances[start : start + i] = np.sqrt(((grid[:i] - grid[i]) ** 2).sum(axis=1))
+	return [coordinates, atom_fragment, IFIE, distances]
+
+
+def bench_dense(IFIE, distances, cutoff, block_size=1 << 20):
+	"""
+	function to extract pairs within cutoff by expanding dense row blocks and filtering them
+
+	Returns:
+		float: sum of extracted energies
+	"""
+	store = PairMatrix(IFIE.n_fragment, ["distance"])
+	store.values[0] = distances
+	n_row = max(1, block_size // IFIE.n_fragment)
+	total = 0.0
+	for start in range(0, IFIE.n_fragment, n_row):
+		rows = np.arange(start, min(start + n_row, IFIE.n_fragment))
+		energy = IFIE.expand(["HF-ES", "MP2-IFIE"], 627.509468804, rows)
+		distance = store.expand("distance", 1.0, rows)
+		flag = (distance <= cutoff) & (rows[:, np.newaxis] < np.arange(IFIE.n_fragment)[np.newaxis, :])
+		total += energy[flag].sum()
+	return total
+
+
+def bench_neighbor(IFIE, distances, cutoff):
+	"""
+	function to extract pairs within cutoff by neighbor list
+
+	Returns:
+		float: sum of extracted energies
+	"""
+	neighbor_list = NeighborList.from_packed(IFIE.n_fragment, distances, cutoff)
+	return IFIE.sum_pairs(["HF-ES", "MP2-IFIE"], 627.509468804, neighbor_list.rows, neighbor_list.cols).sum()
+
+
+def measure(func, *args):
+	time_start = time.perf_counter()
+	result = func(*args)
+	return [result, time.perf_counter() - time_start]
+
+
+
+# =============== main =============== #
+if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description="benchmark of cutoff-based IFIE extraction", formatter_class=argparse.RawTextHelpFormatter)
+	parser.add_argument("-n", dest="N_FRAGMENT", metavar="N", type=int, default=10000, help="number of fragments (Default: 10000)")
+	parser.add_argument("-a", dest="N_ATOM", metavar="N", type=int, default=15, help="number of atoms per fragment (Default: 15)")
+	parser.add_argument("-r", dest="CUTOFF", metavar="R", type=float, default=8.0, help="cutoff distance (angstrom) (Default: 8.0)")
+	parser.add_argument("--seed", dest="SEED", type=int, default=1, help="random seed (Default: 1)")
+	args = parser.parse_args()
+
+	(coordinates, atom_fragment, IFIE, distances), time_make = measure(make_system, args.N_FRAGMENT, args.N_ATOM, args.SEED)
+	sys.stdout.write("system: {0} fragments, {1} atoms, {2} pairs ({3:.1f} s to build)\n".format(args.N_FRAGMENT, len(coordinates), IFIE.n_pair, time_make))
+
+	total_dense, time_dense = measure(bench_dense, IFIE, distances, args.CUTOFF)
+	total_neighbor, time_neighbor = measure(bench_neighbor, IFIE, distances, args.CUTOFF)
+	pairs, time_cell = measure(min_distance_pairs, coordinates, atom_fragment, args.CUTOFF)
+
+	sys.stdout.write("dense row blocks + filter   : {0:8.3f} s\n".format(time_dense))
+	sys.stdout.write("neighbor list (distance)    : {0:8.3f} s ({1:.1f}x)\n".format(time_neighbor, time_dense / time_neighbor))
+	sys.stdout.write("neighbor list (coordinates) : {0:8.3f} s ({1} pairs within {2} angstrom)\n".format(time_cell, len(pairs[0]), args.CUTOFF))
+	if not np.isclose(total_dense, total_neighbor):
+		sys.stderr.write("ERROR: results are not matched ({0} / {1}).\n".format(total_dense, total_neighbor))
+		sys.exit(1)
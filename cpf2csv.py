@@ -5,20 +5,18 @@
 cpf2csv.py
 """
 
-import sys, signal
-signal.signal(signal.SIGINT, signal.SIG_DFL)
-
-import argparse
+import sys
 import os
 import csv
+import time
 
 from mods.basic_func import *
-from mods.FileLogABINITMP import FileLogABINITMP
-from mods.FileCpf import FileCpf
+from mods.CompressedWriter import get_compressed_path
 
 
 
 # =============== constant =============== #
+__version__ = "12.0"
 OUTPUT_SUFFIX = [
 	"_Total.csv",
 	"_HF.csv",
@@ -29,7 +27,13 @@ OUTPUT_SUFFIX = [
 	"_DI.csv",
 	"_q.csv",
 	"_partial_charge.csv",
-	"_min_dist.csv"
+	"_min_dist.csv",
+	"_summary.csv",
+	"_residue_charge.csv",
+	"_trimer.csv",
+	"_tetramer.csv",
+	"_many_body_pair.csv",
+	"_many_body_fragment.csv"
 ]
 OUTPUT_NAME = [
 	["Total", "Total energy"],
@@ -41,18 +45,748 @@ OUTPUT_NAME = [
 	["DI", "Dispersion force energy"],
 	["Q", "Transfer charge"],
 	["P", "Particle charge"],
-	["M", "Minimum distance"]
+	["M", "Minimum distance"],
+	["S", "Summary"],
+	["R", "Residue charge"],
+	["T3", "Trimer terms"],
+	["T4", "Tetramer terms"],
+	["MP", "Many-body correction per pair"],
+	["MF", "Many-body correction per fragment"]
 ]
+OUTPUT_TYPES = [v[0] for v in OUTPUT_NAME]
+OUTPUT_TYPES_LOG = ["Total", "HF", "CR", "ES", "EX", "CT", "DI", "Q", "P", "M"]
+OUTPUT_TYPES_CPF = ["Total", "ES", "EX", "CT", "DI", "Q", "P", "M"]
+MATRIX_TYPES = ["Total", "HF", "CR", "ES", "EX", "CT", "DI", "Q", "M"]
 
 
 
-# =============== main =============== #
-if __name__ == '__main__':
+# =============== function =============== #
+def load(input_file, dtype="float64", memmap_dir=None, n_process=1, metrics=None, input_type=None):
+	"""
+	function to load ABINIT-MP output file (readers are imported on demand)
+
+	Args:
+		input_file (str or file): .log, .out or .cpf file for ABINIT-MP, `-` (standard input) or binary file object (e.g. pipe; read in one forward pass; type is detected from contents)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (regular files only) (Default: 1)
+		metrics (RunMetrics, optional): record input and reading time (Default: None)
+		input_type (str, optional): `cpf`, `log` or type registered by `mods.input_func.register_reader()` (Default: None (sniff the head of input, then extension))
+
+	Returns:
+		FMOReader: FileCpf, FileLogABINITMP or registered reader
+	"""
+	from mods.input_func import open_reader, get_input_path
+
+	time_start = time.perf_counter()
+	input_type, data_FMO = open_reader(input_file, input_type, dtype, memmap_dir, n_process)
+	if metrics is not None:
+		metrics.add_stage("read", time.perf_counter() - time_start)
+		metrics.set_input(get_input_path(input_file), data_FMO, input_type)
+	return data_FMO
+
+
+def get_output_range(data_FMO, include=None, exclude=None):
+	"""
+	function to determine fragment labels for output
+
+	Args:
+		data_FMO (FileCpf or FileLogABINITMP): loaded data
+		include (list, optional): fragment labels to include (Default: None)
+		exclude (list, optional): fragment labels to exclude (Default: None)
+
+	Returns:
+		list: fragment labels
+	"""
+	if include is None and exclude is None:
+		# 未指定の場合
+		return data_FMO.get_label()
+
+	elif include is not None:
+		# include で指定の場合
+		return [int(x) for x in include]
+
+	else:
+		# exclude で指定の場合
+		return list(set(data_FMO.get_label()) - set([int(x) for x in exclude]))
+
+
+def get_output_path(prefix, output_type, output_format="csv", compression=None):
+	"""
+	function to get output file path
+
+	Args:
+		prefix (str): prefix for output
+		output_type (str): output type in `OUTPUT_TYPES`
+		output_format (str, optional): `csv` or `tsv` (Default: "csv")
+		compression (str, optional): `gzip` or `xz` (Default: None)
+
+	Returns:
+		str
+	"""
+	return get_compressed_path(prefix + os.path.splitext(OUTPUT_SUFFIX[OUTPUT_TYPES.index(output_type)])[0] + "." + output_format, compression)
+
+
+def get_tile_path(prefix, output_type, output_format="csv", compression=None, row=None, col=None):
+	"""
+	function to get path of tile of matrix (`PREFIX_TYPE_tile_R_C.csv`) or index of tiles (`PREFIX_TYPE_tiles.json`)
+
+	Args:
+		prefix (str): prefix for output
+		output_type (str): output type in `MATRIX_TYPES`
+		output_format (str, optional): `csv` or `tsv` (Default: "csv")
+		compression (str, optional): `gzip` or `xz` (Default: None)
+		row (int, optional): 0-origin group of rows (Default: None (index of tiles))
+		col (int, optional): 0-origin group of columns (Default: None (index of tiles))
+
+	Returns:
+		str
+	"""
+	from mods.tile_func import TILE_INDEX_SUFFIX
+
+	stem = prefix + os.path.splitext(OUTPUT_SUFFIX[OUTPUT_TYPES.index(output_type)])[0]
+	if row is None:
+		return stem + TILE_INDEX_SUFFIX
+	return get_compressed_path(stem + "_tile_{0}_{1}.{2}".format(row + 1, col + 1, output_format), compression)
+
+
+def select_blocks(data_FMO, blocks):
+	"""
+	function to select IFIE / PIEDA blocks of .log for output
+
+	Args:
+		data_FMO (FileLogABINITMP): loaded data
+		blocks (list): block specifications (`TYPE[:N]`; TYPE is `HF-IFIE`, `MP2-IFIE` or `PIEDA`, N is 1-origin occurrence and negative N counts from the end)
+
+	Returns:
+		None
+	"""
+	if not hasattr(data_FMO, "select_block"):
+		sys.stderr.write("ERROR: block selection is only available for .log.\n")
+		sys.exit(1)
+
+	for block in blocks:
+		block_type, _, occurrence = block.partition(":")
+		try:
+			occurrence = int(occurrence) if occurrence != "" else -1
+		except ValueError:
+			sys.stderr.write("ERROR: invalid block specification ({0}).\n".format(block))
+			sys.exit(1)
+		data_FMO.select_block(block_type, occurrence)
+
+
+def convert(input_data, outputs=None, selection=None, prefix=None, overwrite=True, dtype="float64", digit=4, output_format="csv", blocks=None, cutoff=None, memmap_dir=None, n_process=1, incremental=False, compression=None, n_thread=1, charge_schemes=None, metrics=None, verbose=False, input_type=None, tile=None):
+	"""
+	function to convert ABINIT-MP output file to CSV files (outputs are written concurrently with `n_thread` > 1)
+
+	Args:
+		input_data (str or obj): input file path, or object returned by `load()`
+		outputs (list, optional): output types in `OUTPUT_TYPES` (Default: None (["Total"]))
+		selection (list, optional): fragment labels for output (Default: None (all fragments))
+		prefix (str, optional): prefix for output (Default: None (input file name without extension))
+		overwrite (bool, optional): overwrite existing files without prompt (Default: True)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		digit (int, optional): number of decimal places for matrices (Default: 4)
+		output_format (str, optional): `csv` or `tsv` (Default: "csv")
+		blocks (list, optional): IFIE / PIEDA blocks of .log for output (`TYPE[:N]`; see `select_blocks()`) (Default: None (last blocks))
+		cutoff (float, optional): output only fragment pairs within cutoff (Å) as list instead of matrix (Default: None (matrix))
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode; used for loading and for expanding matrices before output) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (Default: 1)
+		incremental (bool, optional): write only outputs that are not up to date according to the manifest (`PREFIX.manifest.json`), and skip loading when all outputs are up to date (Default: False)
+		compression (str, optional): `gzip` or `xz` to compress outputs (`.gz` / `.xz` is appended; blocks are compressed in parallel with `n_thread` > 1) (Default: None)
+		n_thread (int, optional): number of threads for writing and compressing outputs (Default: 1)
+		charge_schemes (list, optional): charge schemes (`HF_Mulliken`, `MP2_Mulliken`, `HF_NBO`, `MP2_NBO`, `HF_ESP` or `MP2_ESP`) for partial and residue charges (Default: None (HF Mulliken charge))
+		metrics (RunMetrics, optional): record input, reading and writing time of each output and outputs skipped as up to date (Default: None)
+		verbose (bool, optional): report created files to stderr (Default: False)
+		input_type (str, optional): registered input type for input file path (Default: None (detect))
+		tile (str or int, optional): write each matrix (`MATRIX_TYPES`) as tiles of fragment groups (`chain` or number of fragments per tile) to `PREFIX_TYPE_tile_R_C.csv` with index `PREFIX_TYPE_tiles.json` (Default: None (one file))
+
+	Returns:
+		list: created file paths
+	"""
+	import concurrent.futures
+	import numpy as np
+	from mods.output_func import write_matrix, write_pairs, write_terms, get_output_index, get_separator, check_digit, open_output
+	from mods.PairMatrix import create_array
+	from mods.summary_func import summarize_fragments, SUMMARY_CUTOFF
+	from mods.multimer_func import MULTIMER_COLUMNS, sum_multimer_pairs, sum_multimer_fragments, select_multimer_terms
+	from mods.tile_func import check_tile, get_tile_groups, create_tile_index, save_tile_index
+	from mods.input_func import is_regular_file
+
+	separator = get_separator(output_format)
+	check_digit(digit)
+	if outputs is None:
+		outputs = ["Total"]
+	for output_type in outputs:
+		if output_type not in OUTPUT_TYPES:
+			sys.stderr.write("ERROR: undefined output type ({0}).\n".format(output_type))
+			sys.exit(1)
+	if tile is not None:
+		tile = check_tile(tile)
+		if cutoff is not None:
+			sys.stderr.write("ERROR: tiles are only available for matrices (without cutoff).\n")
+			sys.exit(1)
+
+	def get_path(output_type):
+		# タイルに分割する行列は、タイルの索引を出力として扱う
+		if tile is not None and output_type in MATRIX_TYPES:
+			return get_tile_path(prefix, output_type)
+		return get_output_path(prefix, output_type, output_format, compression)
+
+	if isinstance(input_data, str):
+		input_file = input_data
+		if prefix is None:
+			prefix = os.path.splitext(os.path.basename(input_data))[0]
+	elif prefix is None:
+		sys.stderr.write("ERROR: prefix is required for loaded data.\n")
+		sys.exit(1)
+	else:
+		input_file = input_data.path
+
+	if metrics is not None and metrics.record["input"] is None:
+		# (--incremental で) 読み込まない場合もファイルの情報は記録する
+		metrics.set_input(input_file, None if isinstance(input_data, str) else input_data, input_type)
+
+	manifest = None
+	if incremental and not is_regular_file(input_file):
+		sys.stderr.write("ERROR: incremental update is only available for regular files ({0}).\n".format(input_file))
+		sys.exit(1)
+	if incremental:
+		# 入力と出力に影響するオプションが前回と同じで、前回から変更されていない出力は作成しない
+		from mods.manifest_func import get_manifest_path, get_file_signature, load_manifest, save_manifest, is_current, record_output
+		manifest_file = get_manifest_path(prefix)
+		manifest = load_manifest(manifest_file)
+		input_signature = get_file_signature(input_file, manifest["input"])
+		if metrics is not None and manifest["input"] is not None and manifest["input"].get("mtime_ns") == input_signature["mtime_ns"] and manifest["input"].get("size") == input_signature["size"]:
+			# 入力のハッシュを再計算しなかった場合
+			metrics.count("input_hash_reused")
+		options = {
+			"version": __version__,
+			"selection": None if selection is None else [int(v) for v in selection],
+			"dtype": str(dtype) if isinstance(input_data, str) else str(input_data.dtype),
+			"digit": digit,
+			"format": output_format,
+			"blocks": blocks,
+			"cutoff": cutoff,
+			"charge": charge_schemes,
+			"tile": tile,
+		}
+		stale = [output_type for output_type in outputs if not is_current(manifest, input_signature, get_path(output_type), options)]
+		for output_type in outputs:
+			if output_type not in stale:
+				output = get_path(output_type)
+				if verbose:
+					sys.stderr.write("up to date: {0}\n".format(output))
+				if metrics is not None:
+					metrics.add_output(output, output_type, cached=True)
+					metrics.count("cache_hits")
+		outputs = stale
+		if len(outputs) == 0:
+			return []
+
+	data_FMO = input_data
+	if isinstance(input_data, str):
+		data_FMO = load(input_data, dtype, memmap_dir, n_process, metrics, input_type)
+	if memmap_dir is None:
+		memmap_dir = getattr(data_FMO, "memmap_dir", None)
+
+	if blocks is not None:
+		select_blocks(data_FMO, blocks)
+
+	if selection is None:
+		selection = data_FMO.get_label()
+	labels = data_FMO.get_label()
+	index = get_output_index(labels, selection)
+	neighbor_list = None
+	if cutoff is not None:
+		neighbor_list = data_FMO.get_neighbor_list(cutoff).select(index)
+	all_labels = labels
+	labels = [labels[i] for i in index]
+	selected = np.zeros(len(all_labels), dtype=bool)
+	selected[index] = True
+
+	multimer_terms = None
+	if any(output_type in ["MP", "MF"] for output_type in outputs):
+		# トリマー・テトラマーの項 (ペアとフラグメントごとの和で共有する)
+		multimer_terms = [data_FMO.get_multimer_terms(section) for section in ["trimer", "tetramer"]]
+	multimer_header = ["{0} {1}".format(order, column) for order in ["Trimer", "Tetramer"] for column in MULTIMER_COLUMNS]
+
+	# 電荷の出力は、ファイルを開く前に電荷の種類と単位を確認する
+	if "P" in outputs:
+		data_FMO.check_charge("atom", charge_schemes)
+	if "R" in outputs:
+		data_FMO.check_charge("residue", charge_schemes)
+
+	tile_groups = None
+	if tile is not None:
+		# タイルの行・列のフラグメントのグループ
+		tile_groups = get_tile_groups(data_FMO, index, tile)
+
+	# 上書きの確認は書き込みを始める前にまとめて行う
+	tasks = []
+	for output_type, output_name in OUTPUT_NAME:
+		if output_type not in outputs:
+			continue
+		output = get_path(output_type)
+		if overwrite == False:
+			check_overwrite(output)
+			if tile_groups is not None and output_type in MATRIX_TYPES:
+				for row in range(len(tile_groups)):
+					for col in range(len(tile_groups)):
+						check_overwrite(get_tile_path(prefix, output_type, output_format, compression, row, col))
+		tasks.append([output_type, output_name, output])
+
+	def write_tile(task):
+		# 1 つのタイル (行のグループ × 列のグループ) をパック配列から直接展開して書き込む
+		output_type, row, col = task
+		rows = index[tile_groups[row][1]]
+		cols = index[tile_groups[col][1]]
+		output = get_tile_path(prefix, output_type, output_format, compression, row, col)
+		with open_output(output, compression, executor_compress) as obj_output:
+			if output_type == "M":
+				get_block = lambda block_rows: data_FMO.get_min_distance_matrix(block_rows, cols)
+			else:
+				get_block = lambda block_rows: data_FMO.get_energy_matrix(output_type, block_rows, cols)
+			write_matrix(obj_output, [all_labels[i] for i in rows], rows, get_block, digit, separator, col_labels=[all_labels[i] for i in cols])
+		return [(row, col), os.path.basename(output)]
+
+	def write_output(task):
+		output_type, output_name, output = task
+		time_start = time.perf_counter()
+		if tile_groups is not None and output_type in MATRIX_TYPES:
+			# タイルは並列に書き込み、すべて書き終えてから索引を書き込む
+			tile_tasks = [[output_type, row, col] for row in range(len(tile_groups)) for col in range(len(tile_groups))]
+			tile_files = dict(executor_tile.map(write_tile, tile_tasks))
+			save_tile_index(output, create_tile_index(output_type, output_name, tile, labels, tile_groups, tile_files))
+			if metrics is not None:
+				metrics.add_output(output, output_type, time.perf_counter() - time_start)
+			return "{0}; {1} tiles".format(output_name, len(tile_files))
+
+		with open_output(output, compression, executor_compress) as obj_output:
+			if output_type == "P":
+				csv_writer = csv.writer(obj_output, delimiter=separator, lineterminator="\n")
+				csv_writer.writerows(data_FMO.output_charge(selection, charge_schemes))
+				output_name = "partial charge"
+
+			elif output_type == "R":
+				columns, values = data_FMO.get_charge_table("residue", charge_schemes, index)
+				if charge_schemes is None:
+					header = ["Chain", "Residue number", "Residue name", "Residue charge"]
+				else:
+					header = ["Chain", "Residue number", "Residue name"] + ["Residue charge ({0})".format(scheme) for scheme in charge_schemes]
+				csv_writer = csv.writer(obj_output, delimiter=separator, lineterminator="\n")
+				csv_writer.writerow(header)
+				csv_writer.writerows(zip(*[v.tolist() for v in values]))
+				output_name = "residue charge"
+
+			elif output_type == "S":
+				header, rows = summarize_fragments(data_FMO, index, SUMMARY_CUTOFF if cutoff is None else cutoff)
+				csv_writer = csv.writer(obj_output, delimiter=separator, lineterminator="\n")
+				csv_writer.writerow(header)
+				csv_writer.writerows([[round(v, digit) if isinstance(v, float) else v for v in row] for row in rows])
+				output_name = "summary"
+
+			elif output_type in ["T3", "T4"]:
+				# 選択したフラグメントを 1 つ以上含む項
+				section = "trimer" if output_type == "T3" else "tetramer"
+				terms, energies = data_FMO.get_multimer_terms(section)
+				term_idx = select_multimer_terms(terms, selected)
+				header = ["Fragment {0}".format(v) for v in "IJKL"[:terms.shape[1]]] + MULTIMER_COLUMNS
+				write_terms(obj_output, header, all_labels, terms[term_idx], lambda start, end: energies[term_idx[start:end]], digit, separator)
+				output_name = "{0} terms".format(section)
+
+			elif output_type == "MP":
+				# 選択したフラグメント間のペア (項に含まれるペアのみ)
+				rows, cols, sums = sum_multimer_pairs(multimer_terms)
+				pair_idx = np.flatnonzero(selected[rows] & selected[cols])
+				write_terms(obj_output, ["Fragment I", "Fragment J"] + multimer_header, all_labels, np.column_stack([rows[pair_idx], cols[pair_idx]]), lambda start, end: sums[pair_idx[start:end]], digit, separator)
+				output_name = "many-body correction per pair"
+
+			elif output_type == "MF":
+				sums = sum_multimer_fragments(multimer_terms, len(all_labels))
+				write_terms(obj_output, ["Fragment"] + multimer_header, all_labels, index[:, np.newaxis], lambda start, end: sums[index[start:end]], digit, separator)
+				output_name = "many-body correction per fragment"
+
+			elif output_type == "M":
+				if neighbor_list is None and memmap_dir is not None:
+					# ディスク上に行列全体を展開してから行ごとに読む
+					dense = data_FMO.get_min_distance_dense(create_array((len(all_labels), len(all_labels)), memmap_dir=memmap_dir))
+					write_matrix(obj_output, labels, index, lambda rows: dense[rows][:, index], digit, separator)
+					del dense
+				elif neighbor_list is None:
+					write_matrix(obj_output, labels, index, lambda rows: data_FMO.get_min_distance_matrix(rows, index), digit, separator)
+				else:
+					write_pairs(obj_output, ["Fragment I", "Fragment J", output_name], all_labels, neighbor_list.rows, neighbor_list.cols, lambda start, end: neighbor_list.distances[start:end], digit, separator)
+				output_name = "minimum distance"
+
+			elif neighbor_list is None and memmap_dir is not None:
+				# ディスク上に行列全体を展開してから行ごとに読む
+				dense = data_FMO.get_energy_dense(output_type, create_array((len(all_labels), len(all_labels)), memmap_dir=memmap_dir))
+				write_matrix(obj_output, labels, index, lambda rows: dense[rows][:, index], digit, separator)
+				del dense
+
+			elif neighbor_list is None:
+				write_matrix(obj_output, labels, index, lambda rows: data_FMO.get_energy_matrix(output_type, rows, index), digit, separator)
+
+			else:
+				values = data_FMO.get_energy_pairs(output_type, neighbor_list)
+				write_pairs(obj_output, ["Fragment I", "Fragment J", output_name], all_labels, neighbor_list.rows, neighbor_list.cols, lambda start, end: values[start:end], digit, separator)
+		if metrics is not None:
+			metrics.add_output(output, output_type, time.perf_counter() - time_start)
+		return output_name
+
+	# 出力ごとにスレッドで書き込み (NumPy の変換・圧縮の間は GIL が解放される)、manifest は出力順に更新する
+	n_thread = max(1, n_thread or 1)
+	executor_compress = None
+	if compression is not None and n_thread > 1:
+		executor_compress = concurrent.futures.ThreadPoolExecutor(n_thread)
+	executor_tile = None
+	if tile_groups is not None:
+		executor_tile = concurrent.futures.ThreadPoolExecutor(n_thread)
+	# タイルに分割する場合は、タイルを並列に書き込む (出力は順に処理する)
+	executor = concurrent.futures.ThreadPoolExecutor(1 if tile_groups is not None else min(n_thread, max(1, len(tasks))))
+	list_output = []
+	time_start = time.perf_counter()
+	try:
+		for (output_type, _, output), output_name in zip(tasks, executor.map(write_output, tasks)):
+			if verbose:
+				sys.stderr.write("create: {0} ({1})\n".format(output, output_name))
+			list_output.append(output)
+			if manifest is not None:
+				# タイルは索引と一緒に記録する (タイルを変更・削除した場合も作り直す)
+				files = None
+				if tile_groups is not None and output_type in MATRIX_TYPES:
+					files = [get_tile_path(prefix, output_type, output_format, compression, row, col) for row in range(len(tile_groups)) for col in range(len(tile_groups))]
+				save_manifest(manifest_file, record_output(manifest, input_signature, output, options, files))
+	finally:
+		executor.shutdown()
+		if executor_compress is not None:
+			executor_compress.shutdown()
+		if executor_tile is not None:
+			executor_tile.shutdown()
+		if metrics is not None:
+			metrics.add_stage("write", time.perf_counter() - time_start)
+
+	return list_output
+
+
+def export_sqlite(input_data, output, selection=None, overwrite=True, dtype="float64", blocks=None, cutoff=None, memmap_dir=None, n_process=1, metrics=None, verbose=False, input_type=None):
+	"""
+	function to export fragments, atoms and fragment pair interactions of ABINIT-MP output file to SQLite database
+
+	Args:
+		input_data (str or obj): input file path, or object returned by `load()`
+		output (str): database file path
+		selection (list, optional): fragment labels for output (Default: None (all fragments))
+		overwrite (bool, optional): overwrite existing file without prompt (Default: True)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		blocks (list, optional): IFIE / PIEDA blocks of .log for output (`TYPE[:N]`; see `select_blocks()`) (Default: None (last blocks))
+		cutoff (float, optional): output only fragment pairs within cutoff (Å) (Default: None (all pairs))
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (Default: 1)
+		metrics (RunMetrics, optional): record input, reading and writing time and database (Default: None)
+		verbose (bool, optional): report created file to stderr (Default: False)
+		input_type (str, optional): registered input type for input file path (Default: None (detect))
+
+	Returns:
+		str: database file path
+	"""
+	from mods.output_func import get_output_index
+	from mods.sqlite_func import export_sqlite as export_database
+
+	data_FMO = input_data
+	if isinstance(input_data, str):
+		data_FMO = load(input_data, dtype, memmap_dir, n_process, metrics, input_type)
+	elif metrics is not None and metrics.record["input"] is None:
+		metrics.set_input(data_FMO.path, data_FMO)
+	if blocks is not None:
+		select_blocks(data_FMO, blocks)
+
+	index = None
+	if selection is not None:
+		index = get_output_index(data_FMO.get_label(), selection)
+	if overwrite == False:
+		check_overwrite(output)
+	time_start = time.perf_counter()
+	export_database(data_FMO, output, index, cutoff)
+	if metrics is not None:
+		metrics.add_stage("write", time.perf_counter() - time_start)
+		metrics.add_output(output, "sqlite", time.perf_counter() - time_start)
+	if verbose:
+		sys.stderr.write("create: {0} (SQLite database)\n".format(output))
+	return output
+
+
+def export_piedalog(input_data, fragments, prefix=None, overwrite=True, dtype="float64", memmap_dir=None, n_process=1, metrics=None, verbose=False, input_type=None):
+	"""
+	function to write piedalog-style reports (interactions of each target fragment with all other fragments) of .cpf to `PREFIX_piedalog_N.tsv`
+
+	Args:
+		input_data (str or obj): .cpf file path, or object returned by `load()`
+		fragments (list): target fragment numbers
+		prefix (str, optional): prefix for output (Default: None (basename of input))
+		overwrite (bool, optional): overwrite existing file without prompt (Default: True)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (Default: 1)
+		metrics (RunMetrics, optional): record input, reading and writing time and outputs (Default: None)
+		verbose (bool, optional): report created files to stderr (Default: False)
+		input_type (str, optional): registered input type for input file path (Default: None (detect))
+
+	Returns:
+		list: output file paths
+	"""
+	from mods.FileCpf import FileCpf
+
+	data_FMO = input_data
+	if isinstance(input_data, str):
+		data_FMO = load(input_data, dtype, memmap_dir, n_process, metrics, input_type)
+	elif metrics is not None and metrics.record["input"] is None:
+		metrics.set_input(data_FMO.path, data_FMO)
+	if not isinstance(data_FMO, FileCpf):
+		sys.stderr.write("ERROR: piedalog-style report is available only for .cpf.\n")
+		sys.exit(1)
+	if prefix is None:
+		prefix = os.path.splitext(os.path.basename(data_FMO.path))[0]
+
+	time_start = time.perf_counter()
+	list_output = data_FMO.write_piedalog_reports(fragments, prefix, overwrite)
+	if metrics is not None:
+		metrics.add_stage("write", time.perf_counter() - time_start)
+		for output in list_output:
+			metrics.add_output(output, "piedalog")
+	if verbose:
+		for output in list_output:
+			sys.stderr.write("create: {0} (piedalog)\n".format(output))
+	return list_output
+
+
+def convert_diff(input_first, input_second, outputs=None, selection=None, prefix=None, overwrite=True, dtype="float64", digit=4, output_format="csv", memmap_dir=None, n_process=1, compression=None, metrics=None, verbose=False, input_type=None):
+	"""
+	function to write differential IFIE (second - first) of two .cpf files as matrices over fragments aligned by (chain, residue number, residue name)
+	(`PREFIX_diff_TYPE.csv`; fragments of both systems and their alignment are written to `PREFIX_diff_fragments.csv`)
+
+	Args:
+		input_first (str or obj): first (reference) .cpf file path, or object returned by `load()`
+		input_second (str or obj): second .cpf file path, or object returned by `load()`
+		outputs (list, optional): energy types (`Total`, `ES`, `EX`, `CT`, `DI` or `Q`) (Default: None (["Total"]))
+		selection (list, optional): fragment labels of the first system for output (Default: None (all fragments))
+		prefix (str, optional): prefix for output (Default: None (first input file name without extension))
+		overwrite (bool, optional): overwrite existing files without prompt (Default: True)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		digit (int, optional): number of decimal places for matrices (Default: 4)
+		output_format (str, optional): `csv` or `tsv` (Default: "csv")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (Default: 1)
+		compression (str, optional): `gzip` or `xz` to compress outputs (Default: None)
+		metrics (RunMetrics, optional): record input, reading and writing time and outputs (Default: None)
+		verbose (bool, optional): report created files and unmatched fragments to stderr (Default: False)
+		input_type (str, optional): registered input type for input file paths (both inputs) (Default: None (detect))
+
+	Returns:
+		list: created file paths
+	"""
+	import numpy as np
+	from mods.output_func import write_matrix, get_output_index, get_separator, check_digit, open_output
+	from mods.diff_func import align_fragments, diff_energy_matrix, check_diff_types, format_key
+
+	separator = get_separator(output_format)
+	check_digit(digit)
+	if outputs is None:
+		outputs = ["Total"]
+	list_data = []
+	for input_data in [input_first, input_second]:
+		data_FMO = input_data
+		if isinstance(input_data, str):
+			data_FMO = load(input_data, dtype, memmap_dir, n_process, metrics if len(list_data) == 0 else None, input_type)
+		list_data.append(data_FMO)
+	data_first, data_second = list_data
+	check_diff_types(data_first, data_second, outputs)
+	if prefix is None:
+		prefix = os.path.splitext(os.path.basename(data_first.path))[0]
+
+	index = None
+	if selection is not None:
+		index = get_output_index(data_first.get_label(), selection)
+	alignment = align_fragments(data_first, data_second, index)
+	labels = [format_key(key) for key in alignment["keys"]]
+	if verbose:
+		sys.stderr.write("aligned: {0} fragments (only in {1}: {2}, only in {3}: {4})\n".format(len(labels), data_first.path, len(alignment["first_only"]), data_second.path, len(alignment["second_only"])))
+
+	tasks = [[output_type, get_output_path(prefix + "_diff", output_type, output_format, compression)] for output_type in OUTPUT_TYPES if output_type in outputs]
+	output_fragments = get_compressed_path(prefix + "_diff_fragments." + output_format, compression)
+	if overwrite == False:
+		for _, output in tasks:
+			check_overwrite(output)
+		check_overwrite(output_fragments)
+
+	list_output = []
+	for output_type, output in tasks:
+		time_start = time.perf_counter()
+		with open_output(output, compression) as obj_output:
+			write_matrix(obj_output, labels, np.arange(len(labels)), lambda rows: diff_energy_matrix(data_first, data_second, output_type, alignment["first"], alignment["second"], rows), digit, separator)
+		if metrics is not None:
+			metrics.add_output(output, "diff_" + output_type, time.perf_counter() - time_start)
+		if verbose:
+			sys.stderr.write("create: {0} (difference of {1})\n".format(output, OUTPUT_NAME[OUTPUT_TYPES.index(output_type)][1]))
+		list_output.append(output)
+
+	# 対応するフラグメントの表 (共通のフラグメントは 1 つめの系の順、続いて片方にのみあるフラグメント)
+	labels_first = data_first.get_label()
+	labels_second = data_second.get_label()
+	rows = [[format_key(key), labels_first[i], labels_second[j], "common"] for key, i, j in zip(alignment["keys"], alignment["first"].tolist(), alignment["second"].tolist())]
+	rows += [[format_key(alignment["keys_first"][i]), labels_first[i], "", "first only"] for i in alignment["first_only"].tolist()]
+	rows += [[format_key(alignment["keys_second"][j]), "", labels_second[j], "second only"] for j in alignment["second_only"].tolist()]
+	with open_output(output_fragments, compression) as obj_output:
+		csv_writer = csv.writer(obj_output, delimiter=separator, lineterminator="\n")
+		csv_writer.writerow(["Residue", "Fragment (first)", "Fragment (second)", "Status"])
+		csv_writer.writerows(rows)
+	if metrics is not None:
+		metrics.add_output(output_fragments, "diff_fragments")
+	if verbose:
+		sys.stderr.write("create: {0} (aligned fragments)\n".format(output_fragments))
+	list_output.append(output_fragments)
+	return list_output
+
+
+def export_components(input_data, components, selection=None, prefix=None, overwrite=True, dtype="float64", digit=4, output_format="csv", blocks=None, cutoff=None, memmap_dir=None, n_process=1, compression=None, metrics=None, verbose=False, input_type=None):
+	"""
+	function to write components of interaction (columns of IFIE section and their linear combinations) as matrices (`PREFIX_component_LABEL.csv`)
+	or as a list of fragment pairs within cutoff (`PREFIX_component.csv`) (all components are computed from one pass over the IFIE section)
+
+	Args:
+		input_data (str or obj): input file path, or object returned by `load()`
+		components (list): expressions of components (`[LABEL=]TERM[+TERM ...]`; TERM is `COLUMN`, `-COLUMN` or `COEFFICIENT*COLUMN`; e.g. `SCS-MP2-IFIE`, `BSSE=HF-IFIE-BSSE+MP2-IFIE-BSSE`)
+		selection (list, optional): fragment labels for output (Default: None (all fragments))
+		prefix (str, optional): prefix for output (Default: None (input file name without extension))
+		overwrite (bool, optional): overwrite existing files without prompt (Default: True)
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		digit (int, optional): number of decimal places for matrices (Default: 4)
+		output_format (str, optional): `csv` or `tsv` (Default: "csv")
+		blocks (list, optional): IFIE / PIEDA blocks of .log for output (`TYPE[:N]`; see `select_blocks()`) (Default: None (last blocks))
+		cutoff (float, optional): output only fragment pairs within cutoff (Å) as list instead of matrices (Default: None (matrices))
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (out-of-core mode) (Default: None (in memory))
+		n_process (int, optional): number of processes for decoding large sections of .cpf (Default: 1)
+		compression (str, optional): `gzip` or `xz` to compress outputs (Default: None)
+		metrics (RunMetrics, optional): record input, reading and writing time and outputs (Default: None)
+		verbose (bool, optional): report created files to stderr (Default: False)
+		input_type (str, optional): registered input type for input file path (Default: None (detect))
+
+	Returns:
+		list: created file paths
+	"""
+	import numpy as np
+	from mods.output_func import write_matrices, write_terms, get_output_index, get_separator, check_digit, open_output
+	from mods.component_func import get_component_weights, get_file_label
+
+	separator = get_separator(output_format)
+	check_digit(digit)
+	data_FMO = input_data
+	if isinstance(input_data, str):
+		data_FMO = load(input_data, dtype, memmap_dir, n_process, metrics, input_type)
+	if prefix is None:
+		prefix = os.path.splitext(os.path.basename(data_FMO.path))[0]
+	if blocks is not None:
+		select_blocks(data_FMO, blocks)
+
+	labels = data_FMO.get_label()
+	index = get_output_index(labels, selection if selection is not None else labels)
+	# 出力ファイルを開く前にすべての式を検証する (未定義のカラム、重複するラベル)
+	component_labels, _ = get_component_weights(components, data_FMO.get_component_names())
+
+	suffix = get_compressed_path("." + output_format, compression)
+	if cutoff is None:
+		list_output = [prefix + "_component_" + get_file_label(label) + suffix for label in component_labels]
+	else:
+		list_output = [prefix + "_component" + suffix]
+	if len(set(list_output)) != len(list_output):
+		sys.stderr.write("ERROR: labels of components are duplicated in file names ({0}).\n".format(", ".join(component_labels)))
+		sys.exit(1)
+	if overwrite == False:
+		for output in list_output:
+			check_overwrite(output)
+
+	time_start = time.perf_counter()
+	obj_outputs = [open_output(output, compression) for output in list_output]
+	try:
+		if cutoff is None:
+			# 行ブロックごとに全成分をまとめて展開し、それぞれのファイルに書き込む
+			write_matrices(obj_outputs, [labels[i] for i in index], index, lambda rows: data_FMO.get_component_matrices(components, rows, index)[1], digit, separator)
+		else:
+			neighbor_list = data_FMO.get_neighbor_list(cutoff).select(index)
+			_, values = data_FMO.get_component_pairs(components, neighbor_list)
+			pairs = np.column_stack([neighbor_list.rows, neighbor_list.cols])
+			write_terms(obj_outputs[0], ["Fragment I", "Fragment J"] + component_labels, labels, pairs, lambda start, end: values[:, start:end].T, digit, separator)
+	finally:
+		for obj_output in obj_outputs:
+			obj_output.close()
+	if metrics is not None:
+		metrics.add_stage("write", time.perf_counter() - time_start)
+		for output in list_output:
+			metrics.add_output(output, "component")
+	if verbose:
+		for output in list_output:
+			sys.stderr.write("create: {0} (component)\n".format(output))
+	return list_output
+
+
+def non_negative_int(value):
+	"""
+	function to convert argument to non-negative integer (type for argparse)
+
+	Args:
+		value (str): argument
+
+	Returns:
+		int
+	"""
+	import argparse
+	try:
+		number = int(value)
+	except ValueError:
+		number = -1
+	if number < 0:
+		raise argparse.ArgumentTypeError("non-negative integer is required ({0})".format(value))
+	return number
+
+
+def main(argv=None):
+	"""
+	main function for command line
+
+	Args:
+		argv (list, optional): command line arguments (Default: None (sys.argv[1:]))
+
+	Returns:
+		None
+	"""
+	import argparse
+	import signal
+	from mods.charge_func import CHARGE_SCHEMES
+	from mods.input_func import get_input_types
+	signal.signal(signal.SIGINT, signal.SIG_DFL)
+
 	parser = argparse.ArgumentParser(description="cpf2csv - convert log for ABINIT-MP to CSV", formatter_class=argparse.RawTextHelpFormatter)
 	global_option = parser.add_argument_group(title="global option", description="")
-	global_option.add_argument("-i", dest="INPUT", metavar="INPUT.(log|out|cpf)", required=True, help=".log, .out or .cpf for ABINIT-MP")
+	global_option.add_argument("-i", dest="INPUT", metavar="INPUT.(log|out|cpf)", required=True, help=".log, .out or .cpf for ABINIT-MP (`-` reads standard input in one pass; -o is required)")
+	global_option.add_argument("--type", dest="TYPE", choices=get_input_types(), help="input type instead of detection (also for --diff SECOND.cpf) (Default: detected from the head of input (CPF header), then by extension)")
 	global_option.add_argument("-o", dest="PREFIX", help="prefix for output")
 	global_option.add_argument("-O", dest="FLAG_OVERWRITE", action="store_true", default=False, help="overwrite forcibly (Default: False)")
+	global_option.add_argument("--incremental", dest="FLAG_INCREMENTAL", action="store_true", default=False, help="write only outputs that are out of date (input, options or version changed) according to PREFIX.manifest.json, and skip reading input when all outputs are up to date; not available with --sqlite, --diff, --piedalog and --component (Default: False)")
+	global_option.add_argument("--digit", dest="DIGIT", metavar="N", type=non_negative_int, default=4, help="number of decimal places for matrices (Default: 4)")
+	global_option.add_argument("--format", dest="FORMAT", choices=["csv", "tsv"], default="csv", help="output format (Default: csv)")
+	global_option.add_argument("--block", dest="BLOCK", metavar="TYPE[:N]", action="append", help="IFIE / PIEDA block of .log for output (TYPE: HF-IFIE, MP2-IFIE or PIEDA; N: occurrence (1-origin; negative value counts from the end)) (Default: last blocks)")
+	global_option.add_argument("--cutoff", dest="CUTOFF", metavar="R", type=float, help="output only fragment pairs within R angstrom as list (Fragment I, Fragment J, value) instead of matrix")
+	global_option.add_argument("--tile", dest="TILE", metavar="N|chain", help="write each matrix (-t, -f, -e, -s, -x, -c, -d, -q, -m) as tiles of N fragments (or of chains of .cpf) to PREFIX_TYPE_tile_R_C.csv in parallel, with index of label ranges PREFIX_TYPE_tiles.json")
+	global_option.add_argument("--sqlite", dest="SQLITE", metavar="OUTPUT.db", help="export fragments, atoms and fragment pair interactions (within --cutoff if specified) to SQLite database instead of CSV")
+	global_option.add_argument("--piedalog", dest="PIEDALOG", metavar="Frag_No.", type=int, nargs="+", help="write piedalog-style reports of target fragments of .cpf to PREFIX_piedalog_N.tsv instead of CSV")
+	global_option.add_argument("--diff", dest="DIFF", metavar="SECOND.cpf", help="write differential IFIE (SECOND - INPUT) of energy types (-t, -s, -x, -c, -d, -q) as matrices over fragments aligned by chain, residue number and residue name (PREFIX_diff_TYPE.csv and PREFIX_diff_fragments.csv) instead of CSV")
+	global_option.add_argument("--memmap", dest="MEMMAP_DIR", metavar="DIR", help="out-of-core mode; keep matrices in memory-mapped temporary files in DIR")
+	global_option.add_argument("--charge", dest="CHARGE", metavar="SCHEME", nargs="+", choices=CHARGE_SCHEMES, help="charge schemes for -p and --residue-charge ({0}; .log has only HF_Mulliken) (Default: HF_Mulliken)".format(", ".join(CHARGE_SCHEMES)))
+	global_option.add_argument("--compress", dest="COMPRESSION", choices=["gzip", "xz"], help="compress outputs (.gz / .xz is appended)")
+	global_option.add_argument("-j", "--jobs", dest="N_PROCESS", metavar="N", type=int, default=1, help="number of processes for decoding IFIE, trimer and tetramer sections of .cpf, and number of threads for writing and compressing outputs (Default: 1)")
+	global_option.add_argument("--metrics", dest="METRICS", metavar="FILE", help="append metrics of the run (input, time of each stage, peak memory, outputs, cache hits and skipped sections) to FILE as a line of JSON (FILE may be /dev/fd/N)")
+	global_option.add_argument("--dtype", dest="DTYPE", choices=["float64", "float32"], default="float64", help="data type for interaction matrices (Default: float64)")
 
 	output_type = parser.add_argument_group(title="energy type option", description="energy type for output (default: -t)")
 	output_type.add_argument("-a", "--all", dest="FLAG_ALL", action="store_true", default=False, help="select all type, same as -tfesxcdqm")
@@ -65,15 +799,72 @@ if __name__ == '__main__':
 	output_type.add_argument("-d", "--dispersion", dest="FLAG_DI", action="store_true", default=False, help="dispersion energy (DI) (kcal/mol)")
 	output_type.add_argument("-q", "--chargetransfer-amount", dest="FLAG_Q", action="store_true", default=False, help="amount of charge transfer (e; I(row) -> J(col))")
 	output_type.add_argument("-p", "--partial-charge", dest="FLAG_PC", action="store_true", default=False, help="partial charge")
+	output_type.add_argument("--summary", dest="FLAG_SUMMARY", action="store_true", default=False, help="per-fragment summary (sums of Total, ES, EX, CT and DI with all other fragments, contacts within --cutoff (Default: 4.0 angstrom), the most attractive partner and net transferred charge)")
+	output_type.add_argument("--residue-charge", dest="FLAG_RESIDUE_CHARGE", action="store_true", default=False, help="charge of each residue (sum of atomic charges of atoms with the same chain, residue number and residue name; only .cpf)")
+	output_type.add_argument("--many-body", dest="FLAG_MANY_BODY", action="store_true", default=False, help="many-body corrections of FMO3/FMO4 (kcal/mol): trimer and tetramer terms including selected fragments as lists (_trimer.csv, _tetramer.csv), and their sums per fragment pair (_many_body_pair.csv) and per fragment (_many_body_fragment.csv) (each term is added to all pairs and fragments it includes; only .cpf)")
 	output_type.add_argument("-m", "--min-dist", dest="FLAG_MIN_DIST", action="store_true", default=False, help="minimum distance")
+	output_type.add_argument("--component", dest="COMPONENT", metavar="EXPR", nargs="+", help="components of interaction as matrices (PREFIX_component_LABEL.csv; list of pairs within --cutoff in PREFIX_component.csv) computed in one pass over the IFIE section\n(EXPR: [LABEL=]TERM[+TERM ...]; TERM: COLUMN, -COLUMN or COEFFICIENT*COLUMN; COLUMN: column of IFIE section of .cpf (e.g. SCS-MP2-IFIE, MP3-IFIE, HF-IFIE-BSSE, Solv-ES; kcal/mol, PIEDA-dq is e) or IFIE-HF, IFIE-CR, ES, EX, CT, DI, Q of .log; e.g. BSSE=HF-IFIE-BSSE+MP2-IFIE-BSSE)")
 
 	output_range = parser.add_mutually_exclusive_group()
 	output_range.add_argument("--include", dest="INCLUDE", metavar="Frag_No.", nargs="+", help="")
 	output_range.add_argument("--exclude", dest="EXCLUDE", metavar="Frag_No.", nargs="+", help="")
 
-	args = parser.parse_args()
+	args = parser.parse_args(argv)
+
+	if args.METRICS is None:
+		run_command(args)
+		return
+
+	# 計測値は異常終了した場合も書き込む
+	from mods.RunMetrics import RunMetrics
+	metrics = RunMetrics(sys.argv[1:] if argv is None else list(argv), __version__)
+	status = 1
+	try:
+		run_command(args, metrics)
+		status = 0
+	except SystemExit as exc:
+		status = exc.code
+		raise
+	finally:
+		metrics.finish(status)
+		metrics.write(args.METRICS)
+
 
-	check_exist(args.INPUT, 2)
+def run_command(args, metrics=None):
+	"""
+	function to run command with parsed arguments
+
+	Args:
+		args (argparse.Namespace): arguments parsed in `main()`
+		metrics (RunMetrics, optional): record of the run (Default: None)
+
+	Returns:
+		None
+	"""
+	from mods.input_func import STDIN, get_input_type, is_regular_file
+
+	if args.INPUT == STDIN:
+		if args.PREFIX is None:
+			sys.stderr.write("ERROR: -o is required for standard input.\n")
+			sys.exit(1)
+	else:
+		# 名前付きパイプやプロセス置換 (/dev/fd/N) もストリームとして読む
+		check_exist(args.INPUT, 1)
+		if os.path.isdir(args.INPUT):
+			sys.stderr.write("ERROR: input is a directory ({0})\n".format(args.INPUT))
+			sys.exit(1)
+	if args.FLAG_INCREMENTAL and not is_regular_file(args.INPUT):
+		# 入力のハッシュを求めるため、再度読める通常のファイルが必要
+		sys.stderr.write("ERROR: --incremental is only available for regular files.\n")
+		sys.exit(1)
+	if args.FLAG_INCREMENTAL:
+		# manifest は CSV 出力 (convert) のみで記録する
+		for option, value in [["--sqlite", args.SQLITE], ["--diff", args.DIFF], ["--piedalog", args.PIEDALOG], ["--component", args.COMPONENT]]:
+			if value is not None:
+				sys.stderr.write("ERROR: --incremental is not available with {0}.\n".format(option))
+				sys.exit(1)
+	if args.MEMMAP_DIR is not None:
+		check_exist(args.MEMMAP_DIR, 3)
 
 	output_flag = [
 		args.FLAG_TOTAL,
@@ -85,62 +876,73 @@ if __name__ == '__main__':
 		args.FLAG_DI,
 		args.FLAG_Q,
 		args.FLAG_PC,
-		args.FLAG_MIN_DIST
+		args.FLAG_MIN_DIST,
+		args.FLAG_SUMMARY,
+		args.FLAG_RESIDUE_CHARGE,
+		args.FLAG_MANY_BODY,
+		args.FLAG_MANY_BODY,
+		args.FLAG_MANY_BODY,
+		args.FLAG_MANY_BODY
 	]
+	outputs = [output_type for output_type, flag in zip(OUTPUT_TYPES, output_flag) if flag]
+
+	# データ読み込み＆解析、出力フラグメントの決定
+	# (--incremental では出力がすべて最新であれば読み込まないため、--exclude 以外は読み込み前に決定する)
+	data_FMO = args.INPUT
+	output_range = None
+	if args.INCLUDE is not None:
+		output_range = get_output_range(None, args.INCLUDE)
+	if not args.FLAG_INCREMENTAL or args.EXCLUDE is not None:
+		data_FMO = load(args.INPUT, args.DTYPE, args.MEMMAP_DIR, args.N_PROCESS, metrics, args.TYPE)
+		output_range = get_output_range(data_FMO, args.INCLUDE, args.EXCLUDE)
 
 	if args.FLAG_ALL:
-		if os.path.splitext(args.INPUT)[1].lower() == ".cpf":
-			output_flag = [True, False, False, True, True, True, True, True, True]
+		# 読み込み済みの場合は読み込みクラスから判定する (パイプは再度読めないため)
+		if isinstance(data_FMO, str):
+			flag_cpf = get_input_type(args.INPUT, args.TYPE) == "cpf"
 		else:
-			output_flag = [True for x in output_flag]
-	elif args.FLAG_TOTAL == False:
-		if len([True for x in output_flag if x == True]) == 0:
-			# 他のオプションが未指定の場合のみ total オプションを機能させる
-			output_flag[0] = True
-
-	# データ読み込み＆解析
-	data_FMO = None
-	if os.path.splitext(args.INPUT)[1] == ".cpf":
-		data_FMO = FileCpf(args.INPUT)
-
-	else:
-		data_FMO = FileLogABINITMP(args.INPUT)
-
-	# 出力フラグメントの決定
-	output_range = []
-	if args.INCLUDE is None and args.EXCLUDE is None:
-		# 未指定の場合
-		output_range = data_FMO.get_label()
-
-	elif args.INCLUDE is not None:
-		# include で指定の場合
-		output_range = [int(x) for x in args.INCLUDE]
+			from mods.FileCpf import FileCpf
+			flag_cpf = isinstance(data_FMO, FileCpf)
+		if flag_cpf:
+			outputs = OUTPUT_TYPES_CPF
+		else:
+			outputs = OUTPUT_TYPES_LOG
+	elif len(outputs) == 0 and args.COMPONENT is None:
+		# 他のオプションが未指定の場合のみ total オプションを機能させる
+		outputs = ["Total"]
 
-	elif args.EXCLUDE is not None:
-		# exclude で指定の場合
-		output_range = list(set(data_FMO.get_label()) - set([int(x) for x in args.EXCLUDE]))
+	if args.SQLITE is not None:
+		export_sqlite(data_FMO, args.SQLITE, output_range, overwrite=args.FLAG_OVERWRITE, dtype=args.DTYPE, blocks=args.BLOCK, cutoff=args.CUTOFF, memmap_dir=args.MEMMAP_DIR, n_process=args.N_PROCESS, metrics=metrics, verbose=True, input_type=args.TYPE)
+		return
 
 	# 出力ファイル
 	prefix = args.PREFIX
 	if prefix is None:
 		prefix = os.path.splitext(os.path.basename(args.INPUT))[0]
 
-	for idx, flag in enumerate(output_flag):
-		if flag:
-			output = prefix + OUTPUT_SUFFIX[idx]
-			if args.FLAG_OVERWRITE == False:
-				check_overwrite(output)
+	if args.DIFF is not None:
+		check_exist(args.DIFF, 2)
+		from mods.diff_func import DIFF_ENERGY_TYPES
+		diff_outputs = [output_type for output_type in outputs if output_type in DIFF_ENERGY_TYPES]
+		if len(diff_outputs) == 0:
+			sys.stderr.write("ERROR: no energy type for --diff (-t, -s, -x, -c, -d or -q).\n")
+			sys.exit(1)
+		convert_diff(data_FMO, args.DIFF, diff_outputs, output_range, prefix, overwrite=args.FLAG_OVERWRITE, dtype=args.DTYPE, digit=args.DIGIT, output_format=args.FORMAT, memmap_dir=args.MEMMAP_DIR, n_process=args.N_PROCESS, compression=args.COMPRESSION, metrics=metrics, verbose=True, input_type=args.TYPE)
+		return
 
-			with open(output, "w") as obj_output:
-				csv_writer = csv.writer(obj_output, lineterminator="\n")
-				if OUTPUT_NAME[idx][0] == "P":
-					csv_writer.writerows(data_FMO.output_charge(output_range))
-					sys.stderr.write("create: {0} (partial charge)\n".format(output))
+	if args.PIEDALOG is not None:
+		export_piedalog(data_FMO, args.PIEDALOG, prefix, overwrite=args.FLAG_OVERWRITE, dtype=args.DTYPE, memmap_dir=args.MEMMAP_DIR, n_process=args.N_PROCESS, metrics=metrics, verbose=True, input_type=args.TYPE)
+		return
 
-				elif OUTPUT_NAME[idx][0] == "M":
-					csv_writer.writerows(data_FMO.output_min_dist(output_range))
-					sys.stderr.write("create: {0} (minimum distance)\n".format(output))
+	if args.COMPONENT is not None:
+		export_components(data_FMO, args.COMPONENT, output_range, prefix, overwrite=args.FLAG_OVERWRITE, dtype=args.DTYPE, digit=args.DIGIT, output_format=args.FORMAT, blocks=args.BLOCK, cutoff=args.CUTOFF, memmap_dir=args.MEMMAP_DIR, n_process=args.N_PROCESS, compression=args.COMPRESSION, metrics=metrics, verbose=True, input_type=args.TYPE)
+		if len(outputs) == 0:
+			return
 
-				else:
-					csv_writer.writerows(data_FMO.output_energy(OUTPUT_NAME[idx][0], output_range))
-					sys.stderr.write("create: {0} ({1})\n".format(output, OUTPUT_NAME[idx][1]))
+	convert(data_FMO, outputs, output_range, prefix, overwrite=args.FLAG_OVERWRITE, dtype=args.DTYPE, digit=args.DIGIT, output_format=args.FORMAT, blocks=args.BLOCK, cutoff=args.CUTOFF, memmap_dir=args.MEMMAP_DIR, n_process=args.N_PROCESS, incremental=args.FLAG_INCREMENTAL, compression=args.COMPRESSION, n_thread=args.N_PROCESS, charge_schemes=args.CHARGE, metrics=metrics, verbose=True, input_type=args.TYPE, tile=args.TILE)
+
+
+
+# =============== main =============== #
+if __name__ == '__main__':
+	main()
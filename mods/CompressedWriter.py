@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CompressedWriter class
+"""
+
+import sys
+import zlib
+import lzma
+
+
+
+# =============== constant =============== #
+COMPRESSION_SUFFIX = {
+	"gzip": ".gz",
+	"xz": ".xz",
+}
+COMPRESSION_LEVEL = {
+	"gzip": 6,
+	"xz": 6,
+}
+BLOCK_SIZE = 1 << 24
+
+
+
+# =============== function =============== #
+def get_compressed_path(path, compression=None):
+	"""
+	function to add suffix of compression to path
+
+	Args:
+		path (str): file path
+		compression (str, optional): `gzip` or `xz` (Default: None (no compression))
+
+	Returns:
+		str
+	"""
+	if compression is None:
+		return path
+	return path + COMPRESSION_SUFFIX[compression]
+
+
+def compress_block(data, compression, level):
+	"""
+	function to compress block as independent gzip member or xz stream (concatenated blocks are valid .gz / .xz file)
+
+	Args:
+		data (bytes): data
+		compression (str): `gzip` or `xz`
+		level (int): compression level
+
+	Returns:
+		bytes
+	"""
+	if compression == "gzip":
+		# ヘッダに時刻を含めない (同じ内容からは同じファイルになる)
+		obj_compress = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+		return obj_compress.compress(data) + obj_compress.flush()
+	return lzma.compress(data, format=lzma.FORMAT_XZ, preset=level)
+
+
+
+# =============== class =============== #
+class CompressedWriter:
+	""" テキストをブロックごとに独立に圧縮して書き込むファイルクラス (ブロックはスレッドプールで並列に圧縮し、元の順に書き込む) """
+	def __init__(self, path, compression, executor=None, level=None, block_size=BLOCK_SIZE, max_pending=4):
+		"""
+		Args:
+			path (str): 出力ファイルパス
+			compression (str): `gzip` or `xz`
+			executor (concurrent.futures.Executor, optional): 圧縮に使うスレッドプール (Default: None (逐次圧縮))
+			level (int, optional): 圧縮レベル (Default: None (gzip: 6, xz: 6))
+			block_size (int, optional): 1 ブロックのバイト数 (Default: 1 << 24)
+			max_pending (int, optional): 圧縮待ちにするブロック数の上限 (Default: 4)
+		"""
+		if compression not in COMPRESSION_SUFFIX:
+			sys.stderr.write("ERROR: undefined compression ({0}).\n".format(compression))
+			sys.exit(1)
+
+		self._compression = compression
+		self._level = COMPRESSION_LEVEL[compression] if level is None else level
+		self._executor = executor
+		self._block_size = block_size
+		self._max_pending = max(1, max_pending)
+		self._buffer = []
+		self._buffer_size = 0
+		self._pending = []
+		self._obj_output = open(path, "wb")
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+	def write(self, text):
+		"""
+		テキストを書き込むメソッド
+
+		Args:
+			text (str): テキスト
+
+		Returns:
+			int: 文字数
+		"""
+		data = text.encode()
+		self._buffer.append(data)
+		self._buffer_size += len(data)
+		if self._buffer_size >= self._block_size:
+			self._submit()
+		return len(text)
+
+
+	def _submit(self):
+		"""
+		バッファを 1 ブロックとして圧縮に回すメソッド
+
+		Returns:
+			None
+		"""
+		if self._buffer_size == 0:
+			return
+		data = b"".join(self._buffer)
+		self._buffer = []
+		self._buffer_size = 0
+		if self._executor is None:
+			self._obj_output.write(compress_block(data, self._compression, self._level))
+			return
+
+		self._pending.append(self._executor.submit(compress_block, data, self._compression, self._level))
+		while len(self._pending) > self._max_pending:
+			self._obj_output.write(self._pending.pop(0).result())
+
+
+	def close(self):
+		"""
+		残りのブロックを書き込んでファイルを閉じるメソッド
+
+		Returns:
+			None
+		"""
+		if self._obj_output.closed:
+			return
+		try:
+			self._submit()
+			while len(self._pending) != 0:
+				self._obj_output.write(self._pending.pop(0).result())
+		finally:
+			self._obj_output.close()
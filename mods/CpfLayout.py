@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+CpfLayout class (registry of .cpf layouts for each version)
+"""
+
+import sys
+import numpy as np
+
+from mods.parse_func import decode_lines
+
+
+
+# =============== constant =============== #
+# [カラム名, 開始位置, 終了位置, 型]
+# 型: `int`, `float`, `str` (そのまま), `strip` (前後の空白を除く), `tail` (行長が終了位置を超える場合のみ開始位置以降、それ以外は " ")
+STRUCTURE_LAYOUT = [
+	["Index", 0, 5, "int"],
+	["Element", 6, 8, "str"],
+	["AtomName", 9, 13, "str"],
+	["ResidueName", 14, 17, "str"],
+	["ResidueNumber", 18, 22, "int"],
+	["FragmentNumber", 23, 27, "int"],
+	["CoordinateX", 28, 40, "float"],
+	["CoordinateY", 40, 52, "float"],
+	["CoordinateZ", 52, 64, "float"],
+	["HF_MullikenCharge", 64, 76, "float"],
+	["MP2_MullikenCharge", 76, 88, "float"],
+	["HF_NBOCharge", 88, 100, "float"],
+	["MP2_NBOCharge", 100, 112, "float"],
+	["HF_ESPCharge", 112, 124, "float"],
+	["MP2_ESPCharge", 124, 136, "float"],
+	["ChainID", 136, 138, "strip"],
+	["PDBInsertionCode", 138, 151, "tail"],
+]
+
+# [開始位置, 終了位置, 型]
+MONOMER_LAYOUT = [[24 * k, 24 * (k + 1), "float"] for k in range(4)] + [[96 + 12 * k, 96 + 12 * (k + 1), "int"] for k in range(2)]
+TRIMER_LAYOUT = [[5 * k, 5 * (k + 1), "int"] for k in range(3)] + [[15 + 24 * k, 15 + 24 * (k + 1), "float"] for k in range(5)]
+TETRAMER_LAYOUT = [[5 * k, 5 * (k + 1), "int"] for k in range(4)] + [[20 + 24 * k, 20 + 24 * (k + 1), "float"] for k in range(5)]
+
+# [1 フィールドの幅, 1 行のフィールド数]
+INTEGER_LAYOUT = [5, 16]
+IFIE_WIDTH = 24
+
+IFIE_COLUMNS_42 = ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE', 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE']
+IFIE_COLUMNS_4201 = IFIE_COLUMNS_42 + ['PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq']
+IFIE_COLUMNS_70 = IFIE_COLUMNS_42 + ['Solv-ES', 'Solv-NP', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq']
+IFIE_COLUMNS_OPEN10 = ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'PR-MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE', 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-MP2-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'Solv-ES', 'Solv-NP', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq']
+
+NUMPY_DTYPE = {
+	"int": np.int64,
+	"float": np.float64,
+}
+
+
+
+# =============== class =============== #
+class CpfLayout:
+	""" CPF のバージョンごとの書式を保持し、固定長の行を一括で変換するクラス (変換に必要な位置や型はあらかじめ計算しておく) """
+	def __init__(self, version, name, IFIE_columns, structure=STRUCTURE_LAYOUT, monomer=MONOMER_LAYOUT, trimer=TRIMER_LAYOUT, tetramer=TETRAMER_LAYOUT, integer=INTEGER_LAYOUT, IFIE_width=IFIE_WIDTH):
+		"""
+		Args:
+			version (str): バージョン文字列 (.cpf の 1 行目の先頭)
+			name (str): バージョン名
+			IFIE_columns (list): IFIE セクションのカラム名のリスト
+			structure (list, optional): 構造セクションの書式 ([[カラム名, 開始位置, 終了位置, 型], ...]) (Default: STRUCTURE_LAYOUT)
+			monomer (list, optional): モノマーセクションの書式 ([[開始位置, 終了位置, 型], ...]) (Default: MONOMER_LAYOUT)
+			trimer (list, optional): トリマーセクションの書式 (Default: TRIMER_LAYOUT)
+			tetramer (list, optional): テトラマーセクションの書式 (Default: TETRAMER_LAYOUT)
+			integer (list, optional): 電子数・結合数セクションの書式 ([1 フィールドの幅, 1 行のフィールド数]) (Default: [5, 16])
+			IFIE_width (int, optional): IFIE セクションの 1 フィールドの幅 (Default: 24)
+		"""
+		self._version = version
+		self._name = name
+		self._IFIE_columns = list(IFIE_columns)
+		self._structure_columns = [v[0] for v in structure]
+		self._integer = list(integer)
+
+		# 変換用の情報をあらかじめ作成する
+		self._component_index = {column: idx for idx, column in enumerate(self._IFIE_columns)}
+		self._IFIE_decoder = [[IFIE_width * k, IFIE_width * (k + 1), np.float64] for k in range(len(self._IFIE_columns))]
+		self._structure_decoder = self._compile([v[1:] for v in structure])
+		self._monomer_decoder = self._compile(monomer)
+		self._trimer_decoder = self._compile(trimer)
+		self._tetramer_decoder = self._compile(tetramer)
+
+	@property
+	def version(self):
+		return self._version
+
+	@property
+	def name(self):
+		return self._name
+
+	@property
+	def IFIE_columns(self):
+		return self._IFIE_columns
+
+	@property
+	def structure_columns(self):
+		return self._structure_columns
+
+	@property
+	def n_integer(self):
+		return self._integer[1]
+
+
+	@staticmethod
+	def _compile(layout):
+		"""
+		書式を数値カラム (一括変換) と文字列カラムに分けるメソッド
+
+		Args:
+			layout (list): [[開始位置, 終了位置, 型], ...]
+
+		Returns:
+			list: [数値カラムの位置, 数値カラムの decode_lines 用書式, 文字列カラムの位置, 文字列カラムの書式]
+		"""
+		numeric_idx = []
+		numeric_columns = []
+		text_idx = []
+		text_columns = []
+		for idx, (pos_start, pos_end, column_type) in enumerate(layout):
+			if column_type in NUMPY_DTYPE:
+				numeric_idx.append(idx)
+				numeric_columns.append([pos_start, pos_end, NUMPY_DTYPE[column_type]])
+			elif column_type in ["str", "strip", "tail"]:
+				text_idx.append(idx)
+				text_columns.append([pos_start, pos_end, column_type])
+			else:
+				sys.stderr.write("ERROR: undefined column type ({0}).\n".format(column_type))
+				sys.exit(1)
+		return [numeric_idx, numeric_columns, text_idx, text_columns]
+
+
+	@staticmethod
+	def _decode_columns(lines, decoder, selection=None):
+		"""
+		コンパイル済みの書式で行をカラムごとに一括で変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+			decoder (list): `_compile()` の返り値
+			selection (list, optional): 変換するカラムのインデックス (Default: None (全カラム))
+
+		Returns:
+			list: [数値カラムは ndarray、文字列カラムは list (選択しなかったカラムは None), ...]
+		"""
+		numeric_idx, numeric_columns, text_idx, text_columns = decoder
+		columns = [None] * (len(numeric_idx) + len(text_idx))
+		if selection is not None:
+			numeric_columns = [column for idx, column in zip(numeric_idx, numeric_columns) if idx in selection]
+			numeric_idx = [idx for idx in numeric_idx if idx in selection]
+			text_columns = [column for idx, column in zip(text_idx, text_columns) if idx in selection]
+			text_idx = [idx for idx in text_idx if idx in selection]
+
+		if len(numeric_idx) != 0:
+			for idx, values in zip(numeric_idx, decode_lines(lines, numeric_columns)):
+				columns[idx] = values
+
+		if len(text_idx) != 0:
+			text_lines = [line.decode() for line in lines]
+			for idx, (pos_start, pos_end, column_type) in zip(text_idx, text_columns):
+				if column_type == "str":
+					columns[idx] = [line[pos_start : pos_end] for line in text_lines]
+				elif column_type == "strip":
+					columns[idx] = [line[pos_start : pos_end].strip() for line in text_lines]
+				else:
+					columns[idx] = [line[pos_start:] if len(line) > pos_end else " " for line in text_lines]
+
+		return columns
+
+
+	@classmethod
+	def _decode_rows(cls, lines, decoder):
+		"""
+		コンパイル済みの書式で行を一括で変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+			decoder (list): `_compile()` の返り値
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		columns = [values.tolist() if isinstance(values, np.ndarray) else values for values in cls._decode_columns(lines, decoder)]
+		return [list(row) for row in zip(*columns)]
+
+
+	def has_component(self, component):
+		"""
+		IFIE セクションにカラムがあるかどうかを返すメソッド
+
+		Args:
+			component (str): カラム名
+
+		Returns:
+			bool
+		"""
+		return component in self._component_index
+
+
+	def component_index(self, component):
+		"""
+		IFIE セクションのカラムのインデックスを返すメソッド
+
+		Args:
+			component (str): カラム名
+
+		Returns:
+			int
+		"""
+		if component not in self._component_index:
+			sys.stderr.write("ERROR: {0} is not included in {1}.\n".format(component, self._version))
+			sys.exit(1)
+		return self._component_index[component]
+
+
+	def decode_structure(self, lines):
+		"""
+		構造セクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [[値, ...], ...] (カラム順は `structure_columns`)
+		"""
+		return self._decode_rows(lines, self._structure_decoder)
+
+
+	def decode_structure_arrays(self, lines, columns):
+		"""
+		構造セクションの行から指定したカラムのみを配列として変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+			columns (list): カラム名のリスト (`structure_columns` にないカラムは無視する)
+
+		Returns:
+			dict: {カラム名: ndarray}
+		"""
+		selection = [self._structure_columns.index(column) for column in columns if column in self._structure_columns]
+		values = self._decode_columns(lines, self._structure_decoder, selection)
+		return {self._structure_columns[idx]: np.asarray(values[idx]) for idx in selection}
+
+
+	def decode_integers(self, lines):
+		"""
+		電子数・結合数セクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [int, ...]
+		"""
+		text = b"".join([line.rstrip() for line in lines])
+		if len(text) % self._integer[0] != 0:
+			sys.stderr.write("ERROR: the strings in the following lines are not divisible by the specified length.\n")
+			sys.stderr.write("       {0}\n".format(text.decode()))
+			sys.exit(1)
+		return np.frombuffer(text, dtype="S{0}".format(self._integer[0])).astype(np.int64).tolist()
+
+
+	def decode_distance(self, lines):
+		"""
+		フラグメント間距離セクションの行 (`I J distance`) を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [0-origin フラグメントインデックス I (ndarray), 0-origin フラグメントインデックス J (ndarray), 距離 (ndarray)]
+		"""
+		values = np.array(b" ".join(lines).split(), dtype=bytes).astype(np.float64).reshape(len(lines), 3)
+		return [values[:, 0].astype(np.int64) - 1, values[:, 1].astype(np.int64) - 1, values[:, 2]]
+
+
+	def decode_IFIE(self, lines):
+		"""
+		IFIE セクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			ndarray: (カラム数, 行数)
+		"""
+		if len(lines) == 0:
+			return np.zeros((len(self._IFIE_columns), 0))
+		return np.array(decode_lines(lines, self._IFIE_decoder))
+
+
+	def decode_monomer(self, lines):
+		"""
+		モノマーセクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		return self._decode_rows(lines, self._monomer_decoder)
+
+
+	def decode_trimer(self, lines):
+		"""
+		トリマーセクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		return self._decode_rows(lines, self._trimer_decoder)
+
+
+	def decode_tetramer(self, lines):
+		"""
+		テトラマーセクションの行を変換するメソッド
+
+		Args:
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		return self._decode_rows(lines, self._tetramer_decoder)
+
+
+	def decode_multimer(self, section, lines):
+		"""
+		トリマー・テトラマーセクションの行を配列に変換するメソッド
+
+		Args:
+			section (str): `trimer` or `tetramer`
+			lines (list): 行 (bytes) のリスト
+
+		Returns:
+			ndarray: (カラム数, 行数) (float64; フラグメントインデックスのカラムも含む)
+		"""
+		columns = self.numeric_decoder(section)
+		if columns is None:
+			sys.stderr.write("ERROR: {0} section with text columns is not supported.\n".format(section))
+			sys.exit(1)
+		if len(lines) == 0:
+			return np.zeros((len(columns), 0))
+		return np.array(decode_lines(lines, columns), dtype=np.float64)
+
+
+
+	def numeric_decoder(self, section):
+		"""
+		数値カラムのみからなるセクションの decode_lines 用書式を返すメソッド (プロセス間で分割して変換する場合に使う)
+
+		Args:
+			section (str): `IFIE`, `trimer` or `tetramer`
+
+		Returns:
+			list: [[開始位置, 終了位置, 型], ...] (文字列カラムを含む場合は None)
+		"""
+		if section == "IFIE":
+			return self._IFIE_decoder
+
+		decoder = {"trimer": self._trimer_decoder, "tetramer": self._tetramer_decoder}.get(section)
+		if decoder is None:
+			sys.stderr.write("ERROR: undefined section ({0}).\n".format(section))
+			sys.exit(1)
+		if len(decoder[2]) != 0:
+			return None
+		return decoder[1]
+
+
+	def rows_from_columns(self, section, values):
+		"""
+		`numeric_decoder()` の書式で変換した配列を `decode_trimer()` などと同じ行のリストにするメソッド
+
+		Args:
+			section (str): `trimer` or `tetramer`
+			values (ndarray): (カラム数, 行数)
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		columns = [column.astype(dtype).tolist() for column, (_, _, dtype) in zip(values, self.numeric_decoder(section))]
+		return [list(row) for row in zip(*columns)]
+
+
+# =============== registry =============== #
+LAYOUTS = {}
+
+
+def register_layout(layout):
+	"""
+	function to register CPF layout
+
+	Args:
+		layout (CpfLayout): layout
+
+	Returns:
+		CpfLayout
+	"""
+	LAYOUTS[layout.version] = layout
+	return layout
+
+
+def find_layout(version_line):
+	"""
+	function to find CPF layout for version line (the longest matching version is used)
+
+	Args:
+		version_line (str): first line of .cpf
+
+	Returns:
+		CpfLayout or None
+	"""
+	version_line = version_line.strip()
+	list_version = [version for version in LAYOUTS.keys() if version_line.startswith(version)]
+	if len(list_version) == 0:
+		return None
+	return LAYOUTS[max(list_version, key=len)]
+
+
+register_layout(CpfLayout('CPF Ver.4.2', 'CPFVersion.Ver4_2', IFIE_COLUMNS_42))
+register_layout(CpfLayout('CPF Ver.4.201', 'CPFVersion.Ver4_201', IFIE_COLUMNS_4201))
+register_layout(CpfLayout('CPF Ver.4.201 (MIZUHO)', 'CPFVersion.Ver4_201_MIZUHO', IFIE_COLUMNS_4201))
+register_layout(CpfLayout('CPF Ver.7.0 (MIZUHO 4.0)', 'CPFVersion.Ver70_MIZUHO40', IFIE_COLUMNS_70))
+register_layout(CpfLayout('CPF Ver.7.2', 'CPFVersion.Ver72', IFIE_COLUMNS_70))
+register_layout(CpfLayout('CPF Open1.0 rev10', 'CPFVersion.Ver_Open1_0_rev10', IFIE_COLUMNS_OPEN10))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+FMOReader class (common interface of readers for ABINIT-MP outputs)
+"""
+
+import abc
+import numpy as np
+
+from mods.output_func import get_output_index
+
+
+
+# =============== constant =============== #
+DIGIT = 4
+
+
+
+# =============== class =============== #
+class FMOReader(abc.ABC):
+	"""
+	読み込みクラスの共通インターフェース
+	(サブクラスは `_get_labels()`, `get_energy_matrix()`, `get_min_distance_matrix()`, `check_charge()`, `get_charge_table()` を実装し、
+	ラベル・出力形式の行列・電荷の表はここで共通に作る)
+	"""
+	@abc.abstractmethod
+	def _get_labels(self):
+		"""
+		フラグメントラベルのリスト (読み込みクラスが保持しているもの) を返すメソッド
+
+		Returns:
+			list
+		"""
+
+
+	def get_label(self, frag_idx=None):
+		"""
+		ラベルを返すメソッド
+
+		Args:
+			frag_idx (int, optional): 1-origin フラグメントインデックス (Default: None)
+
+		Returns:
+			int or list: ラベル (frag_idx を省略した場合は全フラグメントのラベルの新しいリスト)
+		"""
+		labels = self._get_labels()
+		if frag_idx is not None:
+			return labels[frag_idx - 1]
+		return list(labels)
+
+
+	def get_energy(self, energy_type="Total", frag_idx=None):
+		"""
+		IFIE エネルギーを返すメソッド (小数点以下 4 桁に丸める)
+
+		Args:
+			energy_type (str, optional): エネルギーの種類 (Default: "Total")
+			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (1-origin) (Default: None)
+
+		Returns:
+			ndarray or float
+		"""
+		if frag_idx is None:
+			return np.round(self.get_energy_matrix(energy_type), DIGIT)
+		energies = self.get_energy_matrix(energy_type, [frag_idx[0] - 1], [frag_idx[1] - 1])
+		return np.round(energies[0][0], DIGIT)
+
+
+	def get_min_distance(self, frag_idx=None, unit="bohr"):
+		"""
+		フラグメント間距離 (最短原子間距離) を返すメソッド (小数点以下 4 桁に丸める)
+
+		Args:
+			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (1-origin) (Default: None)
+			unit (str): "bohr" or "angstrom" (Default: "bohr")
+
+		Returns:
+			ndarray or float
+		"""
+		if frag_idx is None:
+			return np.round(self.get_min_distance_matrix(unit=unit), DIGIT)
+		distances = self.get_min_distance_matrix(rows=[frag_idx[0] - 1], cols=[frag_idx[1] - 1], unit=unit)
+		return np.round(distances[0][0], DIGIT)
+
+
+	def _output_matrix(self, get_matrix, output_range=None):
+		"""
+		行列を出力形式 (先頭行と先頭列がラベル) で返すメソッド
+
+		Args:
+			get_matrix (function): 行・列の 0-origin インデックスから行列を返す関数 (`get_matrix(rows, cols)`)
+			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+
+		Returns:
+			list
+		"""
+		labels = self.get_label()
+		index = get_output_index(labels, output_range)
+		labels = [labels[idx] for idx in index]
+		result = np.round(get_matrix(index, index), DIGIT).tolist()
+		return [[""] + labels] + [[label] + row for label, row in zip(labels, result)]
+
+
+	def output_energy(self, energy_type="Total", output_range=None):
+		"""
+		IFIE エネルギーを出力形式で返すメソッド
+
+		Args:
+			energy_type (str, optional): エネルギーの種類 (Default: "Total")
+			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+
+		Returns:
+			list
+		"""
+		return self._output_matrix(lambda rows, cols: self.get_energy_matrix(energy_type, rows, cols), output_range)
+
+
+	def output_min_dist(self, output_range=None):
+		"""
+		最短距離を出力形式で返すメソッド
+
+		Args:
+			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+
+		Returns:
+			list
+		"""
+		return self._output_matrix(self.get_min_distance_matrix, output_range)
+
+
+	def output_charge(self, output_range=None, schemes=None):
+		"""
+		電荷情報を出力形式で返すメソッド (フラグメント電荷の表と原子電荷の表を空のカラムを挟んで並べる)
+
+		Args:
+			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+			schemes (list, optional): 電荷の種類 (`CHARGE_SCHEMES`) のリスト (Default: None (HF Mulliken 電荷; カラム名に種類を付けない))
+
+		Returns:
+			list
+		"""
+		index = None
+		if output_range is not None:
+			index = get_output_index(self.get_label(), output_range)
+
+		if schemes is None:
+			header_frag = ["Fragment index", "Fragment charge"]
+			header_atom = ["Fragment index", "Atom index", "Atom", "Atomic charge"]
+		else:
+			header_frag = ["Fragment index"] + ["Fragment charge ({0})".format(scheme) for scheme in schemes]
+			header_atom = ["Fragment index", "Atom index", "Atom"] + ["Atomic charge ({0})".format(scheme) for scheme in schemes]
+		_, values = self.get_charge_table("fragment", schemes, index)
+		result_frag = [header_frag] + [list(row) for row in zip(*[v.tolist() for v in values])]
+		_, values = self.get_charge_table("atom", schemes, index)
+		result_atom = [header_atom] + [list(row) for row in zip(*[v.tolist() for v in values])]
+
+		if len(result_frag) > len(result_atom):
+			result_atom += [[""] * len(header_atom) for _ in range(len(result_frag) - len(result_atom))]
+		elif len(result_frag) < len(result_atom):
+			result_frag += [[""] * len(header_frag) for _ in range(len(result_atom) - len(result_frag))]
+
+		return [frag + [""] + atom for frag, atom in zip(result_frag, result_atom)]
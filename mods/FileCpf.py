@@ -5,12 +5,27 @@
 CPF File class
 """
 
-import sys, signal
-signal.signal(signal.SIGINT, signal.SIG_DFL)
-
+import sys
+import time
 import numpy as np
-import collections
-import copy
+import itertools
+import concurrent.futures
+
+from mods.CpfLayout import LAYOUTS, find_layout
+from mods.geometry_func import min_distance_packed, min_distance_pairs
+from mods.NeighborList import NeighborList
+from mods.PairMatrix import PairMatrix, pair_index, create_array
+from mods.output_func import format_rows
+from mods.basic_func import check_overwrite
+from mods.parse_func import decode_lines, read_fixed_length
+from mods.SharedArray import SharedArray
+from mods.charge_func import DEFAULT_CHARGE_SCHEME, get_charge_column, check_charge_level
+from mods.group_func import group_sum, factorize, group_mode
+from mods.frame_func import create_frame, get_pair_labels
+from mods.multimer_func import MULTIMER_COLUMNS, MULTIMER_ORDER
+from mods.component_func import get_component_weights
+from mods.input_func import open_input, get_input_path, is_regular_file
+from mods.FMOReader import FMOReader
 
 
 
@@ -38,27 +53,13 @@ STRUCTURE_COLUMNS = [
 	'PDBInsertionCode'
 ]
 
-CPF_VERSION = {
-	'CPF Ver.4.201 (MIZUHO)': 'CPFVersion.Ver4_201_MIZUHO',
-	'CPF Ver.7.0 (MIZUHO 4.0)': 'CPFVersion.Ver70_MIZUHO40',
-	'CPF Open1.0 rev10': 'CPFVersion.Ver_Open1_0_rev10',
-}
+CPF_VERSION = {version: layout.name for version, layout in LAYOUTS.items()}
 
-CPF_FORMAT = {
-	"ELECTRON": {
-		"length": 5,
-		"number": 16
-	}
-}
+IFIE_FORMAT = {version: layout.IFIE_columns for version, layout in LAYOUTS.items()}
 
-IFIE_FORMAT = {
-	'CPF Ver.4.2':                    ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE'    , 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE'],
-	'CPF Ver.4.201':                  ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE'    , 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq'],
-	'CPF Ver.4.201 (MIZUHO)':         ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE'    , 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq'],
-	'CPF Ver.7.0 (MIZUHO 4.0)': ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE'    , 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'Solv-ES', 'Solv-NP', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq'],
-	'CPF Ver.7.2':                    ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'SCS-MP2-IFIE', 'MP3-IFIE'    , 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'Solv-ES', 'Solv-NP', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq'],
-	'CPF Open1.0 rev10':              ['Repulsion', 'HF-Electron', 'HF-ES', 'MP2-IFIE', 'PR-MP2-IFIE' , 'SCS-MP2-IFIE', 'MP3-IFIE', 'SCS-MP3-IFIE', 'HF-IFIE-BSSE', 'MP2-IFIE-BSSE', 'SCS-MP2-IFIE-BSSE', 'MP3-IFIE-BSSE', 'SCS-MP3-IFIE-BSSE', 'Solv-ES', 'Solv-NP', 'PIEDA-EX', 'PIEDA-CT', 'PIEDA-dq']
-}
+BLOCK_LINES = 1 << 16
+READ_SECTIONS = ["header", "structure", "electron", "connection", "distance", "dipole", "condition", "monomer", "IFIE", "trimer", "tetramer"]
+PIEDALOG_COLUMNS = ["frag_Num", "Chain", "seq", "RES", "FCHARGE", "MAINSIDE", "DIST", "Total", "ES", "EX", "CT+mix", "DI(MP2)", "q(I=>J)"]
 
 
 ENERGY_TYPE = {
@@ -121,145 +122,59 @@ def parser_split_line_by_length(line, length_value, dtype):
 	return list_values
 
 
-def parser_structure(structure_line, version=None):
+def decode_chunk(task):
 	"""
-	function of parser for structure information in .cpf file
+	function to decode a chunk of fixed-length lines into shared array (worker of process pool)
 
 	Args:
-		structure_line (str): structure line
-		version (str, optional): CPF version (Default: None)
+		task (list): [.cpf file path, byte offset of the first line, line length, first line index, number of lines, columns for `decode_lines()`, handle of `SharedArray`]
 
 	Returns:
-		list
+		bool: False if lines are not fixed-length
 	"""
-	if version is None:
-		return [
-			int(structure_line[0:5].strip()),
-			structure_line[6:8],
-			structure_line[9:13],
-			structure_line[14:17],
-			int(structure_line[18:22]),
-			int(structure_line[23:27]),
-			float(structure_line[28:40].strip()),
-			float(structure_line[40:52].strip()),
-			float(structure_line[52:64].strip()),
-			float(structure_line[64:76].strip()),
-			float(structure_line[76:88].strip()),
-			float(structure_line[88:100]),
-			float(structure_line[100:112]),
-			float(structure_line[112:124]),
-			float(structure_line[124:136]),
-			structure_line[136:138].strip(),
-			structure_line[138:] if len(structure_line[135:]) > 16 else ' ',
-		]
-	else:
-		return None
-
-
-def parser_electron_number(electron_line):
-	"""
-	function of parser for electron information
-
-	Args:
-		electron_line (str): line
-
-	Returns:
-		list: electron information
-	"""
-	electron_list = parser_split_line_by_length(electron_line.rstrip(), CPF_FORMAT["ELECTRON"]["length"], "int")
-	return electron_list
-
-
-def parser_fragment_bond(bond_line):
-	"""
-	function of parser for bond information in CPF (the same behavior of electron information)
-
-	Args:
-		bond_line (str): bond line
-
-	Returns:
-		list: bond information
-	"""
-	return parser_electron_number(bond_line)
-
-
-def parser_monomer(monomer_line):
-	"""
-	function of parser for monomer information
-
-	Args:
-		monomer_line (str): monomer line
-
-	Returns:
-		list: monomer information
-	"""
-	monomer_energy = parser_split_line_by_length(monomer_line[0 : 96], 24, "float")
-	monomer_orbital = parser_split_line_by_length(monomer_line[96 : 120], 12, "int")
-	return monomer_energy + monomer_orbital
-
-
-def parser_trimer(trimer_line):
-	"""
-	function of parser for trimer information
-
-	Args:
-		trimer_line (str): trimer line
-
-	Returns:
-		list: trimer information
-	"""
-	trimer_ijk = parser_split_line_by_length(trimer_line[0 : 15], 5, "int")
-	trimer_energy = parser_split_line_by_length(trimer_line[15 : 135], 24, "float")
-	return trimer_ijk + trimer_energy
-
-
-def parser_tetramer(tetramer_line):
-	"""
-	function of parser for tetramer information
-
-	Args:
-		tetramer_line (str): trimer line
-
-	Returns:
-		list: tetramer information
-	"""
-	tetramer_ijk = parser_split_line_by_length(tetramer_line[0 : 20], 5, "int")
-	tetramer_energy = parser_split_line_by_length(tetramer_line[20 : 140], 24, "float")
-	return tetramer_ijk + tetramer_energy
+	input_file, offset, line_length, line_start, n_line, columns, handle = task
+	with SharedArray(None, handle=handle) as shared, open(input_file, "rb") as obj_input:
+		for start in range(line_start, line_start + n_line, BLOCK_LINES):
+			end = min(start + BLOCK_LINES, line_start + n_line)
+			table = read_fixed_length(obj_input, offset + (start - line_start) * line_length, line_length, end - start)
+			if table is None:
+				return False
+			for idx, values in enumerate(decode_lines(table, columns)):
+				shared.values[idx, start : end] = values
+	return True
 
 
 
 # =============== class =============== #
 class Fragment:
-	def __init__(self, fragment_number:int):
+	# フラグメント数だけ生成されるため、属性を固定してメモリを抑える (原子情報は親 (FileCpf) の配列から引く)
+	__slots__ = ["_fragment_number", "_parent", "_index", "_electron", "_bond_info", "_neighbor_info", "_dipole_info", "_monomer_info"]
+
+	def __init__(self, fragment_number:int, parent, index:int):
 		self._fragment_number = fragment_number
-		self._structure_info = []
+		self._parent = parent
+		self._index = index
 		self._electron = None
 		self._bond_info = []
-		self._neighbor_info = {}
+		self._neighbor_info = None
 		self._dipole_info = []
 		self._monomer_info = []
 
-		self._fragment_name = ""
-		self._chain_name = ""
-		self._residue_number = ""
-		self._residue_name = ""
-		self._charge = 0.0
-
-		self._distances = {}
-		self._info_IFIE = {}
-
 	@property
 	def number(self):
 		return self._fragment_number
 
+	@property
+	def index(self):
+		return self._index
+
 	@property
 	def structure_info(self):
-		return self._structure_info
+		return self._parent._get_structure_rows([self._index])
 
 	@property
 	def atoms(self):
-		return [v[0] for v in self._structure_info]
+		return self._parent.get_fragment_atom(self._index + 1)
 
 	@property
 	def electron(self):
@@ -271,6 +186,8 @@ class Fragment:
 
 	@property
 	def neighbor(self):
+		if self._neighbor_info is None:
+			return {}
 		return self._neighbor_info
 
 	@property
@@ -283,65 +200,23 @@ class Fragment:
 
 	@property
 	def name(self):
-		self.__determine_property()
-		return self._fragment_name
+		return self._parent.get_fragment_property("name", self._index + 1)
 
 	@property
 	def chain_name(self):
-		self.__determine_property()
-		return self._chain_name
+		return self._parent.get_fragment_property("chain", self._index + 1)
 
 	@property
 	def residue_number(self):
-		self.__determine_property()
-		return self._residue_number
+		return self._parent.get_fragment_property("residue_number", self._index + 1)
 
 	@property
 	def residue_name(self):
-		self.__determine_property()
-		return self._residue_name
+		return self._parent.get_fragment_property("residue_name", self._index + 1)
 
 	@property
 	def charge(self):
-		self.__determine_property()
-		return self._charge
-
-
-	def __determine_property(self):
-		"""
-		複数の原子情報から特定の名前を決定するメソッド
-
-		Returns:
-			None
-		"""
-		if self._fragment_name == "":
-			list_fragment_name = ["{0}{1}".format(v[3], v[4]) for v in self._structure_info]
-			self._fragment_name = sorted(collections.Counter(list_fragment_name).items(), key = lambda x : x[1], reverse = True)[0][0]
-
-			list_chain_name = [v[15] for v in self._structure_info]
-			self._chain_name = sorted(collections.Counter(list_chain_name).items(), key = lambda x : x[1], reverse = True)[0][0]
-
-			list_residue_name = [v[3] for v in self._structure_info]
-			self._residue_name = sorted(collections.Counter(list_residue_name).items(), key = lambda x : x[1], reverse = True)[0][0]
-
-			list_residue_number = [v[4] for v in self._structure_info]
-			self._residue_number = sorted(collections.Counter(list_residue_number).items(), key = lambda x : x[1], reverse = True)[0][0]
-
-			self._charge = sum([v[9] for v in self._structure_info])
-
-
-	def append_atom(self, structure_info:list):
-		"""
-		構造の原子情報を追加するメソッド
-
-		Args:
-			structure_info (list): 構造情報リスト
-
-		Returns:
-			self
-		"""
-		self._structure_info.append(structure_info)
-		return self
+		return self._parent.get_fragment_charge(self._index + 1)
 
 
 	def set_electron(self, electron:int):
@@ -397,6 +272,8 @@ class Fragment:
 		Returns:
 			self
 		"""
+		if self._neighbor_info is None:
+			self._neighbor_info = {}
 		self._neighbor_info[fragment_number] = atom_number
 		return self
 
@@ -411,7 +288,7 @@ class Fragment:
 		Returns:
 			self
 		"""
-		self._dipole = dipole
+		self._dipole_info = dipole
 		return self
 
 
@@ -442,36 +319,6 @@ class Fragment:
 		return atom_number in self.atoms
 
 
-	def append_distance(self, obj_Fragment, distance):
-		"""
-		距離情報を追加するメソッド
-
-		Args:
-			obj_Fragment (obj_Fragment): 他の Fragment オブジェクト
-			distance (float): 距離
-
-		Returns:
-			self
-		"""
-		self._distances[obj_Fragment] = distance
-		return self
-
-
-	def append_IFIE(self, obj_Fragment, values):
-		"""
-		IFIE 情報を追加するメソッド
-
-		Args:
-			obj_Fragment (obj_Fragment): 他の Fragment オブジェクト
-			values (list): IFIE 情報
-
-		Returns:
-			self
-		"""
-		self._info_IFIE[obj_Fragment] = values
-		return self
-
-
 	def get_distance(self, obj_Fragment, unit="bohr"):
 		"""
 		距離を返すメソッド
@@ -483,10 +330,7 @@ class Fragment:
 		Returns:
 			float: 距離
 		"""
-		if unit == "angstrom":
-			return BOHR_RADIUS * self._distances[obj_Fragment]
-		else:
-			return self._distances[obj_Fragment]
+		return self._parent.extract_distance(self, obj_Fragment, unit)
 
 
 	def get_IFIE(self, obj_Fragment, no_data="zero", raw_data=False):
@@ -501,41 +345,19 @@ class Fragment:
 		Returns:
 			list: IFIE 情報
 		"""
-		# 接続フラグメントでない場合
-		if obj_Fragment in self._info_IFIE.keys():
-			# IFIE 情報がある場合
-			if self.get_distance(obj_Fragment) == 0:
-				# 接続フラグメントの場合
-				if raw_data:
-					# 生データを返す
-					return self._info_IFIE[obj_Fragment]
-				else:
-					# ゼロ埋めデータを返す
-					key = list(self._info_IFIE.keys())[0]
-					return [0.0 for _ in range(len(self._info_IFIE[key]))]
-
-			else:
-				# 問題のないデータ
-				return self._info_IFIE[obj_Fragment]
-
-		if no_data.lower() == "none":
-			# IFIE データがない場合で、None を返す
-			return None
-		elif no_data.lower() == "zero":
-			# IFIE データがない場合で、ゼロ埋めデータを返す
-			key = list(self._info_IFIE.keys())[0]
-			return [0.0 for _ in range(len(self._info_IFIE[key]))]
-		else:
-			sys.stderr.write("ERROR: undefined `no_data` value.\n")
-			sys.exit(1)
+		return self._parent.get_IFIE(self, obj_Fragment, no_data, raw_data)
 
 
-class FileCpf:
+class FileCpf(FMOReader):
 	""" CPF ファイルクラス """
-	def __init__(self, cpf_file = None):
+	def __init__(self, cpf_file = None, dtype="float64", memmap_dir=None, n_process=1):
 		self._path = None
+		self._dtype = dtype
+		self._memmap_dir = memmap_dir
+		self._n_process = max(1, n_process or 1)
 
 		self._version = None
+		self._layout = None
 		self._n_atom = 0
 		self._n_fragment = 0
 		self._obj_fragments = []
@@ -550,12 +372,21 @@ class FileCpf:
 			"whole": None
 		}
 		self._n_trimer = 0
-		self._trimers = []
+		self._trimers = None
 		self._n_tetramer = 0
-		self._tetramers = []
-		self._pair_list = []
+		self._tetramers = None
+		self._IFIE = None
+		self._distances = None
+		self._connected = None
+		self._n_pair_read = 0
+		self._min_distances = {}
 		self._structure_columns = STRUCTURE_COLUMNS
+		self._atom_arrays = {}
+		self._atom_offsets = np.zeros(1, dtype=np.int64)
+		self._fragment_properties = {}
+		self._fragment_charges = None
 		self._complete = False
+		self._read_stats = {"sections": {}, "parallel_sections": []}
 		self.__cache_table = {}
 
 		if cpf_file is not None:
@@ -566,6 +397,26 @@ class FileCpf:
 	def version(self):
 		return self._version
 
+	@property
+	def path(self):
+		return self._path
+
+	@property
+	def dtype(self):
+		return self._dtype
+
+	@property
+	def memmap_dir(self):
+		return self._memmap_dir
+
+	@property
+	def n_process(self):
+		return self._n_process
+
+	@property
+	def layout(self):
+		return self._layout
+
 	@property
 	def n_atom(self):
 		return self._n_atom
@@ -576,7 +427,7 @@ class FileCpf:
 
 	@property
 	def structure(self):
-		return [v.structure_info for v in self._obj_fragments]
+		return [self._get_structure_rows([idx]) for idx in range(len(self._obj_fragments))]
 
 	@property
 	def electrons(self):
@@ -624,7 +475,10 @@ class FileCpf:
 
 	@property
 	def trimers(self):
-		return self._trimers
+		# 行のリスト (値は配列で保持している)
+		if self._trimers is None:
+			return []
+		return self._layout.rows_from_columns("trimer", self._trimers)
 
 	@property
 	def n_tetramer(self):
@@ -632,7 +486,9 @@ class FileCpf:
 
 	@property
 	def tetramers(self):
-		return self._tetramers
+		if self._tetramers is None:
+			return []
+		return self._layout.rows_from_columns("tetramer", self._tetramers)
 
 	@property
 	def structure_columns(self):
@@ -646,207 +502,360 @@ class FileCpf:
 	def is_completed(self):
 		return self._complete
 
+	@property
+	def read_stats(self):
+		# セクションごとの所要時間 (秒)、並列に展開したセクション、(完全には) 読み込まなかったセクション
+		stats = dict(self._read_stats)
+		stats["skipped_sections"] = [section for section in READ_SECTIONS if section not in stats["sections"]]
+		return stats
 
-	def read(self, input_file):
+
+	def _iter_lines(self, obj_input):
 		"""
-		read .cpf file
+		`END` の行までの行を返すジェネレータ
 
 		Args:
+			obj_input (file): バイナリモードのファイルオブジェクト
+
+		Yields:
+			bytes: 行
+		"""
+		for line_val in obj_input:
+			if line_val.startswith(b"END"):
+				self._complete = True
+				return
+			yield line_val
+
+
+	def _decode_parallel(self, obj_input, input_file, n_line, columns, out=None):
+		"""
+		固定長の行からなるセクションをバイト範囲で分割し、プロセスプールで変換するメソッド
+		(各プロセスは共有メモリ上の配列に直接書き込むため、結果の受け渡しはない)
+
+		Args:
+			obj_input (file): セクションの先頭の位置にあるファイルオブジェクト (バイナリモード)
 			input_file (str): .cpf file path
+			n_line (int): セクションの行数
+			columns (list): `decode_lines()` 用の書式
+			out (ndarray, optional): 出力先 (カラム数, 行数) (Default: None (新しい配列))
 
 		Returns:
-			self
+			ndarray: (カラム数, 行数) (行が固定長でない場合は None で、ファイル位置は元に戻る)
 		"""
-		max_lines = [float('inf') for _ in range(20)]
-		max_lines[0] = 1
-		max_lines[1] = 2
+		offset = obj_input.tell()
+		line_length = len(obj_input.readline())
+		obj_input.seek(offset)
+		if line_length == 0:
+			return None
 
-		list_idx = 0
+		if out is None:
+			out = np.zeros((len(columns), n_line))
+		n_chunk_line = max(BLOCK_LINES, -(-n_line // (self._n_process * 4)))
+		with SharedArray((len(columns), n_line), out.dtype, self._memmap_dir) as shared:
+			tasks = [[input_file, offset + start * line_length, line_length, start, min(n_chunk_line, n_line - start), columns, shared.handle] for start in range(0, n_line, n_chunk_line)]
+			with concurrent.futures.ProcessPoolExecutor(self._n_process) as executor:
+				if not all(executor.map(decode_chunk, tasks)):
+					return None
+			for start in range(0, n_line, BLOCK_LINES * 16):
+				out[:, start : start + BLOCK_LINES * 16] = shared.values[:, start : start + BLOCK_LINES * 16]
 
-		pair_idx = 0
-		dq_idx = None
-		with open(input_file, "r") as obj_input:
-			for line_idx, line_val in enumerate(obj_input, 1):
-				if line_val.startswith("END"):
-					self._complete = True
+		obj_input.seek(offset + n_line * line_length)
+		return out
+
+
+	def read(self, input_file):
+		"""
+		read .cpf file (sections are read sequentially in one forward pass and decoded at once by the layout for the version;
+		with `n_process` > 1, large IFIE, trimer and tetramer sections of regular files are decoded in parallel)
+
+		Args:
+			input_file (str or file): .cpf file path, `-` (standard input) or binary file object (e.g. pipe)
+
+		Returns:
+			self
+		"""
+		self._path = get_input_path(input_file)
+		# ストリームは位置を戻せず、ワーカープロセスからも開けないため、並列に変換しない
+		parallel_file = input_file if is_regular_file(input_file) else None
+		self._read_stats = {"sections": {}, "parallel_sections": []}
+		time_start = [time.perf_counter()]
+
+		def mark(section):
+			# セクションの所要時間を記録する
+			time_now = time.perf_counter()
+			self._read_stats["sections"][section] = time_now - time_start[0]
+			time_start[0] = time_now
+
+		with open_input(input_file) as obj_input:
+			lines = self._iter_lines(obj_input)
+
+			# バージョン
+			line_val = next(lines, None)
+			if line_val is None:
+				return self
+			self._layout = find_layout(line_val.decode())
+			if self._layout is None:
+				sys.stderr.write("ERROR: unsupported version.\n")
+				sys.exit(1)
+			self._version = self._layout.version
+			self._structure_columns = self._layout.structure_columns
+
+			# 構造概要
+			line_val = next(lines, None)
+			if line_val is None:
+				return self
+			values = parser_split_line_by_length(line_val.decode().rstrip(), 5, "int")
+			self._n_atom = values[0]
+			self._n_fragment = values[1]
+			n_pair = self._n_fragment * (self._n_fragment - 1) // 2
+			self._IFIE = PairMatrix(self._n_fragment, self._layout.IFIE_columns, antisymmetric=["PIEDA-dq"], dtype=self._dtype, memmap_dir=self._memmap_dir)
+			self._distances = PairMatrix(self._n_fragment, ["distance"], dtype=self._dtype, fill_value=np.nan, memmap_dir=self._memmap_dir)
+			self._connected = None
+			mark("header")
+
+			# 原子情報 (カラムごとの配列で保持し、原子はフラグメントの現れた順にまとめる)
+			structure_lines = list(itertools.islice(lines, self._n_atom))
+			arrays = self._layout.decode_structure_arrays(structure_lines, self._structure_columns)
+			del structure_lines
+			atom_fragment, first = factorize(arrays["FragmentNumber"])
+			order = np.argsort(atom_fragment, kind="stable")
+			self._atom_arrays = {column: values[order] for column, values in arrays.items()}
+			self._atom_arrays["fragment"] = atom_fragment[order]
+			self._atom_offsets = np.concatenate([[0], np.cumsum(np.bincount(atom_fragment, minlength=len(first)))]).astype(np.int64)
+			self._fragment_number_list = arrays["FragmentNumber"][first].tolist()
+			self._obj_fragments = [Fragment(fragment_number, self, idx) for idx, fragment_number in enumerate(self._fragment_number_list)]
+			self._fragment_charges = None
+			self._determine_fragment_properties()
+
+			# 原子インデックス → 0-origin フラグメントインデックス (同じインデックスが複数ある場合は最初の原子)
+			dict_atom = dict(zip(arrays["Index"][::-1].tolist(), atom_fragment[::-1].tolist()))
+			del arrays
+			mark("structure")
+
+			# 電子情報・結合情報
+			n_line = int(np.ceil(self._n_fragment / self._layout.n_integer))
+			for obj_fragment, n_electron in zip(self._obj_fragments, self._layout.decode_integers(list(itertools.islice(lines, n_line)))):
+				obj_fragment.set_electron(n_electron)
+			for obj_fragment, n_bond in zip(self._obj_fragments, self._layout.decode_integers(list(itertools.islice(lines, n_line)))):
+				obj_fragment.set_bond(n_bond)
+			mark("electron")
+
+			# フラグメント間接続 (フラグメント間距離の行が現れるまで)
+			for line_val in lines:
+				values = line_val.split()
+				if len(values) != 2:
+					lines = itertools.chain([line_val], lines)
 					break
 
-				if max_lines[0] == line_idx:
-					# バージョン
-					version = line_val.strip()
-					for ref_ver in CPF_VERSION.keys():
-						if version.startswith(ref_ver):
-							version = ref_ver
-							break
-					else:
-						sys.stderr.write("ERROR: unsupported version.\n")
-						sys.exit(1)
-
-					self._version = version
-
-				elif max_lines[1] == line_idx:
-					# 構造概要
-					values = parser_split_line_by_length(line_val.rstrip(), 5, "int")
-					self._n_atom = values[0]
-					self._n_fragment = values[1]
-					self._pair_list = [[i, j] for i in range(1, self._n_fragment + 1) for j in range(1, self._n_fragment + 1) if i > j]
-					max_lines[2] = max_lines[1] + self._n_atom
-					max_lines[3] = max_lines[2] + np.ceil(self._n_fragment / CPF_FORMAT["ELECTRON"]["number"])
-					max_lines[4] = max_lines[3] + np.ceil(self._n_fragment / CPF_FORMAT["ELECTRON"]["number"])
-
-				elif max_lines[1] < line_idx <= max_lines[2]:
-					# 原子情報
-					structure_info = parser_structure(line_val)
-					fragment_number = structure_info[5]
-					if fragment_number not in self._fragment_number_list:
-						# フラグメントオブジェクトが存在しない場合
-						obj_fragment = Fragment(fragment_number)
-						obj_fragment.append_atom(structure_info)
-						self._fragment_number_list.append(fragment_number)
-						self._obj_fragments.append(obj_fragment)
-					else:
-						# フラグメントオブジェクトが存在する場合
-						list_idx_tmp = self._fragment_number_list.index(fragment_number)
-						obj_fragment = self._obj_fragments[list_idx_tmp]
-						obj_fragment.append_atom(structure_info)
-
-				elif max_lines[2] < line_idx <= max_lines[3]:
-					# 電子情報
-					electron_info = parser_electron_number(line_val)
-					for n_electron in electron_info:
-						obj_fragment = self._obj_fragments[list_idx]
-						obj_fragment.set_electron(n_electron)
-						list_idx += 1
-
-					if list_idx >= self._n_fragment:
-						list_idx = 0
-
-				elif max_lines[3] < line_idx <= max_lines[4]:
-					# 結合情報
-					bond_info = parser_fragment_bond(line_val)
-					for n_bond in bond_info:
-						obj_fragment = self._obj_fragments[list_idx]
-						obj_fragment.set_bond(n_bond)
-						list_idx += 1
-
-					if list_idx >= self._n_fragment:
-						list_idx = 0
-
-				elif max_lines[4] < line_idx and (max_lines[6] == float('inf') or line_idx <= max_lines[6]):
-					values = line_val.strip().split()
-					if len(values) == 2:
-						# フラグメント間接続
-						values = [int(v) for v in values]
-						fragment_info = [int(v) - 1 for v in values]
-						if fragment_info[0] < 0 or fragment_info[1] < 0:
-							sys.stderr.write("ERROR: Unexpected case at fragments `{0[0]}` and `{0[1]}`.\n".format(fragment_info))
-							sys.exit(1)
-
-						obj_fragments = [obj_fragment for atom_number in values for obj_fragment in self._obj_fragments if obj_fragment.has_atom(atom_number)]
-						obj_fragments[0].append_neighbor(obj_fragments[1].number, values[1])
-						obj_fragments[1].append_neighbor(obj_fragments[0].number, values[0])
-
-					elif len(values) == 3:
-						# フラグメント間距離
-						values = [v for v in line_val.strip().split()]
-						values[0] = int(values[0])
-						values[1] = int(values[1])
-						values[2] = float(values[2])
-						self._obj_fragments[values[0] - 1].append_distance(self._obj_fragments[values[1] - 1], values[2])
-						self._obj_fragments[values[1] - 1].append_distance(self._obj_fragments[values[0] - 1], values[2])
-
-						if max_lines[5] == float('inf'):
-							max_lines[5] = line_idx - 1
-							max_lines[6] = max_lines[5] + int(self._n_fragment * (self._n_fragment - 1) / 2)
-							max_lines[7] = max_lines[6] + self._n_fragment
-							max_lines[7 : 14] = [i for i in range(max_lines[7], max_lines[7] + 8)]
-							max_lines[15] = max_lines[14] + self._n_fragment
-							max_lines[16] = max_lines[15] + int(self._n_fragment * (self._n_fragment - 1) / 2)
-							max_lines[17] = max_lines[16] + 1
-
-				elif max_lines[6] < line_idx <= max_lines[7]:
-					# 双極子モーメント
-					list_dmoment = []
-					try:
-						list_dmoment = [float(v) for v in line_val.strip().split()]
-					except ValueError:
-						break
-					self._obj_fragments[list_idx].set_dipole_info(list_dmoment)
-					list_idx += 1
-					if list_idx >= self._n_fragment:
-						list_idx = 0
-
-				elif max_lines[8] == line_idx:
-					# 基底関数
-					self._basis_set = line_val.strip()
-
-				elif max_lines[9] == line_idx:
-					# 電子状態
-					self._stat = line_val.strip()
-
-				elif max_lines[10] == line_idx:
-					# 手法
-					self._method = line_val.strip()
-
-				elif max_lines[11] == line_idx:
-					# 近似
-					self._approx = line_val.strip().split()
-
-				elif max_lines[12] == line_idx:
-					# 核反発エネルギー
-					self._energy_total["repulsion"] = float(line_val.strip())
-
-				elif max_lines[13] == line_idx:
-					# 全電子エネルギー
-					self._energy_total["electron"] = float(line_val.strip())
-
-				elif max_lines[14] == line_idx:
-					# 全エネルギー
-					self._energy_total["whole"] = float(line_val.strip())
-
-				elif max_lines[14] < line_idx <= max_lines[15]:
-					# モノマー
-					self._obj_fragments[list_idx].set_monomer_info(parser_monomer(line_val))
-					list_idx += 1
-					if list_idx >= self._n_fragment:
-						list_idx = 0
-
-				elif max_lines[15] < line_idx <= max_lines[16]:
-					# IFIE
-					info_IFIE = parser_split_line_by_length(line_val.rstrip(), 24, "float")
-					obj_fragment1 = self._obj_fragments[self._pair_list[pair_idx][0] - 1]
-					obj_fragment2 = self._obj_fragments[self._pair_list[pair_idx][1] - 1]
-					if dq_idx is None:
-						if "PIEDA-dq" in IFIE_FORMAT[self.version]:
-							dq_idx = IFIE_FORMAT[self.version].index("PIEDA-dq")
-						else:
-							dq_idx = -1
-					info_IFIE_mirror = copy.deepcopy(info_IFIE)
-					if dq_idx >= 0:
-						# dq の反転
-						info_IFIE_mirror[dq_idx] = -1 * info_IFIE_mirror[dq_idx]
-					obj_fragment1.append_IFIE(obj_fragment2, info_IFIE_mirror)
-					obj_fragment2.append_IFIE(obj_fragment1, info_IFIE)
-					pair_idx += 1
-
-				elif max_lines[17] == line_idx:
-					# n_trimer
-					self._n_trimer = int(line_val.strip())
-					max_lines[18] = max_lines[17] + (self._n_trimer * (self._n_trimer - 1) * (self._n_trimer - 2) / (3 * 2))
-					max_lines[19] = max_lines[18] + 1
-
-				elif max_lines[17] < line_idx <= max_lines[18]:
-					# trimer data
-					self._trimers.append(parser_trimer(line_val))
-
-				elif max_lines[19] == line_idx:
-					# n_tetramer
-					self._n_tetramer = int(line_val.strip())
-					max_lines[20] = max_lines[19] + (self._n_tetramer * (self._n_tetramer - 1) * (self._n_tetramer - 2) / (4 * 3 * 2))
-
-				elif max_lines[19] < line_idx <= max_lines[20]:
-					# tetramer
-					self._tetramers.append(parser_tetramer(line_val))
+				values = [int(v) for v in values]
+				fragment_info = [int(v) - 1 for v in values]
+				if fragment_info[0] < 0 or fragment_info[1] < 0 or values[0] not in dict_atom or values[1] not in dict_atom:
+					sys.stderr.write("ERROR: Unexpected case at fragments `{0[0]}` and `{0[1]}`.\n".format(fragment_info))
+					sys.exit(1)
+
+				obj_fragments = [self._obj_fragments[dict_atom[atom_number]] for atom_number in values]
+				obj_fragments[0].append_neighbor(obj_fragments[1].number, values[1])
+				obj_fragments[1].append_neighbor(obj_fragments[0].number, values[0])
+			mark("connection")
+
+			# フラグメント間距離
+			n_read = 0
+			while n_read < n_pair:
+				block = list(itertools.islice(lines, min(BLOCK_LINES, n_pair - n_read)))
+				if len(block) == 0:
+					break
+				rows, cols, distances = self._layout.decode_distance(block)
+				self._distances.set_pairs(rows, cols, [distances])
+				n_read += len(block)
+			if n_read == n_pair:
+				mark("distance")
+
+			# 双極子モーメント (ファイルが途中で終わる場合は IFIE セクションでエラーにする)
+			for obj_fragment in self._obj_fragments:
+				line_val = next(lines, None)
+				if line_val is None:
+					break
+				try:
+					list_dmoment = [float(v) for v in line_val.split()]
+				except ValueError:
+					return self
+				obj_fragment.set_dipole_info(list_dmoment)
+			mark("dipole")
+
+			# 基底関数、電子状態、手法、近似、核反発エネルギー、全電子エネルギー、全エネルギー
+			values = [v.decode().strip() for v in itertools.islice(lines, 7)]
+			values += [None for _ in range(7 - len(values))]
+			self._basis_set, self._stat, self._method = values[0 : 3]
+			if values[3] is not None:
+				self._approx = values[3].split()
+			for key, value in zip(["repulsion", "electron", "whole"], values[4 : 7]):
+				if value is not None:
+					self._energy_total[key] = float(value)
+			if values[-1] is not None:
+				mark("condition")
+
+			# モノマー
+			for obj_fragment, monomer_info in zip(self._obj_fragments, self._layout.decode_monomer(list(itertools.islice(lines, self._n_fragment)))):
+				obj_fragment.set_monomer_info(monomer_info)
+			mark("monomer")
+
+			# IFIE
+			# IFIE セクションのペア順 ((2,1), (3,1), (3,2), ...) はパック配列の順と一致するため、ブロックごとにまとめて格納する
+			if self._n_process > 1 and n_pair > BLOCK_LINES and parallel_file is not None:
+				if self._decode_parallel(obj_input, parallel_file, n_pair, self._layout.numeric_decoder("IFIE"), self._IFIE.values) is not None:
+					self._n_pair_read = n_pair
+					self._read_stats["parallel_sections"].append("IFIE")
+			while self._n_pair_read < n_pair:
+				block = list(itertools.islice(lines, min(BLOCK_LINES, n_pair - self._n_pair_read)))
+				if len(block) == 0:
+					# 足りないペアを 0 として出力しないよう、ヘッダのフラグメント数に満たない場合は終了する
+					sys.stderr.write("ERROR: IFIE section is truncated ({0} of {1} fragment pairs) in {2}.\n".format(self._n_pair_read, n_pair, self._path))
+					sys.exit(1)
+				self._IFIE.values[:, self._n_pair_read : self._n_pair_read + len(block)] = self._layout.decode_IFIE(block)
+				self._n_pair_read += len(block)
+			mark("IFIE")
+
+			# n_trimer, trimer data
+			line_val = next(lines, None)
+			if line_val is None:
+				return self
+			self._n_trimer = int(line_val.strip())
+			n_line = self._n_trimer * (self._n_trimer - 1) * (self._n_trimer - 2) // (3 * 2)
+			self._trimers = self._read_multimer(obj_input, lines, parallel_file, "trimer", n_line)
+			if self._trimers.shape[1] == n_line:
+				mark("trimer")
+
+			# n_tetramer, tetramer
+			line_val = next(lines, None)
+			if line_val is None:
+				return self
+			self._n_tetramer = int(line_val.strip())
+			n_line = self._n_tetramer * (self._n_tetramer - 1) * (self._n_tetramer - 2) // (4 * 3 * 2)
+			self._tetramers = self._read_multimer(obj_input, lines, parallel_file, "tetramer", n_line)
+			if self._tetramers.shape[1] == n_line:
+				mark("tetramer")
+
+			# END まで読み進める
+			for _ in lines:
+				pass
+
+		return self
+
+
+	def _read_multimer(self, obj_input, lines, input_file, section, n_line):
+		"""
+		トリマー・テトラマーセクションを読み込むメソッド (行のブロックごとに配列に変換する)
+
+		Args:
+			obj_input (file): ファイルオブジェクト (バイナリモード)
+			lines (generator): `obj_input` の行のジェネレータ
+			input_file (str): .cpf file path for parallel decoding (None for stream)
+			section (str): `trimer` or `tetramer`
+			n_line (int): セクションの行数
+
+		Returns:
+			ndarray: (カラム数, 読み込めた行数)
+		"""
+		columns = self._layout.numeric_decoder(section)
+		if self._n_process > 1 and n_line > BLOCK_LINES and columns is not None and input_file is not None:
+			values = self._decode_parallel(obj_input, input_file, n_line, columns)
+			if values is not None:
+				self._read_stats["parallel_sections"].append(section)
+				return values
+
+		values = np.zeros((len(columns), n_line))
+		n_read = 0
+		while n_read < n_line:
+			block = list(itertools.islice(lines, min(BLOCK_LINES, n_line - n_read)))
+			if len(block) == 0:
+				break
+			values[:, n_read : n_read + len(block)] = self._layout.decode_multimer(section, block)
+			n_read += len(block)
+		return values[:, :n_read]
+
+
+	def get_multimer_terms(self, section, unit="kcal/mol"):
+		"""
+		トリマー・テトラマーの項 (多体補正エネルギー) を配列で返すメソッド
+
+		Args:
+			section (str): `trimer` or `tetramer`
+			unit (str, optional): "a.u." or "kcal/mol" (Default: "kcal/mol")
+
+		Returns:
+			list: [0-origin フラグメントインデックス (ndarray; (項数, 3 or 4)), エネルギー (ndarray; (項数, len(MULTIMER_COLUMNS)))]
+		"""
+		if section not in MULTIMER_ORDER:
+			sys.stderr.write("ERROR: undefined section ({0}).\n".format(section))
+			sys.exit(1)
+		order = MULTIMER_ORDER[section]
+		values = self._trimers if section == "trimer" else self._tetramers
+		if values is None:
+			return [np.zeros((0, order), dtype=np.int64), np.zeros((0, len(MULTIMER_COLUMNS)))]
+
+		index = values[:order].T.astype(np.int64) - 1
+		energies = values[order:].T.copy()
+		if unit == "kcal/mol":
+			energies *= AU_TO_KCAL
+		return [index, energies]
+
+
+	def _determine_fragment_properties(self):
+		"""
+		全フラグメントの名前・鎖・残基を原子情報の多数決でまとめて決定するメソッド (同数の場合はフラグメント内で先に現れた値)
+
+		Returns:
+			self
+		"""
+		atom_fragment = self._atom_arrays["fragment"]
+		residue_names = self._atom_arrays["ResidueName"]
+		residue_numbers = self._atom_arrays["ResidueNumber"]
+		chains = self._atom_arrays["ChainID"]
+		names = np.char.add(residue_names.astype(str), residue_numbers.astype(str))
+
+		self._fragment_properties = {}
+		for key, array in [["name", names], ["chain", chains], ["residue_name", residue_names], ["residue_number", residue_numbers]]:
+			selected = group_mode(atom_fragment, self._n_fragment, array)
+			self._fragment_properties[key] = array[selected].tolist()
+		return self
+
+
+	def get_fragment_property(self, key, frag_idx=None):
+		"""
+		フラグメントの名前・鎖・残基を返すメソッド
+
+		Args:
+			key (str): `name`, `chain`, `residue_name` or `residue_number`
+			frag_idx (int, optional): フラグメントインデックス (Default: None)
+
+		Returns:
+			str or int or list
+		"""
+		if key not in self._fragment_properties:
+			sys.stderr.write("ERROR: undefined fragment property ({0}).\n".format(key))
+			sys.exit(1)
+		list_value = self._fragment_properties[key]
+		if frag_idx is not None:
+			return list_value[frag_idx - 1]
+		else:
+			return list(list_value)
+
+
+	def _get_structure_rows(self, index=None):
+		"""
+		構造セクションの原子情報を行のリストで返すメソッド (カラムは `structure_columns` の順)
+
+		Args:
+			index (list, optional): 0-origin フラグメントインデックス (Default: None (all))
+
+		Returns:
+			list: [[値, ...], ...]
+		"""
+		if index is None:
+			atom_idx = slice(None)
+		else:
+			atom_idx = np.concatenate([np.arange(self._atom_offsets[idx], self._atom_offsets[idx + 1]) for idx in index] + [np.zeros(0, dtype=np.int64)])
+		return [list(row) for row in zip(*[self._atom_arrays[column][atom_idx].tolist() for column in self._structure_columns])]
 
 
 	def get_structure_list(self, column_name):
@@ -859,13 +868,75 @@ class FileCpf:
 		Returns:
 			list: structure information
 		"""
-		target_idx = None
-		if column_name in self._structure_columns:
-			target_idx = self._structure_columns.index(column_name)
-		else:
+		if column_name not in self._structure_columns:
 			sys.stderr.write("ERROR: undefined column name.\n")
 			sys.exit(1)
-		return [v[target_idx] for obj_fragment in self._obj_fragments for v in obj_fragment.structure_info]
+		return self._atom_arrays[column_name].tolist()
+
+
+	def _get_fragment_index(self, fragment):
+		"""
+		フラグメント番号か Fragment オブジェクトから 0-origin のインデックスを返すメソッド
+
+		Args:
+			fragment (int or obj_Fragment): フラグメント番号か、Fragment オブジェクト
+
+		Returns:
+			int
+		"""
+		if isinstance(fragment, Fragment):
+			return fragment.index
+		return fragment - 1
+
+
+	def _get_connected_mask(self):
+		"""
+		接続フラグメント (距離 0) ペアの真偽値パック配列を返すメソッド
+
+		Returns:
+			ndarray
+		"""
+		if self._connected is None:
+			# 出力を並行して書き込む場合に作成途中の配列が使われないよう、完成してから保持する
+			distances = self._distances.component("distance")
+			connected = create_array(len(distances), bool, memmap_dir=self._memmap_dir)
+			for start in range(0, len(distances), BLOCK_LINES * 16):
+				connected[start : start + BLOCK_LINES * 16] = distances[start : start + BLOCK_LINES * 16] == 0
+			self._connected = connected
+		return self._connected
+
+
+	def get_IFIE(self, fragment1, fragment2, no_data="zero", raw_data=False):
+		"""
+		フラグメント 1 からみたフラグメント 2 との IFIE 情報を返すメソッド
+
+		Args:
+			fragment1 (int or obj_Fragment): フラグメント番号か、Fragment オブジェクト
+			fragment2 (int or obj_Fragment): フラグメント番号か、Fragment オブジェクト
+			no_data (str): IFIE データがない場合の値 (`zero` (zero-padding data) or `none` (None)) (Default: `zero`)
+			raw_data (bool): 接続フラグメントの場合、エネルギーの生データにするか (Default: False)
+
+		Returns:
+			list: IFIE 情報
+		"""
+		i = self._get_fragment_index(fragment1)
+		j = self._get_fragment_index(fragment2)
+		if i != j and pair_index(i, j) < self._n_pair_read:
+			# IFIE 情報がある場合
+			if not raw_data and self._distances.get_pair(i, j)[0] == 0:
+				# 接続フラグメントの場合はゼロ埋めデータを返す
+				return [0.0 for _ in self._IFIE.components]
+			return self._IFIE.get_pair(i, j)
+
+		if no_data.lower() == "none":
+			# IFIE データがない場合で、None を返す
+			return None
+		elif no_data.lower() == "zero":
+			# IFIE データがない場合で、ゼロ埋めデータを返す
+			return [0.0 for _ in self._IFIE.components]
+		else:
+			sys.stderr.write("ERROR: undefined `no_data` value.\n")
+			sys.exit(1)
 
 
 	def extract_distance(self, fragment1, fragment2, unit="bohr"):
@@ -884,62 +955,119 @@ class FileCpf:
 		if fragment1 == fragment2:
 			return 0.0
 
-		obj_fragment1 = fragment1
-		if isinstance(fragment1, int):
-			obj_fragment1 = self._obj_fragments[fragment1 - 1]
-		obj_fragment2 = fragment2
-		if isinstance(fragment2, int):
-			obj_fragment2 = self._obj_fragments[fragment2 - 1]
-
-		distance = obj_fragment1.get_distance(obj_fragment2)
+		distance = self._distances.get_pair(self._get_fragment_index(fragment1), self._get_fragment_index(fragment2))[0]
 		if unit == "angstrom":
 			return BOHR_RADIUS * distance
 		else:
 			return distance
 
 
-	def extract_IFIE_energy(self, fragment, unit="a.u."):
+	def get_coordinates(self):
+		"""
+		原子座標を返すメソッド
+
+		Returns:
+			ndarray: (原子数, 3)
+		"""
+		if len(self._atom_arrays) == 0:
+			return np.zeros((0, 3), dtype=np.float64)
+		return np.column_stack([self._atom_arrays[column] for column in ["CoordinateX", "CoordinateY", "CoordinateZ"]]).astype(np.float64)
+
+
+	def get_atom_fragment_index(self):
+		"""
+		各原子が属するフラグメントの 0-origin インデックスを返すメソッド (`get_coordinates()` と同じ順)
+
+		Returns:
+			ndarray
+		"""
+		return self._atom_arrays.get("fragment", np.zeros(0, dtype=np.int64)).copy()
+
+
+	def _get_min_distances(self, cutoff=None):
+		"""
+		座標から計算したフラグメント間の最短原子間距離 (Å) を返すメソッド (カットオフごとに保持する)
+
+		Args:
+			cutoff (float, optional): カットオフ距離 (Å); カットオフより遠いペアは inf (Default: None (全ペア))
+
+		Returns:
+			PairMatrix
+		"""
+		if cutoff not in self._min_distances:
+			store = PairMatrix(self._n_fragment, ["min_distance"], dtype=self._dtype, memmap_dir=self._memmap_dir)
+			min_distance_packed(self.get_coordinates(), self.get_atom_fragment_index(), self._n_fragment, cutoff, out=store.values[0])
+			self._min_distances[cutoff] = store
+		return self._min_distances[cutoff]
+
+
+	def get_neighbor_list(self, cutoff, source="coordinates"):
+		"""
+		カットオフ内のフラグメントペアの近接リストを返すメソッド
+
+		Args:
+			cutoff (float): カットオフ距離 (Å) (None の場合は全ペア)
+			source (str, optional): `coordinates` (原子座標から計算した最短原子間距離) or `distance` (距離セクション) (Default: "coordinates")
+
+		Returns:
+			NeighborList
+		"""
+		if source == "coordinates" and cutoff is None:
+			return NeighborList.from_packed(self._n_fragment, self._get_min_distances().component("min_distance"), np.inf)
+		elif source == "coordinates":
+			pair_idx, distances = min_distance_pairs(self.get_coordinates(), self.get_atom_fragment_index(), cutoff)
+			return NeighborList(self._n_fragment, pair_idx, distances, cutoff)
+		elif source == "distance":
+			return NeighborList.from_packed(self._n_fragment, self._distances.component("distance").astype(np.float64) * BOHR_RADIUS, np.inf if cutoff is None else cutoff)
+		else:
+			sys.stderr.write("ERROR: undefined source of distance ({0}).\n".format(source))
+			sys.exit(1)
+
+
+	def extract_IFIE_energy(self, fragment, unit="a.u.", neighbor_list=None):
 		"""
 		method for getting IFIE energy
 
 		Args:
 			fragment (int or obj_Fragment): フラグメント番号か、Fragment オブジェクト
 			unit (str): "a.u." or "kcal/mol" (Default: "a.u.")
+			neighbor_list (NeighborList, optional): 近接リスト (指定した場合は近接フラグメントのみ) (Default: None)
 
 		Returns:
 			list: [[fragment_pair_index(int), energy, ...], ...]
 		"""
 		# フラグメント番号が一致するリストのリストのインデックスを取得する [[list_index, counter_fragment_number], ...]
-		obj_fragment = fragment
-		if isinstance(fragment, int):
-			obj_fragment = self._obj_fragments[fragment - 1]
-
-		values = [[obj_fragment_other.number] + obj_fragment.get_IFIE(obj_fragment_other, no_data="none") for obj_fragment_other in self._obj_fragments if obj_fragment.get_IFIE(obj_fragment_other, no_data="none") is not None]
-		if unit == "a.u.":
-			return values
-		elif unit == "kcal/mol":
-			index_dq = IFIE_FORMAT[self._version].index("PIEDA-dq") + 1
-			return [[v2 if i == index_dq else v2 * AU_TO_KCAL for i, v2 in enumerate(v1)] for v1 in values]
+		i = self._get_fragment_index(fragment)
+		if neighbor_list is None:
+			cols = np.arange(self._n_fragment)
 		else:
+			cols = neighbor_list.neighbors(i)
+		cols = cols[(cols != i) & (pair_index(i, cols) < self._n_pair_read)]
+		rows = np.full(len(cols), i)
+
+		values = self._IFIE.gather(rows, cols)
+		values[:, self._get_connected_mask()[pair_index(rows, cols)]] = 0.0
+		if unit == "kcal/mol":
+			factor = np.full((len(self._IFIE.components), 1), AU_TO_KCAL)
+			if self._layout.has_component("PIEDA-dq"):
+				factor[self._layout.component_index("PIEDA-dq")] = 1
+			values = values * factor
+		elif unit != "a.u.":
 			sys.stderr.write("ERROR: undefined unit.\n")
 			sys.exit(1)
 
+		numbers = [self._obj_fragments[j].number for j in cols]
+		return [[number] + value for number, value in zip(numbers, values.T.tolist())]
 
-	def get_label(self, frag_idx=None):
-		"""
-		ラベルを返すメソッド (cpf2csv 用メソッド)
 
-		Args:
-			frag_idx (int, optional): フラグメントインデックス (Default: None)
+	def _get_labels(self):
+		"""
+		フラグメントラベル (フラグメント番号) のリストを返すメソッド
 
 		Returns:
-			str: ラベル
+			list
 		"""
-		list_fragment = [obj_fragment.number for obj_fragment in self._obj_fragments]
-		if frag_idx is not None:
-			return list_fragment[frag_idx - 1]
-		else:
-			return list_fragment
+		return self._fragment_number_list
 
 
 	def get_fragment_atom(self, frag_idx=None):
@@ -952,11 +1080,11 @@ class FileCpf:
 		Returns:
 			list: 構成原子のリスト
 		"""
-		list_fragment = [obj_fragment.atoms for obj_fragment in self._obj_fragments]
+		atoms = self._atom_arrays["Index"]
 		if frag_idx is not None:
-			return list_fragment[frag_idx - 1]
+			return atoms[self._atom_offsets[frag_idx - 1] : self._atom_offsets[frag_idx]].tolist()
 		else:
-			return list_fragment
+			return [atoms[start : end].tolist() for start, end in zip(self._atom_offsets[:-1], self._atom_offsets[1:])]
 
 
 	def get_atom_charge(self, atom_idx=None):
@@ -969,7 +1097,7 @@ class FileCpf:
 		Returns:
 			float or list: 原子電荷
 		"""
-		list_fragment = [[info[0], info[1].strip(), info[9]] for obj_fragment in self._obj_fragments for info in obj_fragment.structure_info]
+		list_fragment = [list(row) for row in zip(self._atom_arrays["Index"].tolist(), np.char.strip(self._atom_arrays["Element"].astype(str)).tolist(), self.get_atom_charges()[:, 0].tolist())]
 		if atom_idx is not None:
 			return list_fragment[atom_idx - 1]
 		else:
@@ -986,44 +1114,426 @@ class FileCpf:
 		Returns:
 			float or list: フラグメント電荷
 		"""
-		list_charge = [obj_fragment.charge for obj_fragment in self._obj_fragments]
+		if self._fragment_charges is None:
+			self._fragment_charges = group_sum(self.get_atom_charges(), self._atom_arrays["fragment"], self._n_fragment)[:, 0].tolist()
+		list_charge = self._fragment_charges
 		if frag_idx is not None:
 			return list_charge[frag_idx - 1]
 		else:
-			return list_charge
+			return list(list_charge)
 
 
-	def get_energy(self, energy_type="Total", frag_idx=None, unit="kcal/mol"):
+	def check_charge(self, level=None, schemes=None):
 		"""
-		IFIE エネルギーを返すメソッド (cpf2csv 用メソッド)
+		電荷の表の単位と電荷の種類が利用できるか確認するメソッド (利用できない場合は終了する)
+
+		Args:
+			level (str, optional): `atom`, `fragment` or `residue` (Default: None (確認しない))
+			schemes (list, optional): 電荷の種類 (`CHARGE_SCHEMES`) のリスト (Default: None (["HF_Mulliken"]))
+
+		Returns:
+			list: 電荷の種類のリスト
+		"""
+		if level is not None:
+			check_charge_level(level)
+		if schemes is None:
+			schemes = [DEFAULT_CHARGE_SCHEME]
+		for scheme in schemes:
+			if get_charge_column(scheme) not in self._atom_arrays:
+				sys.stderr.write("ERROR: {0} charge is not included in .cpf.\n".format(scheme))
+				sys.exit(1)
+		return schemes
+
+
+	def get_atom_charges(self, schemes=None):
+		"""
+		原子電荷を配列で返すメソッド (原子の順は `get_coordinates()` と同じ)
+
+		Args:
+			schemes (list, optional): 電荷の種類 (`CHARGE_SCHEMES`) のリスト (Default: None (["HF_Mulliken"]))
+
+		Returns:
+			ndarray: (原子数, 電荷の種類の数)
+		"""
+		schemes = self.check_charge(schemes=schemes)
+		columns = [self._atom_arrays[get_charge_column(scheme)] for scheme in schemes]
+		if len(columns) == 0:
+			return np.zeros((len(self._atom_arrays.get("fragment", [])), 0))
+		return np.column_stack(columns)
+
+
+	def get_charge_table(self, level="fragment", schemes=None, index=None):
+		"""
+		原子、フラグメント、残基ごとの電荷を表 (カラムごとの配列) として返すメソッド (フラグメント・残基の電荷は原子電荷の和)
+
+		Args:
+			level (str, optional): `atom`, `fragment` or `residue` (Default: "fragment")
+			schemes (list, optional): 電荷の種類 (`CHARGE_SCHEMES`) のリスト (Default: None (["HF_Mulliken"]))
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
+
+		Returns:
+			list: [カラム名のリスト, [ndarray, ...]]
+				(atom: fragment, atom, element, 電荷の種類ごとの電荷;
+				fragment: fragment, 電荷の種類ごとの電荷;
+				residue: chain, residue_number, residue_name, 電荷の種類ごとの電荷 (残基は最初に現れた順))
+		"""
+		schemes = self.check_charge(level, schemes)
+		charges = self.get_atom_charges(schemes)
+		atom_fragment = self._atom_arrays["fragment"]
+		selected = np.ones(self._n_fragment, dtype=bool)
+		if index is not None:
+			selected[:] = False
+			selected[np.asarray(index, dtype=np.int64)] = True
+		numbers = np.array(self._fragment_number_list, dtype=np.int64)
+
+		if level == "fragment":
+			frag_idx = np.flatnonzero(selected)
+			sums = group_sum(charges, atom_fragment, self._n_fragment)[frag_idx]
+			return [["fragment"] + list(schemes), [numbers[frag_idx]] + [sums[:, k] for k in range(len(schemes))]]
+
+		atom_idx = np.flatnonzero(selected[atom_fragment])
+		if level == "atom":
+			return [["fragment", "atom", "element"] + list(schemes), [numbers[atom_fragment[atom_idx]], self._atom_arrays["Index"][atom_idx], self._atom_arrays["Element"][atom_idx]] + [charges[atom_idx, k] for k in range(len(schemes))]]
+
+		# 残基 (鎖、残基番号、残基名の組) ごとに原子電荷を足し合わせる
+		chains = self._atom_arrays["ChainID"][atom_idx]
+		residue_numbers = self._atom_arrays["ResidueNumber"][atom_idx]
+		residue_names = self._atom_arrays["ResidueName"][atom_idx]
+		groups, first = factorize(chains, residue_numbers, residue_names)
+		sums = group_sum(charges[atom_idx], groups, len(first))
+		return [["chain", "residue_number", "residue_name"] + list(schemes), [chains[first], residue_numbers[first], residue_names[first]] + [sums[:, k] for k in range(len(schemes))]]
+
+
+	def get_fragment_table(self, index=None):
+		"""
+		フラグメントの情報を表として返すメソッド
+
+		Args:
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
+
+		Returns:
+			list: [カラム名のリスト, [[値, ...], ...]]
+		"""
+		if index is None:
+			index = range(self._n_fragment)
+		columns = ["fragment", "name", "residue_name", "residue_number", "chain", "charge", "electrons", "n_atom"]
+		properties = self._fragment_properties
+		charges = self.get_fragment_charge()
+		n_atoms = np.diff(self._atom_offsets).tolist()
+		rows = []
+		for idx in index:
+			rows.append([self._fragment_number_list[idx], properties["name"][idx].replace(" ", ""), properties["residue_name"][idx].strip(), properties["residue_number"][idx], properties["chain"][idx], charges[idx], self._obj_fragments[idx].electron, n_atoms[idx]])
+		return [columns, rows]
+
+
+	def get_atom_table(self, index=None):
+		"""
+		原子の情報 (構造セクション) を表として返すメソッド
+
+		Args:
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
+
+		Returns:
+			list: [カラム名のリスト (`structure_columns`), [[値, ...], ...]]
+		"""
+		rows = [[v.strip() if isinstance(v, str) else v for v in info] for info in self._get_structure_rows(index)]
+		return [list(self._structure_columns), rows]
+
+
+	def has_energy_type(self, energy_type):
+		"""
+		エネルギーの種類の値が IFIE セクションにあるかを返すメソッド
+
+		Args:
+			energy_type (str): `Total`, `ES`, `EX`, `CT`, `DI` or `Q`
+
+		Returns:
+			bool
+		"""
+		components, _ = self._get_energy_components(energy_type, "a.u.")
+		return all(self._layout.has_component(component) for component in components)
+
+
+	def get_pair_table(self, rows, cols):
+		"""
+		フラグメントペアの相互作用を表として返すメソッド
+		(エネルギーの種類ごとの値 (kcal/mol; Q は e) と IFIE セクションの全カラム (a.u.; 接続フラグメントは 0))
+
+		Args:
+			rows (ndarray): 0-origin 行インデックス
+			cols (ndarray): 0-origin 列インデックス (rows と同じ長さ)
+
+		Returns:
+			list: [カラム名のリスト, [ndarray, ...]]
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		connected = self._get_connected_mask()[pair_index(rows, cols)]
+		columns = ["connected"]
+		values = [connected.astype(np.int64)]
+		for energy_type in ["Total", "ES", "EX", "CT", "DI", "Q"]:
+			if self.has_energy_type(energy_type):
+				components, f = self._get_energy_components(energy_type, "kcal/mol")
+				columns.append(energy_type)
+				values.append(self._IFIE.sum_pairs(components, f, rows, cols, mask=self._get_connected_mask()))
+
+		raw = self._IFIE.gather(rows, cols)
+		raw[:, connected] = 0.0
+		columns.extend(self._IFIE.components)
+		values.extend(raw)
+		return [columns, values]
+
+
+	def get_pair_frame(self, backend="pandas", energy_types=None):
+		"""
+		全フラグメントペア (i < j) の相互作用を縦長の表 (DataFrame または Arrow Table) として返すメソッド
+		(IFIE セクションの全カラム (a.u.) と distance (bohr) は保持している配列をコピーせずに参照する; 接続フラグメントの値は生データのため `connected` で除く)
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+			energy_types (list, optional): 追加するエネルギーの種類 (`Total`, `ES`, `EX`, `CT`, `DI` or `Q`; kcal/mol, Q は e; 接続フラグメントは 0) (Default: None)
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: fragment_i, fragment_j, connected, distance, IFIE セクションのカラム, エネルギーの種類
+		"""
+		labels_i, labels_j = get_pair_labels(self.get_label())
+		columns = ["fragment_i", "fragment_j", "connected", "distance"] + list(self._IFIE.components)
+		values = [labels_i, labels_j, self._get_connected_mask(), self._distances.component("distance")] + list(self._IFIE.values)
+		for energy_type in energy_types or []:
+			components, f = self._get_energy_components(energy_type, "kcal/mol")
+			energies = np.zeros(self._IFIE.n_pair, dtype=np.float64)
+			for component in components:
+				energies += self._IFIE.component(component)
+			energies *= f
+			energies[self._get_connected_mask()] = 0.0
+			columns.append(energy_type)
+			values.append(energies)
+		return create_frame(columns, values, backend)
+
+
+	def get_atom_frame(self, backend="pandas"):
+		"""
+		原子の情報 (構造セクション) を表 (DataFrame または Arrow Table) として返すメソッド (数値のカラムはコピーせずに参照する; 原子の順はフラグメントごと)
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: `structure_columns` (Element, AtomName, ResidueName, ChainID はカテゴリ)
+		"""
+		columns = [column for column in self._structure_columns if column in self._atom_arrays]
+		values = [self._atom_arrays[column] for column in columns]
+		return create_frame(columns, values, backend, categorical=["Element", "AtomName", "ResidueName", "ChainID"])
+
+
+	def get_fragment_frame(self, backend="pandas"):
+		"""
+		フラグメントの情報を表 (DataFrame または Arrow Table) として返すメソッド
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: `get_fragment_table()` のカラム (residue_name, chain はカテゴリ)
+		"""
+		columns, rows = self.get_fragment_table()
+		values = [np.array([row[idx] for row in rows]) for idx in range(len(columns))]
+		return create_frame(columns, values, backend, categorical=["residue_name", "chain"])
+
+
+	def get_energy_matrix(self, energy_type="Total", rows=None, cols=None, unit="kcal/mol"):
+		"""
+		IFIE エネルギーの行列 (丸めなし) を返すメソッド
 
 		Args:
 			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
-			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (Default: None)
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
 			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol")
 
 		Returns:
-			list
+			ndarray
+		"""
+		components, f = self._get_energy_components(energy_type, unit)
+		return self._IFIE.expand(components, f, rows, cols, mask=self._get_connected_mask())
+
+
+	def get_energy_dense(self, energy_type="Total", out=None, unit="kcal/mol"):
+		"""
+		IFIE エネルギーの行列全体 (丸めなし) をパック配列を順に読んで展開するメソッド (out に np.memmap を渡すとディスク上に展開できる)
+
+		Args:
+			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
+			out (ndarray, optional): 出力先 (N, N) (Default: None (新しい配列))
+			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol")
+
+		Returns:
+			ndarray
+		"""
+		components, f = self._get_energy_components(energy_type, unit)
+		return self._IFIE.expand_all(components, f, self._get_connected_mask(), out)
+
+
+	def _get_energy_components(self, energy_type, unit):
+		"""
+		エネルギーの種類に対応する IFIE セクションのカラム名と係数を返すメソッド
+
+		Args:
+			energy_type (str): `Total`, `ES`, `EX`, `CT`, `DI` or `Q`
+			unit (str): "a.u." or "kcal/mol"
+
+		Returns:
+			list: [カラム名のリスト, 係数]
 		"""
 		f = 1
 		if unit == "kcal/mol":
 			f = AU_TO_KCAL
 
-		energy = None
+		components = None
 		if energy_type == "Total":
-			list_idx = [IFIE_FORMAT[self._version].index(ENERGY_TYPE[energy_name]) for energy_name in ["ES", "EX", "CT", "DI"]]
-			energy = np.array([[sum([obj_fragment1.get_IFIE(obj_fragment2)[idx_energy] for idx_energy in list_idx]) for obj_fragment2 in self._obj_fragments] for obj_fragment1 in self._obj_fragments])
-
-		else:
-			idx_energy = IFIE_FORMAT[self._version].index(ENERGY_TYPE[energy_type])
-			energy = np.array([[obj_fragment1.get_IFIE(obj_fragment2)[idx_energy] for obj_fragment2 in self._obj_fragments] for obj_fragment1 in self._obj_fragments])
+			components = [ENERGY_TYPE[energy_name] for energy_name in ["ES", "EX", "CT", "DI"]]
+		elif energy_type in ENERGY_TYPE:
+			components = [ENERGY_TYPE[energy_type]]
 			if energy_type == "Q":
 				f = 1
+		else:
+			sys.stderr.write("ERROR: undefined energy type ({0}).\n".format(energy_type))
+			sys.exit(1)
+		return [components, f]
+
+
+	def get_energy_pairs(self, energy_type, neighbor_list, unit="kcal/mol"):
+		"""
+		近接リストのペアについて IFIE エネルギー (丸めなし) を返すメソッド (密行列に展開しない)
+
+		Args:
+			energy_type (str): `Total`, `ES`, `EX`, `CT`, `DI` or `Q`
+			neighbor_list (NeighborList): 近接リスト
+			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol")
 
+		Returns:
+			ndarray: 行列要素 [rows[k]][cols[k]] の値 (rows, cols は近接リストの値)
+		"""
+		components, f = self._get_energy_components(energy_type, unit)
+		return self._IFIE.sum_pairs(components, f, neighbor_list.rows, neighbor_list.cols, mask=self._get_connected_mask())
+
+
+	def get_component_names(self):
+		"""
+		出力できる成分 (IFIE セクションのカラム名) のリストを返すメソッド
+
+		Returns:
+			list
+		"""
+		return list(self._IFIE.components)
+
+
+	def _get_component_weights(self, expressions, unit):
+		"""
+		成分の式に対する IFIE セクションのカラムの係数を返すメソッド (PIEDA-dq は単位変換しない)
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`; `component_func.parse_component()`)
+			unit (str): "a.u." or "kcal/mol"
+
+		Returns:
+			list: [ラベルのリスト, 係数 (ndarray; (式の数, カラム数))]
+		"""
+		columns = self.get_component_names()
+		factors = [AU_TO_KCAL if unit == "kcal/mol" and column != ENERGY_TYPE["Q"] else 1.0 for column in columns]
+		return get_component_weights(expressions, columns, factors)
+
+
+	def get_component_matrices(self, expressions, rows=None, cols=None, unit="kcal/mol"):
+		"""
+		成分 (IFIE セクションのカラムとその線形結合) の行列 (丸めなし) をまとめて返すメソッド (各カラムは 1 回だけ読む)
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`; e.g. `SCS-MP2-IFIE`, `BSSE=HF-IFIE-BSSE+MP2-IFIE-BSSE`)
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol"; PIEDA-dq は e)
+
+		Returns:
+			list: [ラベルのリスト, ndarray (式の数, len(rows), len(cols))]
+		"""
+		labels, weights = self._get_component_weights(expressions, unit)
+		return [labels, self._IFIE.expand_linear(weights, rows, cols, mask=self._get_connected_mask())]
+
+
+	def get_component_pairs(self, expressions, neighbor_list, unit="kcal/mol"):
+		"""
+		近接リストのペアについて成分の値 (丸めなし) をまとめて返すメソッド (密行列に展開しない)
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`)
+			neighbor_list (NeighborList): 近接リスト
+			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol"; PIEDA-dq は e)
+
+		Returns:
+			list: [ラベルのリスト, ndarray (式の数, ペア数)]
+		"""
+		labels, weights = self._get_component_weights(expressions, unit)
+		rows = np.asarray(neighbor_list.rows, dtype=np.int64)
+		cols = np.asarray(neighbor_list.cols, dtype=np.int64)
+		values = weights @ self._IFIE.gather(rows, cols)
+		values[:, self._get_connected_mask()[pair_index(rows, cols)]] = 0.0
+		return [labels, values]
+
+
+	def get_energy(self, energy_type="Total", frag_idx=None, unit="kcal/mol"):
+		"""
+		IFIE エネルギーを返すメソッド (cpf2csv 用メソッド)
+
+		Args:
+			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
+			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (Default: None)
+			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol")
+
+		Returns:
+			list
+		"""
 		if frag_idx is None:
-			return np.round(energy * f, DIGIT)
+			return np.round(self.get_energy_matrix(energy_type, unit=unit), DIGIT)
 		else:
-			return np.round((energy * f)[frag_idx[0] - 1][frag_idx[1] - 1], DIGIT)
+			energy = self.get_energy_matrix(energy_type, [frag_idx[0] - 1], [frag_idx[1] - 1], unit)
+			return np.round(energy[0][0], DIGIT)
+
+
+	def get_min_distance_matrix(self, rows=None, cols=None, unit="angstrom", cutoff=None):
+		"""
+		フラグメント間距離 (最短原子間距離) の行列 (丸めなし) を座標から計算して返すメソッド (距離セクションは使わない)
+
+		Args:
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+			unit (str): "bohr" or "angstrom" (Default: "angstrom")
+			cutoff (float, optional): カットオフ距離 (Å); カットオフより遠いペアは inf (Default: None (全ペア))
+
+		Returns:
+			ndarray
+		"""
+		factor = 1.0
+		if unit == "bohr":
+			factor = 1.0 / BOHR_RADIUS
+		return self._get_min_distances(cutoff).expand("min_distance", factor, rows, cols)
+
+
+	def get_min_distance_dense(self, out=None, unit="angstrom"):
+		"""
+		フラグメント間距離 (最短原子間距離) の行列全体 (丸めなし) を展開するメソッド (out に np.memmap を渡すとディスク上に展開できる)
+
+		Args:
+			out (ndarray, optional): 出力先 (N, N) (Default: None (新しい配列))
+			unit (str): "bohr" or "angstrom" (Default: "angstrom")
+
+		Returns:
+			ndarray
+		"""
+		factor = 1.0
+		if unit == "bohr":
+			factor = 1.0 / BOHR_RADIUS
+		return self._get_min_distances().expand_all("min_distance", factor, out=out)
 
 
 	def output_IFIE_format(self, fragment_number, column_list, unit="a.u."):
@@ -1039,107 +1549,114 @@ class FileCpf:
 			list: [[fragment_pair_index(int), energy, ...], ...]
 		"""
 		list_energy = self.extract_IFIE_energy(fragment_number, unit)
-		list_idx = [IFIE_FORMAT[self._version].index(v) for v in column_list]
+		list_idx = [self._layout.component_index(v) for v in column_list]
 		return [[v[0]] + [v[i + 1] for i in list_idx] for v in list_energy]
 
 
-	def output_IFIE_piedalog_style(self, fragment_number):
+	def get_piedalog_reports(self, fragments):
 		"""
-		IFIE の結果をフォーマットして出力するメソッド (piedalog フォーマット)
+		piedalog 形式の表を複数の対象フラグメントについてまとめて作成するメソッド (対象フラグメントの行をまとめて展開する)
 
 		Args:
-			fragment_number(int): 対象フラグメント
+			fragments (list): 対象フラグメント番号のリスト
 
 		Returns:
-			str
+			dict: {対象フラグメント番号: {カラム名 (`PIEDALOG_COLUMNS`): ndarray}} (相手フラグメントは IFIE がある全フラグメント)
+		"""
+		dict_index = {number: idx for idx, number in enumerate(self._fragment_number_list)}
+		for fragment_number in fragments:
+			if fragment_number not in dict_index:
+				sys.stderr.write("ERROR: fragment {0} is not found.\n".format(fragment_number))
+				sys.exit(1)
+		rows = np.array([dict_index[fragment_number] for fragment_number in fragments], dtype=np.int64)
+		cols = np.arange(self._n_fragment)
+
+		# 相手フラグメントの情報 (全フラグメント分を一度だけ作成する)
+		numbers = np.array(self._fragment_number_list)
+		chains = np.array(self._fragment_properties["chain"], dtype=object)
+		residue_numbers = np.array(self._fragment_properties["residue_number"], dtype=object)
+		residue_names = np.array(self._fragment_properties["residue_name"], dtype=object)
+		charges = np.round(np.array(self.get_fragment_charge())).astype(np.int64)
+
+		# 対象フラグメントの行をまとめて展開する
+		energies = {energy_type: self.get_energy_matrix(energy_type, rows, cols) for energy_type in ["ES", "EX", "CT", "DI", "Q"]}
+		distances = self._distances.expand("distance", BOHR_RADIUS, rows, cols)
+		flag = (rows[:, np.newaxis] != cols[np.newaxis, :]) & (pair_index(rows[:, np.newaxis], cols[np.newaxis, :]) < self._n_pair_read)
+
+		reports = {}
+		for k, fragment_number in enumerate(fragments):
+			partner = np.flatnonzero(flag[k])
+			reports[fragment_number] = {
+				"frag_Num": numbers[partner],
+				"Chain": chains[partner],
+				"seq": residue_numbers[partner],
+				"RES": residue_names[partner],
+				"FCHARGE": charges[partner],
+				"MAINSIDE": np.full(len(partner), "MainSide", dtype=object),
+				"DIST": distances[k, partner],
+				"Total": energies["ES"][k, partner] + energies["EX"][k, partner] + energies["CT"][k, partner] + energies["DI"][k, partner],
+				"ES": energies["ES"][k, partner],
+				"EX": energies["EX"][k, partner],
+				"CT+mix": energies["CT"][k, partner],
+				"DI(MP2)": energies["DI"][k, partner],
+				"q(I=>J)": energies["Q"][k, partner],
+			}
+		return reports
+
+
+	def format_piedalog_report(self, report, digit=3):
 		"""
-		print("\t".join(["frag_Num", "Chain", "seq", "RES", "FCHARGE", "MAINSIDE", "DIST", "Total", "ES", "EX", "CT+mix", "DI(MP2)", "q(I=>J)"]))
-		for fragment_number_pair, values in enumerate(self.extract_IFIE_energy(fragment_number, "kcal/mol"), 1):
-			fragment_index_pair = self._fragment_number_list.index(fragment_number_pair)
-			obj_fragment = self._obj_fragments[fragment_index_pair]
-
-			energy_ES = values[IFIE_FORMAT[self._version].index("HF-ES") + 1]
-			energy_EX = values[IFIE_FORMAT[self._version].index("PIEDA-EX") + 1]
-			energy_CT = values[IFIE_FORMAT[self._version].index("PIEDA-CT") + 1]
-			energy_DI = values[IFIE_FORMAT[self._version].index("MP2-IFIE") + 1]
-			dq = values[IFIE_FORMAT[self._version].index("PIEDA-dq") + 1]
-
-			print("{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6}\t{7}\t{8}\t{9}\t{10}\t{11}\t{12}".format(
-				fragment_number_pair,
-				obj_fragment.chain_name,
-				obj_fragment.residue_number,
-				obj_fragment.residue_name,
-				int(round(obj_fragment.charge, 0)),
-				"MainSide",
-				round(self.extract_distance(fragment_number, fragment_number_pair, "angstrom"), 3),
-				round(energy_ES + energy_EX + energy_CT + energy_DI, 3),
-				round(energy_ES, 3),
-				round(energy_EX, 3),
-				round(energy_CT, 3),
-				round(energy_DI, 3),
-				round(dq, 3)
-			))
-
-
-	def output_energy(self, energy_type="Total", output_range=None):
-		"""
-		IFIE エネルギーを出力形式で返すメソッド
+		`get_piedalog_reports()` の表を piedalog 形式のテキスト (タブ区切り) にするメソッド
 
 		Args:
-			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
-			output_range (list, optional): 出力するラベルリスト (Default: None)
+			report (dict): {カラム名: ndarray}
+			digit (int, optional): 小数点以下の桁数 (Default: 3)
 
 		Returns:
-			list
+			str
 		"""
-		result = None
-		if energy_type == "Total":
-			result = (self.get_energy("Total"))
-		else:
-			result = self.get_energy(energy_type)
-
-		label = copy.deepcopy(self.get_label())
-		if output_range is not None:
-			delete_range = list(set(self.get_label()) - set(output_range))
-			for idx in reversed(sorted(delete_range)):
-				del(label[idx - 1])
-				result = np.delete(result, idx - 1, 0)
-				result = np.delete(result, idx - 1, 1)
-
-		result = result.tolist()
-		result = [[label[idx]] + value for idx, value in enumerate(result)]
-		result = [[""] + label] + result
-		return result
+		n_label = PIEDALOG_COLUMNS.index("DIST")
+		row_labels = ["\t".join(values) for values in zip(*[[str(v) for v in report[column].tolist()] for column in PIEDALOG_COLUMNS[:n_label]])]
+		values = np.array([report[column] for column in PIEDALOG_COLUMNS[n_label:]], dtype=np.float64).T.reshape(len(row_labels), -1)
+		return "\t".join(PIEDALOG_COLUMNS) + "\n" + format_rows(values, row_labels, digit, "\t")
 
 
-	def output_charge(self, output_range=None):
+	def write_piedalog_reports(self, fragments, prefix, overwrite=True):
 		"""
-		電荷情報を出力形式で返すメソッド
+		piedalog 形式の表を対象フラグメントごとのファイル (`PREFIX_piedalog_N.tsv`) に書き込むメソッド
 
 		Args:
-			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+			fragments (list): 対象フラグメント番号のリスト
+			prefix (str): 出力ファイルの接頭辞
+			overwrite (bool, optional): 既存のファイルを確認せずに上書きするか (Default: True)
 
 		Returns:
-			list
+			list: 出力ファイルパスのリスト
 		"""
-		list_frag = [obj_fragment.number for obj_fragment in self._obj_fragments]
-		if output_range is not None:
-			list_frag = output_range
+		reports = self.get_piedalog_reports(fragments)
+		list_output = ["{0}_piedalog_{1}.tsv".format(prefix, fragment_number) for fragment_number in reports]
+
+		# 上書きの確認は書き込みを始める前にまとめて行う
+		if overwrite == False:
+			for output in list_output:
+				check_overwrite(output)
+
+		for output, report in zip(list_output, reports.values()):
+			with open(output, "w") as obj_output:
+				obj_output.write(self.format_piedalog_report(report))
+		return list_output
 
-		result_frag = [["Fragment index", "Fragment charge"]]
-		result_frag += [[obj_fragment.number, obj_fragment.charge] for obj_fragment in self._obj_fragments if obj_fragment.number in list_frag]
 
-		result_atom = [["Fragment index", "Atom index", "Atom", "Atomic charge"]]
-		result_atom += [[frag_i, atom_i, atom_name, charge] for frag_i, atom_i, atom_name, charge in zip(
-			self.get_structure_list("FragmentNumber"),
-			self.get_structure_list("Index"),
-			self.get_structure_list("Element"),
-			self.get_structure_list("HF_MullikenCharge")
-		) if frag_i in list_frag]
+	def output_IFIE_piedalog_style(self, fragment_number):
+		"""
+		IFIE の結果をフォーマットして出力するメソッド (piedalog フォーマット; 標準出力)
 
-		if self.n_fragment > self.n_atom:
-			result_atom += [["", "", "", ""] for _ in range(self.n_fragment - self.n_atom)]
-		elif self.n_fragment < self.n_atom:
-			result_frag += [["", ""] for _ in range(self.n_atom - self.n_fragment)]
+		Args:
+			fragment_number(int): 対象フラグメント
 
-		return [frag + [""] + atom for frag, atom in zip(result_frag, result_atom)]
+		Returns:
+			str
+		"""
+		text = self.format_piedalog_report(self.get_piedalog_reports([fragment_number])[fragment_number])
+		sys.stdout.write(text)
+		return text
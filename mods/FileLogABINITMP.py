@@ -7,186 +7,453 @@ EnergyData class
 
 import sys
 import re
-import copy
+import time
 import numpy as np
 
+from mods.PairMatrix import PairMatrix, pair_index, create_array
+from mods.parse_func import decode_fixed_width
+from mods.geometry_func import min_distance_packed
+from mods.NeighborList import NeighborList
+from mods.charge_func import DEFAULT_CHARGE_SCHEME, check_charge_level
+from mods.frame_func import create_frame, get_pair_labels
+from mods.component_func import get_component_weights
+from mods.input_func import open_input, get_input_path
+from mods.FMOReader import FMOReader
+
 
 
 # =============== const =============== #
 AU = 627.5095
-DIGIT = 4
 BOHR_RADIUS = 0.52911772
 RE_ATOMIC_CHARGE = re.compile(r"\d+[\s\t]+\D+(:?[\s\t]+-?\d+\.\d+){2}")
-RE_IFIE = re.compile(r"## ((HF)|(MP2))-IFIE")
+ENERGY_TYPE = {
+	"Total": ["IFIE", ["HF", "CR"], AU],
+	"HF": ["IFIE", ["HF"], AU],
+	"CR": ["IFIE", ["CR"], AU],
+	"ES": ["PIEDA", ["ES"], 1.0],
+	"EX": ["PIEDA", ["EX"], 1.0],
+	"CT": ["PIEDA", ["CT"], 1.0],
+	"DI": ["PIEDA", ["DI"], 1.0],
+	"Q": ["PIEDA", ["Q"], 1.0],
+}
+# 成分名: [ブロック, ブロックの成分, 係数] (get_pair_frame() のカラム名と同じ)
+COMPONENTS = {
+	"IFIE-HF": ["IFIE", "HF", AU],
+	"IFIE-CR": ["IFIE", "CR", AU],
+	"ES": ["PIEDA", "ES", 1.0],
+	"EX": ["PIEDA", "EX", 1.0],
+	"CT": ["PIEDA", "CT", 1.0],
+	"DI": ["PIEDA", "DI", 1.0],
+	"Q": ["PIEDA", "Q", 1.0],
+}
+SECTION_MARKERS = [
+	[b"ERROR", "error"],
+	[b"Frag.   Elec.   ATOM", "fragment"],
+	[b"## HF-IFIE", "HF-IFIE"],
+	[b"## MP2-IFIE", "MP2-IFIE"],
+	[b"## PIEDA", "PIEDA"],
+	[b"No. Atom   Atomic pop.  Net charge", "charge"],
+]
+IFIE_COLUMNS = [[8, 13, np.int64], [13, 18, np.int64], [18, 30, np.float64], [39, 50, np.float64], [50, 61, np.float64]]
+PIEDA_COLUMNS = [[8, 13, np.int64], [13, 18, np.int64], [18, 33, np.float64], [33, 48, np.float64], [48, 63, np.float64], [63, 78, np.float64], [78, 93, np.float64]]
+BLOCK_TYPES = ["HF-IFIE", "MP2-IFIE", "PIEDA"]
+READ_SECTIONS = ["fragment", "HF-IFIE", "MP2-IFIE", "PIEDA", "charge"]
+BLOCK_SIZE = 1 << 24
+WHITESPACE = np.frombuffer(b" \t\r\f\v", dtype=np.uint8)
+
+
+
+# =============== function =============== #
+def scan_sections(obj_input, block_size=BLOCK_SIZE):
+	"""
+	generator to find sections in .log by byte-level search and yield their bodies (the other lines are not parsed)
+	(bodies of IFIE / PIEDA sections are yielded in pieces of whole lines, so memory does not depend on the section size)
+
+	Args:
+		obj_input (file): binary file object
+		block_size (int, optional): size of block to read (Default: 16 MiB)
+
+	Yields:
+		list: [section_type(str), body(bytes), first(bool)] (`first` is True for the first piece of section)
+	"""
+	buffer = b""
+	pos = 0
+	n_line = 0
+	eof = False
+	hits = {}
+	streaming = None
+	max_marker = max([len(v[0]) for v in SECTION_MARKERS])
+
+	def check_error(start, end):
+		error_idx = buffer.find(b"ERROR", start, end)
+		if error_idx >= 0:
+			sys.stderr.write("ERROR: ERROR in .log at {0}.\n".format(n_line + buffer.count(b"\n", 0, error_idx) + 1))
+			sys.exit(1)
+
+	while True:
+		if streaming is not None:
+			# IFIE / PIEDA セクションの続き (空行までを行単位で切り出す)
+			blank_line = find_blank_line(buffer, pos)
+			if blank_line is not None and (blank_line[1] or eof):
+				check_error(pos, blank_line[0])
+				yield [streaming, buffer[pos : blank_line[0]], False]
+				pos = blank_line[0]
+				streaming = None
+				hits = {}
+				continue
+
+			end = len(buffer) if eof else buffer.rfind(b"\n", pos) + 1
+			if end > pos:
+				check_error(pos, end)
+				yield [streaming, buffer[pos : end], False]
+				pos = end
+			if eof:
+				break
+
+			# 処理済みの部分を捨てて次のブロックを読み込む
+			n_line += buffer.count(b"\n", 0, pos)
+			block = obj_input.read(block_size)
+			if len(block) == 0:
+				eof = True
+			buffer = buffer[pos:] + block
+			pos = 0
+			continue
+
+		# 次のセクション見出し (または ERROR) を探す
+		for marker, _ in SECTION_MARKERS:
+			if marker not in hits or 0 <= hits[marker] < pos:
+				hits[marker] = buffer.find(marker, pos)
+		found = [[hits[marker], marker, section_type] for marker, section_type in SECTION_MARKERS if hits[marker] >= 0]
+
+		section = None
+		if len(found) != 0:
+			start, marker, section_type = min(found)
+			section = find_section_body(buffer, start, section_type, eof)
+
+		if section is None:
+			# 見出しがないか、セクションが途中までしかない場合は次のブロックを読み込む
+			if eof:
+				break
+			if len(found) == 0:
+				keep = max(pos, len(buffer) - max_marker + 1)
+				n_line += buffer.count(b"\n", 0, keep)
+				buffer = buffer[keep:]
+				pos = 0
+			# セクションが途中までしかない場合は読み込み量を倍々に増やす
+			block = obj_input.read(block_size if len(found) == 0 else max(block_size, len(buffer)))
+			if len(block) == 0:
+				eof = True
+			buffer += block
+			hits = {}
+			continue
+
+		if section_type == "error":
+			sys.stderr.write("ERROR: ERROR in .log at {0}.\n".format(n_line + buffer.count(b"\n", 0, start) + 1))
+			sys.exit(1)
+
+		body_start, body_end, section_end = section
+		if body_end is None:
+			# 空行がまだ読み込まれていない IFIE / PIEDA セクションは行単位で切り出す
+			check_error(start, body_start)
+			yield [section_type, b"", True]
+			streaming = section_type
+			pos = body_start
+			continue
+
+		check_error(start, section_end)
+		yield [section_type, buffer[body_start : body_end], True]
+		pos = section_end
+
+
+def find_section_body(buffer, start, section_type, eof):
+	"""
+	function to find range of section body
+
+	Args:
+		buffer (bytes): buffer
+		start (int): position of section header
+		section_type (str): section type in `SECTION_MARKERS`
+		eof (bool): whether buffer reaches end of file
+
+	Returns:
+		list: [body_start(int), body_end(int), section_end(int)] or None (need more data)
+		      (body_end and section_end are None if the end of IFIE / PIEDA section is not read yet)
+	"""
+	if section_type == "error":
+		return [start, start, start]
+
+	def next_line(pos):
+		idx = buffer.find(b"\n", pos)
+		if idx < 0:
+			return len(buffer) if eof else None
+		return idx + 1
+
+	body_start = next_line(start)
+	if body_start is None:
+		return None
+
+	if section_type in BLOCK_TYPES:
+		# 見出しの次の行を飛ばし、罫線の次の行からをデータとする
+		body_start = next_line(body_start)
+		if body_start is None:
+			return None
+		idx = buffer.find(b"------", body_start)
+		if idx < 0:
+			return [len(buffer), len(buffer), len(buffer)] if eof else None
+		body_start = next_line(idx)
+		if body_start is None:
+			return None
+
+	blank_line = find_blank_line(buffer, body_start)
+	if blank_line is None or (not blank_line[1] and not eof):
+		if not eof:
+			return [body_start, None, None] if section_type in BLOCK_TYPES else None
+		return [body_start, len(buffer), len(buffer)]
+	return [body_start, blank_line[0], blank_line[0]]
+
+
+def find_blank_line(buffer, pos):
+	"""
+	function to find first blank (whitespace only) line
+
+	Args:
+		buffer (bytes): buffer
+		pos (int): start position of line
+
+	Returns:
+		list: [line_start(int), terminated_by_newline(bool)] or None
+	"""
+	data = np.frombuffer(buffer, dtype=np.uint8)[pos:]
+	newline = np.flatnonzero(data == ord("\n"))
+	line_start = np.concatenate([[0], newline + 1])
+	line_end = np.concatenate([newline, [len(data)]])
+
+	# 空行か、行頭と行末が空白の行のみを候補とする
+	candidate = line_end == line_start
+	if len(data) > 0:
+		first = data[np.minimum(line_start, len(data) - 1)]
+		last = data[np.maximum(line_end - 1, 0)]
+		candidate |= np.isin(first, WHITESPACE) & np.isin(last, WHITESPACE)
+
+	for k in np.flatnonzero(candidate):
+		if len(buffer[pos + line_start[k] : pos + line_end[k]].strip()) == 0:
+			return [pos + int(line_start[k]), bool(k < len(newline))]
+	return None
 
 
 
 # =============== classes =============== #
-class FileLogABINITMP:
+class FileLogABINITMP(FMOReader):
 	""" エネルギーデータを扱うクラス """
-	def __init__(self, input_file):
+	def __init__(self, input_file, dtype="float64", memmap_dir=None):
+		self._path = get_input_path(input_file)
 		self._frag_atom = []
 		self._label = []
-		self._energy_HF = None
-		self._energy_CR = None
-		self._energy_ES = None
-		self._energy_EX = None
-		self._energy_CT = None
-		self._energy_DI = None
-		self._energy_Q = None
-		self._distances = None
+		self._dtype = dtype
+		self._memmap_dir = memmap_dir
+		self._energy_IFIE = None
+		self._energy_PIEDA = None
+		self._blocks = {block_type: [] for block_type in BLOCK_TYPES}
+		self._selected_block = {"IFIE": None, "PIEDA": None}
+		self._min_distances = None
 
 		self._charge_atom = []
 		self._charge_frag = []
+		self._read_stats = {"sections": {}}
 
 		self._load_file(input_file)
 
+	@property
+	def path(self):
+		return self._path
+
+	@property
+	def dtype(self):
+		return self._dtype
+
+	@property
+	def memmap_dir(self):
+		return self._memmap_dir
+
+	@property
+	def blocks(self):
+		return {block_type: len(list_block) for block_type, list_block in self._blocks.items()}
+
+	@property
+	def selected_block(self):
+		return self._selected_block
+
+	@property
+	def read_stats(self):
+		# セクションごとの解析の所要時間 (秒; `scan` は見出しの検索と読み込み)、見つからなかったセクション
+		return {"sections": dict(self._read_stats["sections"]), "skipped_sections": [section for section in READ_SECTIONS if section not in self._read_stats["sections"]]}
+
 
 	def _load_file(self, input_file):
 		"""
-		ファイルを読み込むメソッド
+		ファイルを読み込むメソッド (必要なセクションのみを解析する; 先頭から 1 回だけ読むため、標準入力やパイプも読み込める)
 
 		Args:
-			input_file (str): ABINIT-MP の .out および .log ファイル
+			input_file (str or file): ABINIT-MP の .out および .log ファイル、`-` (標準入力) またはバイナリモードのファイルオブジェクト
 
 		Returns:
 			self
 		"""
-		distance_idx = []
-
-		flag_read = [0,0]
-		with open(input_file, "r") as obj_input:
-			for line_idx, line_val in enumerate(obj_input, 1):
-				if "ERROR" in line_val:
-					sys.stderr.write("ERROR: ERROR in .log at {0}.\n".format(line_idx))
-					sys.exit(1)
-
-				if flag_read[0] == 0:
-					# フラグ分類
-					if "Frag.   Elec.   ATOM" in line_val:
-						flag_read[0] = 1
-					elif RE_IFIE.search(line_val):
-						flag_read[0] = 2
-					elif "## PIEDA" in line_val:
-						flag_read[0] = 3
-					elif "No. Atom   Atomic pop.  Net charge" in line_val:
-						flag_read[0] = 4
-
-				elif flag_read[0] == 1:
+		connected = None
+		sections = {"scan": 0.0}
+		time_start = time.perf_counter()
+		with open_input(input_file) as obj_input:
+			for section_type, body, first in scan_sections(obj_input):
+				time_section = time.perf_counter()
+				if section_type == "fragment":
 					# フラグメント構成原子の取得
-					if len(line_val.strip()) == 0:
-						flag_read = [0,0]
-						continue
-
-					label = line_val[5:13].strip()
-					atoms = [int(x) for x in line_val[23:].strip().split()]
-					if label:
-						self._label.append(int(label))
-						self._frag_atom.append(atoms)
-					else:
-						self._frag_atom[-1].extend(atoms)
-
-				elif flag_read[0] == 2:
-					# IFIE
-					if flag_read[1] == 0:
-						# 初期化
-						self._energy_HF = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._energy_CR = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._charge_frag = [0.0 for i in range(len(self._frag_atom))]
-						self._distances = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						flag_read[1] = 1
-
-					elif "------" in line_val:
-						flag_read[1] = 2
-
-					elif flag_read[1] == 2:
-						if len(line_val.strip()) == 0:
-							flag_read = [0,0]
-							continue
-
-						i = int(line_val[8:13].strip()) - 1
-						j = int(line_val[13:18].strip()) - 1
-						distance = float(line_val[18:30].strip())
-
-						energies = [float(x.strip()) for x in [line_val[39:50], line_val[50:61]]]
-
-						if distance == 0.000000:
-							distance_idx.append(line_val[8:18].strip())
-							energies = [0.0 for _ in energies]
-
-						self._energy_HF[i][j] = self._energy_HF[j][i] = energies[0]
-						self._energy_CR[i][j] = self._energy_CR[j][i] = energies[1]
-						self._distances[i][j] = self._distances[j][i] = distance
-
-				elif flag_read[0] == 3:
-					# PIDA
-					if flag_read[1] == 0:
-						# 初期化
-						self._energy_ES = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._energy_EX = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._energy_CT = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._energy_DI = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._energy_Q = np.zeros((len(self._frag_atom), len(self._frag_atom)))
-						self._charge_frag = [0.0 for i in range(len(self._frag_atom))]
-						flag_read[1] = 1
-
-					elif "------" in line_val:
-						flag_read[1] = 2
-
-					elif flag_read[1] == 2:
-						if len(line_val.strip()) == 0:
-							flag_read = [0,0]
-							continue
-
-						i = int(line_val[8:13].strip()) - 1
-						j = int(line_val[13:18].strip()) - 1
-
-						energies = [float(x.strip()) for x in [
-							line_val[18:33],
-							line_val[33:48],
-							line_val[48:63],
-							line_val[63:78],
-							line_val[78:93]
-						]]
-						if line_val[8:18].strip() in distance_idx:
-							energies = [0.0 for x in energies]
-
-						self._energy_ES[i][j] = self._energy_ES[j][i] = energies[0]
-						self._energy_EX[i][j] = self._energy_EX[j][i] = energies[1]
-						self._energy_CT[i][j] = self._energy_CT[j][i] = energies[2]
-						self._energy_DI[i][j] = self._energy_DI[j][i] = energies[3]
-						self._energy_Q[i][j] = -1 * energies[4]
-						self._energy_Q[j][i] = energies[4]
-
-				elif flag_read[0] == 4:
-					# 電荷
-					if len(line_val.strip()) == 0:
-						flag_read = [0,0]
-						continue
-
-					if RE_ATOMIC_CHARGE.search(line_val):
-						atom_idx = int(line_val[:13].strip())
-						charge = float(line_val[31:].strip())
-						data_idx = [idx for idx, value in enumerate(self._frag_atom) if atom_idx in value][0]
-						self._charge_atom.append([atom_idx, line_val[14:19].strip(), charge])
-						self._charge_frag[data_idx] += charge
+					for line_val in body.decode().splitlines():
+						label = line_val[5:13].strip()
+						atoms = [int(x) for x in line_val[23:].strip().split()]
+						if label:
+							self._label.append(int(label))
+							self._frag_atom.append(atoms)
+						else:
+							self._frag_atom[-1].extend(atoms)
+
+				elif section_type in ["HF-IFIE", "MP2-IFIE"]:
+					# IFIE (距離を含む; ブロックはすべて保持する; 本体は行単位で分割されて渡される)
+					if first:
+						n_fragment = len(self._frag_atom)
+						store = PairMatrix(n_fragment, ["HF", "CR", "distance"], dtype=self._dtype, memmap_dir=self._memmap_dir)
+						self._blocks[section_type].append(store)
+						self._charge_frag = [0.0 for i in range(n_fragment)]
+						if connected is None:
+							connected = create_array(store.n_pair, bool, memmap_dir=self._memmap_dir)
+
+					i, j, distance, energy_HF, energy_CR = decode_fixed_width(body, IFIE_COLUMNS)
+					i -= 1
+					j -= 1
+					flag_connected = distance == 0.0
+					connected[pair_index(i, j)[flag_connected]] = True
+					energy_HF[flag_connected] = 0.0
+					energy_CR[flag_connected] = 0.0
+
+					store.set_pairs(i, j, [energy_HF, energy_CR, distance])
+					self.select_block(section_type)
+
+				elif section_type == "PIEDA":
+					# PIEDA (本体は行単位で分割されて渡される)
+					if first:
+						n_fragment = len(self._frag_atom)
+						store = PairMatrix(n_fragment, ["ES", "EX", "CT", "DI", "Q"], antisymmetric=["Q"], dtype=self._dtype, memmap_dir=self._memmap_dir)
+						self._blocks[section_type].append(store)
+						self._charge_frag = [0.0 for i in range(n_fragment)]
+
+					i, j, *energies = decode_fixed_width(body, PIEDA_COLUMNS)
+					i -= 1
+					j -= 1
+					energies = np.array(energies)
+					if connected is not None:
+						energies[:, connected[pair_index(i, j)]] = 0.0
+
+					# q は J -> I の符号で格納する
+					store.set_pairs(j, i, energies)
+					self.select_block(section_type)
+
+				elif section_type == "charge":
+					# 電荷 (フラグメント電荷は原子の属するフラグメントごとに足し合わせる)
+					list_atom = []
+					list_charge = []
+					for line_val in body.decode().splitlines():
+						if RE_ATOMIC_CHARGE.search(line_val):
+							atom_idx = int(line_val[:13].strip())
+							charge = float(line_val[31:].strip())
+							self._charge_atom.append([atom_idx, line_val[14:19].strip(), charge])
+							list_atom.append(atom_idx)
+							list_charge.append(charge)
+					self._add_fragment_charge(list_atom, list_charge)
+				sections[section_type] = sections.get(section_type, 0.0) + time.perf_counter() - time_section
+
+		sections["scan"] = time.perf_counter() - time_start - sum(sections.values())
+		self._read_stats = {"sections": sections}
+
+		# 形式の異なる入力や壊れた入力を、空の出力として変換しない
+		if len(self._label) == 0:
+			sys.stderr.write("ERROR: no fragment section in {0}.\n".format(self._path))
+			sys.exit(1)
+		if all(len(self._blocks[block_type]) == 0 for block_type in BLOCK_TYPES):
+			sys.stderr.write("ERROR: no IFIE or PIEDA section in {0}.\n".format(self._path))
+			sys.exit(1)
 		return self
 
 
-	def get_label(self, frag_idx=None):
+	def _add_fragment_charge(self, list_atom, list_charge):
 		"""
-		ラベルを返すメソッド
+		原子電荷を、原子が属するフラグメントの電荷に (原子の順に) 加えるメソッド
 
 		Args:
-			frag_idx (int, optional): フラグメントインデックス (Default: None)
+			list_atom (list): 原子番号のリスト
+			list_charge (list): 原子電荷のリスト
 
 		Returns:
-			str: ラベル
+			self
 		"""
-		if frag_idx is not None:
-			return self._label[frag_idx - 1]
+		if len(list_atom) == 0:
+			return self
+
+		# 原子番号からフラグメントインデックスを引く配列 (複数のフラグメントに含まれる原子は最初のフラグメント)
+		atoms = np.array(list_atom, dtype=np.int64)
+		lookup = np.full(max(int(atoms.max()), max([max(v) for v in self._frag_atom if len(v) != 0], default=0)) + 1, -1, dtype=np.int64)
+		for frag_idx in range(len(self._frag_atom) - 1, -1, -1):
+			lookup[self._frag_atom[frag_idx]] = frag_idx
+		frag_idx = lookup[np.maximum(atoms, 0)]
+		if np.any(frag_idx < 0) or np.any(atoms < 0):
+			sys.stderr.write("ERROR: atom {0} is not included in any fragment.\n".format(atoms[(frag_idx < 0) | (atoms < 0)][0]))
+			sys.exit(1)
+
+		if len(self._charge_frag) != len(self._frag_atom):
+			self._charge_frag = [0.0 for _ in range(len(self._frag_atom))]
+		charge_frag = np.array(self._charge_frag, dtype=np.float64)
+		np.add.at(charge_frag, frag_idx, np.array(list_charge, dtype=np.float64))
+		self._charge_frag = charge_frag.tolist()
+		return self
+
+
+	def select_block(self, block_type, occurrence=-1):
+		"""
+		出力に使う IFIE (または PIEDA) ブロックを選択するメソッド (読み込み直後は最後に現れたブロック)
+
+		Args:
+			block_type (str): `HF-IFIE`, `MP2-IFIE` or `PIEDA`
+			occurrence (int, optional): 何番目に現れたブロックか (1-origin; 負の値は後ろから数える) (Default: -1)
+
+		Returns:
+			self
+		"""
+		if block_type not in BLOCK_TYPES:
+			sys.stderr.write("ERROR: undefined block type ({0}).\n".format(block_type))
+			sys.exit(1)
+
+		list_block = self._blocks[block_type]
+		if occurrence == 0 or not -len(list_block) <= occurrence <= len(list_block):
+			sys.stderr.write("ERROR: {0} block #{1} is not found in .log.\n".format(block_type, occurrence))
+			sys.exit(1)
+
+		if occurrence > 0:
+			occurrence -= 1
+		if block_type == "PIEDA":
+			self._energy_PIEDA = list_block[occurrence]
+			self._selected_block["PIEDA"] = [block_type, occurrence % len(list_block) + 1]
 		else:
-			return self._label
+			self._energy_IFIE = list_block[occurrence]
+			self._selected_block["IFIE"] = [block_type, occurrence % len(list_block) + 1]
+		return self
+
+
+	def _get_labels(self):
+		"""
+		フラグメントラベルのリストを返すメソッド
+
+		Returns:
+			list
+		"""
+		return self._label
 
 
 	def get_fragment_atom(self, frag_idx=None):
@@ -237,149 +504,512 @@ class FileLogABINITMP:
 			return self._charge_frag
 
 
-	def get_energy(self, energy_type="Total", frag_idx=None):
+	def check_charge(self, level=None, schemes=None):
 		"""
-		IFIE エネルギーを返すメソッド
+		電荷の表の単位と電荷の種類が利用できるか確認するメソッド (利用できない場合は終了する; .log には残基の情報がなく、電荷は HF Mulliken 電荷のみ)
 
 		Args:
-			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
-			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (Default: None)
+			level (str, optional): `atom` or `fragment` (Default: None (確認しない))
+			schemes (list, optional): 電荷の種類のリスト (Default: None (["HF_Mulliken"]))
 
 		Returns:
-			list
+			list: 電荷の種類のリスト
 		"""
-		energies = None
-		if energy_type == "Total":
-			energies = (self._energy_HF + self._energy_CR) * AU
-		elif energy_type == "HF":
-			energies = self._energy_HF * AU
-		elif energy_type == "CR":
-			energies = self._energy_CR * AU
-		elif energy_type == "ES":
-			energies = self._energy_ES
-		elif energy_type == "EX":
-			energies = self._energy_EX
-		elif energy_type == "CT":
-			energies = self._energy_CT
-		elif energy_type == "DI":
-			energies = self._energy_DI
-		elif energy_type == "Q":
-			energies = self._energy_Q
-
-		if frag_idx is None:
-			return np.round(energies, DIGIT)
-		else:
-			return np.round(energies[frag_idx[0] - 1][frag_idx[1] - 1], DIGIT)
+		if level is not None:
+			check_charge_level(level)
+			if level == "residue":
+				sys.stderr.write("ERROR: residue charge is not available for .log.\n")
+				sys.exit(1)
+		if schemes is None:
+			schemes = [DEFAULT_CHARGE_SCHEME]
+		for scheme in schemes:
+			if scheme != DEFAULT_CHARGE_SCHEME:
+				sys.stderr.write("ERROR: {0} charge is not available in .log.\n".format(scheme))
+				sys.exit(1)
+		return schemes
+
+
+	def get_atom_charges(self, schemes=None):
+		"""
+		原子電荷を配列で返すメソッド (原子の順はフラグメントごと; .log の電荷は HF Mulliken 電荷のみ)
+
+		Args:
+			schemes (list, optional): 電荷の種類のリスト (Default: None (["HF_Mulliken"]))
 
+		Returns:
+			ndarray: (原子数, 電荷の種類の数)
+		"""
+		schemes = self.check_charge(schemes=schemes)
+
+		atoms = np.array([atom for list_atom in self._frag_atom for atom in list_atom], dtype=np.int64)
+		dict_charge = {atom_idx: charge for atom_idx, _, charge in self._charge_atom}
+		charges = np.array([dict_charge.get(atom_idx, np.nan) for atom_idx in atoms.tolist()], dtype=np.float64)
+		return np.repeat(charges[:, np.newaxis], len(schemes), axis=1)
 
-	def get_min_distance(self, frag_idx=None, unit="bohr"):
+
+	def get_charge_table(self, level="fragment", schemes=None, index=None):
 		"""
-		フラグメント間距離 (最短原子間距離) を返すメソッド
+		原子、フラグメントごとの電荷を表 (カラムごとの配列) として返すメソッド (.log には残基の情報がない)
 
 		Args:
-			frag_idx (list, optional): [frag_idx_A, frag_idx_B] (Default: None)
-			unit (str): "a.u." or "kcal/mol" (Default: "kcal/mol")
+			level (str, optional): `atom` or `fragment` (Default: "fragment")
+			schemes (list, optional): 電荷の種類のリスト (Default: None (["HF_Mulliken"]))
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
 
 		Returns:
-			list
+			list: [カラム名のリスト, [ndarray, ...]] (atom: fragment, atom, element, 電荷; fragment: fragment, 電荷)
 		"""
-		distances = self._distances
-		if unit == "bohr":
-			distances /= BOHR_RADIUS
-		if frag_idx is None:
-			return np.round(self._distances, DIGIT)
-		else:
-			return np.round(self._distance[frag_idx[0] - 1][frag_idx[1] - 1], DIGIT)
+		schemes = self.check_charge(level, schemes)
+		charges = self.get_atom_charges(schemes)
+		n_fragment = len(self._frag_atom)
+		if index is None:
+			index = np.arange(n_fragment)
+		index = np.asarray(index, dtype=np.int64)
+		labels = np.array(self._label, dtype=np.int64)
+
+		if level == "fragment":
+			charge_frag = np.array(self._charge_frag if len(self._charge_frag) == n_fragment else [np.nan] * n_fragment, dtype=np.float64)
+			return [["fragment"] + list(schemes), [labels[index]] + [charge_frag[index] for _ in schemes]]
+
+		n_atoms = np.array([len(list_atom) for list_atom in self._frag_atom], dtype=np.int64)
+		atom_fragment = np.repeat(np.arange(n_fragment), n_atoms)
+		atom_idx = np.flatnonzero(np.isin(atom_fragment, index))
+		atoms = np.array([atom for list_atom in self._frag_atom for atom in list_atom], dtype=np.int64)
+		dict_name = {atom_idx: atom_name for atom_idx, atom_name, _ in self._charge_atom}
+		elements = np.array([dict_name.get(atom, "") for atom in atoms[atom_idx].tolist()], dtype=object)
+		return [["fragment", "atom", "element"] + list(schemes), [labels[atom_fragment[atom_idx]], atoms[atom_idx], elements] + [charges[atom_idx, k] for k in range(len(schemes))]]
+
+
+	def get_fragment_table(self, index=None):
+		"""
+		フラグメントの情報を表として返すメソッド
+
+		Args:
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
+
+		Returns:
+			list: [カラム名のリスト, [[値, ...], ...]]
+		"""
+		if index is None:
+			index = range(len(self._frag_atom))
+		charges = self._charge_frag if len(self._charge_frag) == len(self._frag_atom) else [None] * len(self._frag_atom)
+		columns = ["fragment", "charge", "n_atom"]
+		return [columns, [[self._label[idx], charges[idx], len(self._frag_atom[idx])] for idx in index]]
 
 
-	def output_energy(self, energy_type="Total", output_range=None):
+	def get_atom_table(self, index=None):
 		"""
-		IFIE エネルギーを出力形式で返すメソッド
+		原子の情報 (電荷セクション) を表として返すメソッド
 
 		Args:
-			energy_type (str, optional): `Total`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
-			output_range (list, optional): 出力するラベルリスト (Default: None)
+			index (ndarray, optional): 0-origin フラグメントインデックス (Default: None (all))
 
 		Returns:
-			list
+			list: [カラム名のリスト, [[値, ...], ...]]
 		"""
-		result = None
-		if energy_type == "Total":
-			result = (self.get_energy("Total"))
-		else:
-			result = self.get_energy(energy_type)
+		if index is None:
+			index = range(len(self._frag_atom))
+		dict_charge = {atom_idx: [atom_name, charge] for atom_idx, atom_name, charge in self._charge_atom}
+		columns = ["Index", "Element", "FragmentNumber", "Charge"]
+		rows = []
+		for idx in index:
+			for atom_idx in self._frag_atom[idx]:
+				atom_name, charge = dict_charge.get(atom_idx, [None, None])
+				rows.append([atom_idx, atom_name, self._label[idx], charge])
+		return [columns, rows]
+
+
+	def has_energy_type(self, energy_type):
+		"""
+		エネルギーの種類の値 (IFIE または PIEDA ブロック) があるかを返すメソッド
 
-		label = copy.deepcopy(self.get_label())
-		if output_range is not None:
-			delete_range = list(set(self.get_label()) - set(output_range))
-			for idx in reversed(sorted(delete_range)):
-				del(label[idx - 1])
-				result = np.delete(result, idx - 1, 0)
-				result = np.delete(result, idx - 1, 1)
+		Args:
+			energy_type (str): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q`
 
-		result = result.tolist()
-		result = [[label[idx]] + value for idx, value in enumerate(result)]
-		result = [[""] + label] + result
-		return result
+		Returns:
+			bool
+		"""
+		if energy_type not in ENERGY_TYPE:
+			return False
+		return self._get_energy_store(energy_type, required=False)[0] is not None
 
 
-	def output_min_dist(self, output_range=None):
+	def _get_energy_store(self, energy_type, required=True):
 		"""
-		最短距離を出力形式で返すメソッド
+		エネルギーの種類の値を持つブロックと、その成分・係数を返すメソッド
 
 		Args:
-			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+			energy_type (str): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q`
+			required (bool, optional): ブロックがない場合に終了するか (Default: True)
 
 		Returns:
-			list
+			list: [ブロック (PairMatrix; ない場合は None), 成分のリスト, 係数]
+		"""
+		if energy_type not in ENERGY_TYPE:
+			sys.stderr.write("ERROR: undefined energy type ({0}).\n".format(energy_type))
+			sys.exit(1)
+
+		store_name, components, factor = ENERGY_TYPE[energy_type]
+		store = self._energy_IFIE if store_name == "IFIE" else self._energy_PIEDA
+		if required and store is None:
+			sys.stderr.write("ERROR: {0} data is not found in .log.\n".format(store_name))
+			sys.exit(1)
+		return [store, components, factor]
+
+
+	def get_pair_table(self, rows, cols):
+		"""
+		フラグメントペアの相互作用 (エネルギーの種類ごとの値; kcal/mol, Q は e) を表として返すメソッド
+
+		Args:
+			rows (ndarray): 0-origin 行インデックス
+			cols (ndarray): 0-origin 列インデックス (rows と同じ長さ)
+
+		Returns:
+			list: [カラム名のリスト, [ndarray, ...]]
+		"""
+		columns = []
+		values = []
+		if self._energy_IFIE is not None:
+			columns.append("connected")
+			values.append((self._energy_IFIE.sum_pairs("distance", 1.0, rows, cols) == 0.0).astype(np.int64))
+		for energy_type in ENERGY_TYPE:
+			if self.has_energy_type(energy_type):
+				store, components, factor = self._get_energy_store(energy_type)
+				columns.append(energy_type)
+				values.append(store.sum_pairs(components, factor, rows, cols))
+		return [columns, values]
+
+
+	def get_multimer_terms(self, section, unit="kcal/mol"):
+		"""
+		トリマー・テトラマーの項を返すメソッド (.log には多体補正の項がない)
+
+		Args:
+			section (str): `trimer` or `tetramer`
+			unit (str, optional): "a.u." or "kcal/mol" (Default: "kcal/mol")
+
+		Returns:
+			None
+		"""
+		sys.stderr.write("ERROR: {0} terms are not available for .log (only .cpf).\n".format(section))
+		sys.exit(1)
+
+
+	def get_pair_frame(self, backend="pandas", energy_types=None):
+		"""
+		全フラグメントペア (i < j) の相互作用を縦長の表 (DataFrame または Arrow Table) として返すメソッド
+		(選択している IFIE ブロックの HF, CR (a.u.; IFIE-HF, IFIE-CR), distance (Å) と PIEDA ブロックの ES, EX, CT, DI (kcal/mol), Q (e) は保持している配列をコピーせずに参照する)
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+			energy_types (list, optional): 追加するエネルギーの種類 (`Total`, `HF` or `CR`; kcal/mol; PIEDA の成分は常に含む) (Default: None)
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: fragment_i, fragment_j, connected, IFIE-HF, IFIE-CR, distance, ES, EX, CT, DI, Q, エネルギーの種類
+		"""
+		labels_i, labels_j = get_pair_labels(self._label)
+		columns = ["fragment_i", "fragment_j"]
+		values = [labels_i, labels_j]
+		if self._energy_IFIE is not None:
+			columns.append("connected")
+			values.append(self._energy_IFIE.component("distance") == 0.0)
+		if self._energy_IFIE is not None:
+			columns.extend(["IFIE-HF", "IFIE-CR", "distance"])
+			values.extend([self._energy_IFIE.component(component) for component in ["HF", "CR", "distance"]])
+		if self._energy_PIEDA is not None:
+			columns.extend(self._energy_PIEDA.components)
+			values.extend(self._energy_PIEDA.values)
+		for energy_type in energy_types or []:
+			if energy_type in columns:
+				# PIEDA の成分はエネルギーの種類と同じ値
+				continue
+			if not self.has_energy_type(energy_type):
+				sys.stderr.write("ERROR: {0} data is not found in .log.\n".format(energy_type))
+				sys.exit(1)
+			store, components, factor = self._get_energy_store(energy_type)
+			energies = np.zeros(store.n_pair, dtype=np.float64)
+			for component in components:
+				energies += store.component(component)
+			energies *= factor
+			columns.append(energy_type)
+			values.append(energies)
+		return create_frame(columns, values, backend)
+
+
+	def get_atom_frame(self, backend="pandas"):
 		"""
-		result = None
-		result = self.get_min_distance(unit="angstrom")
+		原子の情報 (電荷セクション) を表 (DataFrame または Arrow Table) として返すメソッド (原子の順はフラグメントごと)
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: Index, Element (カテゴリ), FragmentNumber, Charge
+		"""
+		n_atoms = np.array([len(list_atom) for list_atom in self._frag_atom], dtype=np.int64)
+		atoms = np.array([atom for list_atom in self._frag_atom for atom in list_atom], dtype=np.int64)
+		dict_charge = {atom_idx: [atom_name, charge] for atom_idx, atom_name, charge in self._charge_atom}
+		elements = np.array([dict_charge.get(atom, [""])[0] for atom in atoms.tolist()], dtype=str)
+		charges = np.array([dict_charge.get(atom, [None, np.nan])[1] for atom in atoms.tolist()], dtype=np.float64)
+		labels = np.repeat(np.array(self._label, dtype=np.int64), n_atoms)
+		return create_frame(["Index", "Element", "FragmentNumber", "Charge"], [atoms, elements, labels, charges], backend, categorical=["Element"])
 
-		label = copy.deepcopy(self.get_label())
-		if output_range is not None:
-			delete_range = list(set(self.get_label()) - set(output_range))
-			for idx in reversed(sorted(delete_range)):
-				del(label[idx - 1])
-				result = np.delete(result, idx - 1, 0)
-				result = np.delete(result, idx - 1, 1)
 
-		result = result.tolist()
-		result = [[label[idx]] + value for idx, value in enumerate(result)]
-		result = [[""] + label] + result
-		return result
+	def get_fragment_frame(self, backend="pandas"):
+		"""
+		フラグメントの情報を表 (DataFrame または Arrow Table) として返すメソッド
+
+		Args:
+			backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+
+		Returns:
+			pandas.DataFrame or pyarrow.Table: fragment, charge (電荷セクションがない場合は NaN), n_atom
+		"""
+		n_fragment = len(self._frag_atom)
+		charges = self._charge_frag if len(self._charge_frag) == n_fragment else [np.nan] * n_fragment
+		values = [np.array(self._label, dtype=np.int64), np.array(charges, dtype=np.float64), np.array([len(list_atom) for list_atom in self._frag_atom], dtype=np.int64)]
+		return create_frame(["fragment", "charge", "n_atom"], values, backend)
 
 
-	def output_charge(self, output_range=None):
+	def get_energy_matrix(self, energy_type="Total", rows=None, cols=None):
 		"""
-		電荷情報を出力形式で返すメソッド
+		IFIE エネルギーの行列 (丸めなし) を返すメソッド
 
 		Args:
-			output_range (list, optional): 出力するフラグメントラベルリスト (Default: None)
+			energy_type (str, optional): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+
+		Returns:
+			ndarray
+		"""
+		store, components, factor = self._get_energy_store(energy_type)
+		return store.expand(components, factor, rows, cols)
+
+
+	def get_energy_dense(self, energy_type="Total", out=None):
+		"""
+		IFIE エネルギーの行列全体 (丸めなし) をパック配列を順に読んで展開するメソッド (out に np.memmap を渡すとディスク上に展開できる)
+
+		Args:
+			energy_type (str, optional): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
+			out (ndarray, optional): 出力先 (N, N) (Default: None (新しい配列))
+
+		Returns:
+			ndarray
+		"""
+		store, components, factor = self._get_energy_store(energy_type)
+		return store.expand_all(components, factor, out=out)
+
+
+	def get_energy_pairs(self, energy_type, neighbor_list):
+		"""
+		近接リストのペアについて IFIE エネルギー (丸めなし) を返すメソッド (密行列に展開しない)
+
+		Args:
+			energy_type (str): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q`
+			neighbor_list (NeighborList): 近接リスト
+
+		Returns:
+			ndarray: 行列要素 [rows[k]][cols[k]] の値 (rows, cols は近接リストの値)
+		"""
+		store, components, factor = self._get_energy_store(energy_type)
+		return store.sum_pairs(components, factor, neighbor_list.rows, neighbor_list.cols)
+
+
+	def get_component_names(self):
+		"""
+		出力できる成分 (選択している IFIE ブロックの IFIE-HF, IFIE-CR と PIEDA ブロックの ES, EX, CT, DI, Q) のリストを返すメソッド
 
 		Returns:
 			list
 		"""
-		result = []
-		result_frag = [["Fragment index", "Fragment charge", ""]]
-		result_atom = [["Fragment index", "Atom index", "Atom", "Atomic charge"]]
-
-		cnt_atom = 0
-		for frag_idx in range(len(self._frag_atom)):
-			if output_range is None or frag_idx + 1 in output_range:
-				result_frag.append([frag_idx + 1, self._charge_frag[frag_idx], ""])
-				for atom_idx in self._frag_atom[frag_idx]:
-					result_atom.append([
-						frag_idx + 1,
-						self._charge_atom[atom_idx - 1][0],
-						self._charge_atom[atom_idx - 1][1],
-						self._charge_atom[atom_idx - 1][2]
-					])
-
-		diff_row = len(result_atom) - len(result_frag)
-		if 0 < diff_row:
-			result_frag += [["", "", ""] for x in range(diff_row)]
-		elif diff_row < 0:
-			result_atom += [["", "", "", ""] for x in range(diff_row)]
-
-		return [x + y for x, y in zip(result_frag, result_atom)]
+		stores = {"IFIE": self._energy_IFIE, "PIEDA": self._energy_PIEDA}
+		return [name for name, (store_name, _, _) in COMPONENTS.items() if stores[store_name] is not None]
+
+
+	def _get_component_weights(self, expressions):
+		"""
+		成分の式に対するブロックごとの係数を返すメソッド
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`; `component_func.parse_component()`)
+
+		Returns:
+			list: [ラベルのリスト, [[ブロック (PairMatrix), 係数 (ndarray; (式の数, ブロックの成分数))], ...]]
+		"""
+		columns = self.get_component_names()
+		labels, weights = get_component_weights(expressions, columns, [COMPONENTS[column][2] for column in columns])
+
+		# 係数をブロックの成分の順に並べ替える (係数がすべて 0 のブロックは読まない)
+		list_store = []
+		for store_name, store in [["IFIE", self._energy_IFIE], ["PIEDA", self._energy_PIEDA]]:
+			if store is None:
+				continue
+			store_weights = np.zeros((len(labels), len(store.components)))
+			for c, column in enumerate(columns):
+				if COMPONENTS[column][0] == store_name:
+					store_weights[:, store.component_index(COMPONENTS[column][1])] = weights[:, c]
+			if np.any(store_weights != 0):
+				list_store.append([store, store_weights])
+		return [labels, list_store]
+
+
+	def get_component_matrices(self, expressions, rows=None, cols=None):
+		"""
+		成分 (IFIE-HF, IFIE-CR, ES, EX, CT, DI, Q とその線形結合) の行列 (丸めなし) をまとめて返すメソッド (各成分は 1 回だけ読む)
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`; e.g. `ES`, `HF+CR=IFIE-HF+IFIE-CR`)
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+
+		Returns:
+			list: [ラベルのリスト, ndarray (式の数, len(rows), len(cols))]
+		"""
+		labels, list_store = self._get_component_weights(expressions)
+		n_row = len(self._label) if rows is None else len(rows)
+		n_col = len(self._label) if cols is None else len(cols)
+		values = np.zeros((len(labels), n_row, n_col))
+		for store, weights in list_store:
+			values += store.expand_linear(weights, rows, cols)
+		return [labels, values]
+
+
+	def get_component_pairs(self, expressions, neighbor_list):
+		"""
+		近接リストのペアについて成分の値 (丸めなし) をまとめて返すメソッド (密行列に展開しない)
+
+		Args:
+			expressions (list): 成分の式 (`[LABEL=]TERM[+TERM ...]`)
+			neighbor_list (NeighborList): 近接リスト
+
+		Returns:
+			list: [ラベルのリスト, ndarray (式の数, ペア数)]
+		"""
+		labels, list_store = self._get_component_weights(expressions)
+		values = np.zeros((len(labels), len(neighbor_list.rows)))
+		for store, weights in list_store:
+			values += weights @ store.gather(neighbor_list.rows, neighbor_list.cols)
+		return [labels, values]
+
+
+	def get_energy_series(self, energy_type="Total", block_type=None, rows=None, cols=None):
+		"""
+		全ブロックの IFIE エネルギーの行列 (丸めなし) を出現順に積み重ねて返すメソッド
+
+		Args:
+			energy_type (str, optional): `Total`, `HF`, `CR`, `ES`, `EX`, `CT`, `DI` or `Q` (Default: "Total")
+			block_type (str, optional): `HF-IFIE`, `MP2-IFIE` or `PIEDA` (Default: None (type of selected block))
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+
+		Returns:
+			ndarray: (ブロック数, len(rows), len(cols))
+		"""
+		_, components, factor = self._get_energy_store(energy_type, required=False)
+		store_name = ENERGY_TYPE[energy_type][0]
+		if block_type is None:
+			if self._selected_block[store_name] is None:
+				sys.stderr.write("ERROR: {0} data is not found in .log.\n".format(store_name))
+				sys.exit(1)
+			block_type = self._selected_block[store_name][0]
+		if (store_name == "PIEDA") != (block_type == "PIEDA"):
+			sys.stderr.write("ERROR: {0} is not included in {1} block.\n".format(energy_type, block_type))
+			sys.exit(1)
+
+		n_row = len(self._frag_atom) if rows is None else len(rows)
+		n_col = len(self._frag_atom) if cols is None else len(cols)
+		series = np.zeros((len(self._blocks[block_type]), n_row, n_col))
+		for idx, store in enumerate(self._blocks[block_type]):
+			series[idx] = store.expand(components, factor, rows, cols)
+		return series
+
+
+	def set_coordinates(self, coordinates, cutoff=None):
+		"""
+		原子座標からフラグメント間距離 (最短原子間距離) を計算して設定するメソッド (以降は IFIE の距離の代わりに使う)
+
+		Args:
+			coordinates (ndarray): 原子番号順の原子座標 (Å) (原子数, 3)
+			cutoff (float, optional): カットオフ距離 (Å); カットオフより遠いペアは inf (Default: None (全ペア))
+
+		Returns:
+			self
+		"""
+		n_atom = sum([len(atoms) for atoms in self._frag_atom])
+		coordinates = np.asarray(coordinates, dtype=np.float64)
+		if coordinates.shape != (n_atom, 3):
+			sys.stderr.write("ERROR: shape of coordinates {0} does not match the number of atoms ({1}).\n".format(coordinates.shape, n_atom))
+			sys.exit(1)
+
+		atom_idx = np.array([atom for atoms in self._frag_atom for atom in atoms], dtype=np.int64) - 1
+		atom_fragment = np.array([frag_idx for frag_idx, atoms in enumerate(self._frag_atom) for _ in atoms], dtype=np.int64)
+		self._min_distances = PairMatrix(len(self._frag_atom), ["distance"], dtype=self._dtype, memmap_dir=self._memmap_dir)
+		min_distance_packed(coordinates[atom_idx], atom_fragment, len(self._frag_atom), cutoff, out=self._min_distances.values[0])
+		return self
+
+
+	def get_min_distance_matrix(self, rows=None, cols=None, unit="angstrom"):
+		"""
+		フラグメント間距離 (最短原子間距離) の行列 (丸めなし) を返すメソッド (`set_coordinates()` で座標が設定されている場合は座標から計算した値)
+
+		Args:
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+			unit (str): "bohr" or "angstrom" (Default: "angstrom")
+
+		Returns:
+			ndarray
+		"""
+		factor = 1.0
+		if unit == "bohr":
+			factor = 1.0 / BOHR_RADIUS
+		if self._min_distances is not None:
+			return self._min_distances.expand("distance", factor, rows, cols)
+		if self._energy_IFIE is None:
+			sys.stderr.write("ERROR: IFIE data is not found in .log.\n")
+			sys.exit(1)
+		return self._energy_IFIE.expand("distance", factor, rows, cols)
+
+
+	def get_min_distance_dense(self, out=None, unit="angstrom"):
+		"""
+		フラグメント間距離 (最短原子間距離) の行列全体 (丸めなし) を展開するメソッド (out に np.memmap を渡すとディスク上に展開できる)
+
+		Args:
+			out (ndarray, optional): 出力先 (N, N) (Default: None (新しい配列))
+			unit (str): "bohr" or "angstrom" (Default: "angstrom")
+
+		Returns:
+			ndarray
+		"""
+		factor = 1.0
+		if unit == "bohr":
+			factor = 1.0 / BOHR_RADIUS
+		store = self._min_distances if self._min_distances is not None else self._energy_IFIE
+		if store is None:
+			sys.stderr.write("ERROR: IFIE data is not found in .log.\n")
+			sys.exit(1)
+		return store.expand_all("distance", factor, out=out)
+
+
+	def get_neighbor_list(self, cutoff):
+		"""
+		カットオフ内のフラグメントペアの近接リストを返すメソッド (`set_coordinates()` で座標が設定されている場合は座標から計算した距離、それ以外は IFIE の距離を使う)
+
+		Args:
+			cutoff (float): カットオフ距離 (Å) (None の場合は全ペア)
+
+		Returns:
+			NeighborList
+		"""
+		if self._min_distances is not None:
+			store = self._min_distances
+		elif self._energy_IFIE is not None:
+			store = self._energy_IFIE
+		else:
+			sys.stderr.write("ERROR: IFIE data is not found in .log.\n")
+			sys.exit(1)
+		return NeighborList.from_packed(len(self._frag_atom), store.component("distance"), np.inf if cutoff is None else cutoff)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NeighborList class
+"""
+
+import numpy as np
+
+from mods.PairMatrix import pair_from_index
+
+
+
+# =============== class =============== #
+class NeighborList:
+	""" カットオフ内のフラグメントペア (近接リスト) を保持するクラス """
+	def __init__(self, n_fragment, pair_idx, distances, cutoff):
+		"""
+		Args:
+			n_fragment (int): フラグメント数
+			pair_idx (ndarray): カットオフ内のペアのパック配列インデックス
+			distances (ndarray): ペアの距離 (Å)
+			cutoff (float): カットオフ距離 (Å)
+		"""
+		pair_idx = np.asarray(pair_idx, dtype=np.int64)
+		distances = np.asarray(distances, dtype=np.float64)
+		rows, cols = pair_from_index(pair_idx)
+
+		# 行 (小さい方のフラグメント)、列の順に並べる
+		order = np.lexsort([cols, rows])
+		self._n_fragment = n_fragment
+		self._cutoff = cutoff
+		self._pair_idx = pair_idx[order]
+		self._rows = rows[order]
+		self._cols = cols[order]
+		self._distances = distances[order]
+
+		# フラグメントごとの近接フラグメント (CSR 形式; 両方向)
+		fragment = np.concatenate([self._rows, self._cols])
+		partner = np.concatenate([self._cols, self._rows])
+		order = np.lexsort([partner, fragment])
+		self._partners = partner[order]
+		self._partner_pair = np.concatenate([np.arange(len(self._rows))] * 2)[order]
+		self._indptr = np.concatenate([[0], np.cumsum(np.bincount(fragment, minlength=n_fragment))])
+
+	def __len__(self):
+		return len(self._pair_idx)
+
+	@property
+	def n_fragment(self):
+		return self._n_fragment
+
+	@property
+	def cutoff(self):
+		return self._cutoff
+
+	@property
+	def n_pair(self):
+		return len(self._pair_idx)
+
+	@property
+	def pair_idx(self):
+		return self._pair_idx
+
+	@property
+	def rows(self):
+		return self._rows
+
+	@property
+	def cols(self):
+		return self._cols
+
+	@property
+	def distances(self):
+		return self._distances
+
+
+	@classmethod
+	def from_packed(cls, n_fragment, packed_distances, cutoff):
+		"""
+		パック配列の距離から近接リストを作成するメソッド
+
+		Args:
+			n_fragment (int): フラグメント数
+			packed_distances (ndarray): 全ペアの距離 (Å) のパック配列 (NaN のペアは含めない)
+			cutoff (float): カットオフ距離 (Å)
+
+		Returns:
+			NeighborList
+		"""
+		packed_distances = np.asarray(packed_distances)
+		pair_idx = np.flatnonzero(packed_distances <= cutoff)
+		return cls(n_fragment, pair_idx, packed_distances[pair_idx], cutoff)
+
+
+	def neighbors(self, idx):
+		"""
+		フラグメントの近接フラグメントを返すメソッド
+
+		Args:
+			idx (int): 0-origin フラグメントインデックス
+
+		Returns:
+			ndarray: 0-origin フラグメントインデックス (昇順)
+		"""
+		return self._partners[self._indptr[idx] : self._indptr[idx + 1]]
+
+
+	def neighbor_distances(self, idx):
+		"""
+		フラグメントと近接フラグメントとの距離を返すメソッド (`neighbors()` と同じ順)
+
+		Args:
+			idx (int): 0-origin フラグメントインデックス
+
+		Returns:
+			ndarray
+		"""
+		return self._distances[self._partner_pair[self._indptr[idx] : self._indptr[idx + 1]]]
+
+
+	def count(self):
+		"""
+		フラグメントごとの近接フラグメント数を返すメソッド
+
+		Returns:
+			ndarray
+		"""
+		return np.diff(self._indptr)
+
+
+	def select(self, index):
+		"""
+		両方のフラグメントが指定したフラグメントに含まれるペアのみの近接リストを返すメソッド
+
+		Args:
+			index (ndarray): 0-origin フラグメントインデックス
+
+		Returns:
+			NeighborList
+		"""
+		selected = np.zeros(self._n_fragment, dtype=bool)
+		selected[np.asarray(index, dtype=np.int64)] = True
+		flag = selected[self._rows] & selected[self._cols]
+		return NeighborList(self._n_fragment, self._pair_idx[flag], self._distances[flag], self._cutoff)
+
+
+	def mask(self):
+		"""
+		近接ペアの真偽値パック配列を返すメソッド
+
+		Returns:
+			ndarray
+		"""
+		mask = np.zeros(self._n_fragment * (self._n_fragment - 1) // 2, dtype=bool)
+		mask[self._pair_idx] = True
+		return mask
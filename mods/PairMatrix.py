@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PairMatrix class
+"""
+
+import sys
+import tempfile
+import numpy as np
+
+
+
+# =============== constant =============== #
+DTYPE_LIST = ["float64", "float32"]
+BLOCK_SIZE = 1 << 24
+
+
+
+# =============== function =============== #
+def n_pair(n_fragment):
+	"""
+	function to get number of fragment pairs
+
+	Args:
+		n_fragment (int): number of fragments
+
+	Returns:
+		int: N(N-1)/2
+	"""
+	return n_fragment * (n_fragment - 1) // 2
+
+
+def pair_index(i, j):
+	"""
+	function to get packed index of fragment pair (same order as IFIE section of .cpf: (1,0), (2,0), (2,1), (3,0), ...)
+
+	Args:
+		i (int or ndarray): 0-origin fragment index
+		j (int or ndarray): 0-origin fragment index (i != j)
+
+	Returns:
+		int or ndarray: packed index
+	"""
+	i_high = np.maximum(i, j)
+	i_low = np.minimum(i, j)
+	return i_high * (i_high - 1) // 2 + i_low
+
+
+def create_array(shape, dtype="float64", fill_value=None, memmap_dir=None):
+	"""
+	function to create array in memory or on disk (memory-mapped temporary file removed automatically)
+
+	Args:
+		shape (tuple): shape of array
+		dtype (str, optional): data type (Default: "float64")
+		fill_value (float, optional): initial value (Default: None (zero))
+		memmap_dir (str, optional): directory for memory-mapped file (Default: None (in memory))
+
+	Returns:
+		ndarray or np.memmap
+	"""
+	if memmap_dir is None:
+		if fill_value is None:
+			return np.zeros(shape, dtype=dtype)
+		return np.full(shape, fill_value, dtype=dtype)
+
+	if int(np.prod(shape)) == 0:
+		return np.zeros(shape, dtype=dtype)
+
+	# 作成直後に削除されるファイルを使うため、後片付けは不要
+	with tempfile.TemporaryFile(dir=memmap_dir) as obj_output:
+		values = np.memmap(obj_output, dtype=dtype, mode="w+", shape=shape)
+	if fill_value is not None and fill_value != 0:
+		values[:] = fill_value
+	return values
+
+
+def pair_from_index(pair_idx):
+	"""
+	function to get fragment pair from packed index (inverse of `pair_index()`)
+
+	Args:
+		pair_idx (ndarray): packed indices
+
+	Returns:
+		list: [0-origin smaller fragment indices (ndarray), 0-origin larger fragment indices (ndarray)]
+	"""
+	pair_idx = np.asarray(pair_idx, dtype=np.int64)
+	i_high = ((1 + np.sqrt(1 + 8 * pair_idx.astype(np.float64))) // 2).astype(np.int64)
+	# 浮動小数点の誤差を補正する
+	i_high -= i_high * (i_high - 1) // 2 > pair_idx
+	i_high += (i_high + 1) * i_high // 2 <= pair_idx
+	return [pair_idx - i_high * (i_high - 1) // 2, i_high]
+
+
+
+# =============== class =============== #
+class PairMatrix:
+	""" 対称 (および反対称) 行列を上三角のみで保持するクラス """
+	def __init__(self, n_fragment, components, antisymmetric=None, dtype="float64", fill_value=0.0, memmap_dir=None):
+		"""
+		Args:
+			n_fragment (int): フラグメント数
+			components (list): 成分名のリスト
+			antisymmetric (list, optional): 反対称成分名のリスト (Default: None)
+			dtype (str, optional): `float64` or `float32` (Default: "float64")
+			fill_value (float, optional): 初期値 (Default: 0.0)
+			memmap_dir (str, optional): 値をディスク上 (np.memmap) に置く場合のディレクトリ (Default: None (メモリ上))
+		"""
+		if str(dtype) not in DTYPE_LIST:
+			sys.stderr.write("ERROR: unsupported dtype ({0}).\n".format(dtype))
+			sys.exit(1)
+
+		self._n_fragment = n_fragment
+		self._components = list(components)
+		self._component_index = {component: idx for idx, component in enumerate(self._components)}
+		self._antisymmetric = [v in (antisymmetric or []) for v in self._components]
+		self._values = create_array((len(self._components), n_pair(n_fragment)), dtype, fill_value, memmap_dir)
+
+	@property
+	def n_fragment(self):
+		return self._n_fragment
+
+	@property
+	def n_pair(self):
+		return self._values.shape[1]
+
+	@property
+	def components(self):
+		return self._components
+
+	@property
+	def dtype(self):
+		return self._values.dtype
+
+	@property
+	def values(self):
+		return self._values
+
+	@property
+	def nbytes(self):
+		return self._values.nbytes
+
+	@property
+	def is_memmap(self):
+		return isinstance(self._values, np.memmap)
+
+
+	def component_index(self, component):
+		"""
+		成分のインデックスを返すメソッド
+
+		Args:
+			component (str): 成分名
+
+		Returns:
+			int
+		"""
+		if component not in self._component_index:
+			sys.stderr.write("ERROR: undefined component ({0}).\n".format(component))
+			sys.exit(1)
+		return self._component_index[component]
+
+
+	def component(self, component):
+		"""
+		成分のパック配列 (上三角; 行 < 列 の値) を返すメソッド
+
+		Args:
+			component (str): 成分名
+
+		Returns:
+			ndarray: (N(N-1)/2,)
+		"""
+		return self._values[self.component_index(component)]
+
+
+	def set_packed(self, pair_idx, values):
+		"""
+		パック配列のインデックスで値を設定するメソッド (値は 行 < 列 側のもの)
+
+		Args:
+			pair_idx (int): パック配列のインデックス
+			values (list): 全成分の値
+
+		Returns:
+			self
+		"""
+		self._values[:, pair_idx] = values
+		return self
+
+
+	def set_pair(self, i, j, values):
+		"""
+		行列要素 [i][j] として値を設定するメソッド (反対称成分は [j][i] に符号を反転した値が入る)
+
+		Args:
+			i (int): 0-origin 行インデックス
+			j (int): 0-origin 列インデックス
+			values (list): 全成分の値
+
+		Returns:
+			self
+		"""
+		values = np.asarray(values, dtype=self._values.dtype)
+		if i > j:
+			values = np.where(self._antisymmetric, -values, values)
+		self._values[:, pair_index(i, j)] = values
+		return self
+
+
+	def set_pairs(self, rows, cols, values):
+		"""
+		行列要素 [rows[k]][cols[k]] として値をまとめて設定するメソッド
+
+		Args:
+			rows (ndarray): 0-origin 行インデックス
+			cols (ndarray): 0-origin 列インデックス (rows と同じ長さ; rows[k] != cols[k])
+			values (ndarray): (成分数, len(rows))
+
+		Returns:
+			self
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		values = np.array(values, dtype=self._values.dtype)
+		lower = rows > cols
+		for c, flag in enumerate(self._antisymmetric):
+			if flag:
+				np.negative(values[c], out=values[c], where=lower)
+		self._values[:, pair_index(rows, cols)] = values
+		return self
+
+
+	def get_pair(self, i, j):
+		"""
+		行列要素 [i][j] の全成分の値を返すメソッド
+
+		Args:
+			i (int): 0-origin 行インデックス
+			j (int): 0-origin 列インデックス
+
+		Returns:
+			list
+		"""
+		values = self._values[:, pair_index(i, j)].tolist()
+		if i > j:
+			values = [-v if flag else v for v, flag in zip(values, self._antisymmetric)]
+		return values
+
+
+	def gather(self, rows, cols):
+		"""
+		行列要素 [rows[k]][cols[k]] の全成分の値を返すメソッド
+
+		Args:
+			rows (ndarray): 0-origin 行インデックス
+			cols (ndarray): 0-origin 列インデックス (rows と同じ長さ; rows[k] != cols[k])
+
+		Returns:
+			ndarray: (成分数, len(rows)) (float64)
+		"""
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		values = self._values[:, pair_index(rows, cols)].astype(np.float64)
+		lower = rows > cols
+		for c, flag in enumerate(self._antisymmetric):
+			if flag:
+				np.negative(values[c], out=values[c], where=lower)
+		return values
+
+
+	def expand(self, components, factor=1.0, rows=None, cols=None, mask=None):
+		"""
+		成分の和に係数を掛けた行列を密行列 (float64) に展開して返すメソッド
+
+		Args:
+			components (str or list): 成分名 (またはそのリスト)
+			factor (float, optional): 和に掛ける係数 (Default: 1.0)
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+			mask (ndarray, optional): 0 にするペアの真偽値パック配列 (Default: None)
+
+		Returns:
+			ndarray: (len(rows), len(cols))
+		"""
+		if isinstance(components, str):
+			components = [components]
+		if rows is None:
+			rows = np.arange(self._n_fragment)
+		if cols is None:
+			cols = np.arange(self._n_fragment)
+		rows = np.asarray(rows, dtype=np.int64)[:, np.newaxis]
+		cols = np.asarray(cols, dtype=np.int64)[np.newaxis, :]
+
+		diagonal = rows == cols
+		idx = np.where(diagonal, 0, pair_index(rows, cols))
+		lower = rows > cols
+
+		if self.n_pair == 0:
+			return np.zeros(idx.shape, dtype=np.float64)
+
+		result = None
+		for component in components:
+			c = self.component_index(component)
+			values = self._values[c][idx].astype(np.float64)
+			if self._antisymmetric[c]:
+				np.negative(values, out=values, where=lower)
+			if result is None:
+				result = values
+			else:
+				result += values
+		result *= factor
+
+		result[diagonal] = 0.0
+		if mask is not None:
+			result[mask[idx] & ~diagonal] = 0.0
+		return result
+
+
+	def expand_linear(self, weights, rows=None, cols=None, mask=None):
+		"""
+		成分の線形結合 (複数) を密行列 (float64) に展開して返すメソッド (各成分は 1 回だけ読む)
+
+		Args:
+			weights (ndarray): 線形結合の係数 (結合数, 成分数)
+			rows (ndarray, optional): 0-origin 行インデックス (Default: None (all))
+			cols (ndarray, optional): 0-origin 列インデックス (Default: None (all))
+			mask (ndarray, optional): 0 にするペアの真偽値パック配列 (Default: None)
+
+		Returns:
+			ndarray: (結合数, len(rows), len(cols))
+		"""
+		weights = np.asarray(weights, dtype=np.float64).reshape(-1, len(self._components))
+		if rows is None:
+			rows = np.arange(self._n_fragment)
+		if cols is None:
+			cols = np.arange(self._n_fragment)
+		rows = np.asarray(rows, dtype=np.int64)[:, np.newaxis]
+		cols = np.asarray(cols, dtype=np.int64)[np.newaxis, :]
+
+		diagonal = rows == cols
+		idx = np.where(diagonal, 0, pair_index(rows, cols))
+		lower = rows > cols
+
+		result = np.zeros((weights.shape[0],) + idx.shape)
+		if self.n_pair == 0:
+			return result
+
+		for c in np.flatnonzero(np.any(weights != 0, axis=0)):
+			values = self._values[c][idx].astype(np.float64)
+			if self._antisymmetric[c]:
+				np.negative(values, out=values, where=lower)
+			for k in np.flatnonzero(weights[:, c]):
+				result[k] += weights[k, c] * values
+
+		result[:, diagonal] = 0.0
+		if mask is not None:
+			result[:, mask[idx] & ~diagonal] = 0.0
+		return result
+
+
+	def sum_pairs(self, components, factor=1.0, rows=None, cols=None, mask=None):
+		"""
+		行列要素 [rows[k]][cols[k]] について成分の和に係数を掛けた値を返すメソッド (密行列に展開しない)
+
+		Args:
+			components (str or list): 成分名 (またはそのリスト)
+			factor (float, optional): 和に掛ける係数 (Default: 1.0)
+			rows (ndarray): 0-origin 行インデックス
+			cols (ndarray): 0-origin 列インデックス (rows と同じ長さ; rows[k] != cols[k])
+			mask (ndarray, optional): 0 にするペアの真偽値パック配列 (Default: None)
+
+		Returns:
+			ndarray: (len(rows),) (float64)
+		"""
+		if isinstance(components, str):
+			components = [components]
+		rows = np.asarray(rows, dtype=np.int64)
+		cols = np.asarray(cols, dtype=np.int64)
+		idx = pair_index(rows, cols)
+		lower = rows > cols
+
+		result = None
+		for component in components:
+			c = self.component_index(component)
+			values = self._values[c][idx].astype(np.float64)
+			if self._antisymmetric[c]:
+				np.negative(values, out=values, where=lower)
+			if result is None:
+				result = values
+			else:
+				result += values
+		result *= factor
+
+		if mask is not None:
+			result[mask[idx]] = 0.0
+		return result
+
+
+	def expand_all(self, components, factor=1.0, mask=None, out=None, block_size=BLOCK_SIZE):
+		"""
+		成分の和に係数を掛けた行列全体を密行列に展開するメソッド
+		(下三角の行ブロックごとにパック配列の連続した範囲のみを読むため、ディスク上の値も順に読める)
+
+		Args:
+			components (str or list): 成分名 (またはそのリスト)
+			factor (float, optional): 和に掛ける係数 (Default: 1.0)
+			mask (ndarray, optional): 0 にするペアの真偽値パック配列 (Default: None)
+			out (ndarray, optional): 出力先 (N, N) (np.memmap も可) (Default: None (新しい配列))
+			block_size (int, optional): 1 ブロックの行列要素数 (Default: 1 << 24)
+
+		Returns:
+			ndarray: (N, N)
+		"""
+		n_fragment = self._n_fragment
+		if out is None:
+			out = np.zeros((n_fragment, n_fragment))
+		n_row = max(1, block_size // max(1, n_fragment))
+		for start in range(0, n_fragment, n_row):
+			end = min(start + n_row, n_fragment)
+			# 行ブロック [start, end) の列 [0, end) と、その転置位置 (反対称成分の符号のため別に展開する) はパック配列の同じ範囲にある
+			out[start:end, :end] = self.expand(components, factor, np.arange(start, end), np.arange(end), mask)
+			out[:start, start:end] = self.expand(components, factor, np.arange(start), np.arange(start, end), mask)
+		return out
+
+
+	def to_dense(self, component):
+		"""
+		成分を密行列に展開して返すメソッド
+
+		Args:
+			component (str): 成分名
+
+		Returns:
+			ndarray: (N, N)
+		"""
+		return self.expand(component)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+RunMetrics class (machine-readable metrics of a run)
+"""
+
+import sys
+import os
+import time
+import json
+import socket
+import datetime
+import threading
+import contextlib
+
+try:
+	import resource
+except ImportError:
+	# Windows
+	resource = None
+
+
+
+# =============== function =============== #
+def get_peak_rss():
+	"""
+	function to get peak resident set size of this process and of its terminated children (bytes)
+
+	Returns:
+		list: [self (int or None), children (int or None)]
+	"""
+	if resource is None:
+		return [None, None]
+	# ru_maxrss は Linux では KiB、macOS では byte
+	scale = 1 if sys.platform == "darwin" else 1024
+	return [resource.getrusage(who).ru_maxrss * scale for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]]
+
+
+
+# =============== class =============== #
+class RunMetrics:
+	""" 実行の計測値 (入力、読み込み・書き込みの所要時間、メモリ、出力) を 1 行の JSON として追記するクラス """
+	def __init__(self, argv=None, version=None):
+		"""
+		Args:
+			argv (list, optional): コマンドライン引数 (Default: None)
+			version (str, optional): プログラムのバージョン (Default: None)
+		"""
+		self._time_start = time.perf_counter()
+		self._lock = threading.Lock()
+		self._record = {
+			"time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+			"host": socket.gethostname(),
+			"pid": os.getpid(),
+			"version": version,
+			"argv": argv,
+			"status": None,
+			"seconds": None,
+			"input": None,
+			"stages": {},
+			"skipped_sections": [],
+			"parallel_sections": [],
+			"outputs": [],
+			"counters": {},
+			"peak_rss_bytes": None,
+			"peak_rss_children_bytes": None,
+		}
+
+	@property
+	def record(self):
+		return self._record
+
+
+	@contextlib.contextmanager
+	def stage(self, name):
+		"""
+		処理段階の所要時間を計測するコンテキストマネージャ (同じ名前の段階は合算する)
+
+		Args:
+			name (str): 段階の名前
+
+		Yields:
+			None
+		"""
+		time_start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add_stage(name, time.perf_counter() - time_start)
+
+
+	def add_stage(self, name, seconds):
+		"""
+		処理段階の所要時間を加えるメソッド
+
+		Args:
+			name (str): 段階の名前
+			seconds (float): 所要時間 (秒)
+
+		Returns:
+			self
+		"""
+		with self._lock:
+			self._record["stages"][name] = self._record["stages"].get(name, 0.0) + seconds
+		return self
+
+
+	def count(self, name, n=1):
+		"""
+		カウンタ (キャッシュヒット数など) を加算するメソッド
+
+		Args:
+			name (str): カウンタの名前
+			n (int, optional): 加算する値 (Default: 1)
+
+		Returns:
+			self
+		"""
+		with self._lock:
+			self._record["counters"][name] = self._record["counters"].get(name, 0) + n
+		return self
+
+
+	def set_input(self, input_file, data_FMO=None, input_type=None):
+		"""
+		入力の情報を記録するメソッド (読み込み後であれば、読み込みの統計も記録する)
+
+		Args:
+			input_file (str): 入力ファイルパス (`-` は標準入力)
+			data_FMO (FileCpf or FileLogABINITMP, optional): 読み込んだデータ (Default: None)
+			input_type (str, optional): 入力の種類 (Default: None (拡張子))
+
+		Returns:
+			self
+		"""
+		info = {
+			"path": input_file,
+			"type": input_type if input_type is not None else os.path.splitext(input_file)[1].lstrip(".").lower(),
+			"bytes": os.path.getsize(input_file) if os.path.isfile(input_file) else None,
+		}
+		if data_FMO is not None:
+			info["version"] = getattr(data_FMO, "version", None)
+			info["n_fragment"] = len(data_FMO.get_label())
+			info["n_atom"] = getattr(data_FMO, "n_atom", None)
+			if info["n_atom"] is None:
+				info["n_atom"] = sum(len(atoms) for atoms in data_FMO.get_fragment_atom())
+			info["n_trimer"] = getattr(data_FMO, "n_trimer", None)
+			info["n_tetramer"] = getattr(data_FMO, "n_tetramer", None)
+
+			read_stats = getattr(data_FMO, "read_stats", None)
+			if read_stats is not None:
+				for section, seconds in read_stats["sections"].items():
+					self.add_stage("read." + section, seconds)
+				self._record["skipped_sections"] = list(read_stats["skipped_sections"])
+				self._record["parallel_sections"] = list(read_stats.get("parallel_sections", []))
+		self._record["input"] = info
+		return self
+
+
+	def add_output(self, output, output_type=None, seconds=None, cached=False):
+		"""
+		出力ファイルを記録するメソッド (スレッドから呼び出してよい)
+
+		Args:
+			output (str): 出力ファイルパス
+			output_type (str, optional): 出力の種類 (Default: None)
+			seconds (float, optional): 書き込みの所要時間 (秒) (Default: None)
+			cached (bool, optional): 最新のため書き込まなかった出力か (Default: False)
+
+		Returns:
+			self
+		"""
+		info = {
+			"path": output,
+			"type": output_type,
+			"bytes": os.path.getsize(output) if os.path.isfile(output) else None,
+			"seconds": seconds,
+			"cached": cached,
+		}
+		with self._lock:
+			self._record["outputs"].append(info)
+		return self
+
+
+	def finish(self, status=0):
+		"""
+		終了時の値 (終了ステータス、全体の所要時間、最大メモリ使用量) を記録するメソッド
+
+		Args:
+			status (int, optional): 終了ステータス (Default: 0)
+
+		Returns:
+			dict: 記録
+		"""
+		self._record["status"] = status
+		self._record["seconds"] = time.perf_counter() - self._time_start
+		self._record["peak_rss_bytes"], self._record["peak_rss_children_bytes"] = get_peak_rss()
+		return self._record
+
+
+	def write(self, destination):
+		"""
+		記録を 1 行の JSON として追記するメソッド (1 回の write で追記するため、複数の実行が同じファイルに追記しても行が混ざらない)
+
+		Args:
+			destination (str or int): 出力ファイルパス (`/dev/fd/N` なども可)、またはファイルディスクリプタ
+
+		Returns:
+			self
+		"""
+		if self._record["seconds"] is None:
+			self.finish()
+		data = (json.dumps(self._record, separators=(",", ":"), default=str) + "\n").encode()
+		if isinstance(destination, int):
+			os.write(destination, data)
+			return self
+
+		obj_file = os.open(destination, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+		try:
+			os.write(obj_file, data)
+		finally:
+			os.close(obj_file)
+		return self
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SharedArray class (array shared between processes)
+"""
+
+import os
+import tempfile
+import numpy as np
+
+try:
+	from multiprocessing import shared_memory
+except ImportError:
+	# Python < 3.8
+	shared_memory = None
+
+
+
+# =============== class =============== #
+class SharedArray:
+	""" プロセス間で共有する配列 (共有メモリ、またはディスク上のファイル) のクラス """
+	def __init__(self, shape, dtype="float64", memmap_dir=None, handle=None):
+		"""
+		Args:
+			shape (tuple): 配列の形状
+			dtype (str, optional): データ型 (Default: "float64")
+			memmap_dir (str, optional): ファイルを置くディレクトリ (Default: None (共有メモリ))
+			handle (list, optional): 既存の配列に接続する場合の `handle` (Default: None (新規作成))
+		"""
+		self._owner = handle is None
+		self._shm = None
+		if handle is None:
+			shape = tuple(int(v) for v in shape)
+			dtype = np.dtype(dtype).str
+			nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+			if memmap_dir is None and shared_memory is not None:
+				self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+				handle = ["shm", self._shm.name, shape, dtype]
+			else:
+				obj_file, path = tempfile.mkstemp(suffix=".npy", dir=memmap_dir)
+				os.ftruncate(obj_file, nbytes)
+				os.close(obj_file)
+				handle = ["file", path, shape, dtype]
+		elif handle[0] == "shm":
+			self._shm = shared_memory.SharedMemory(name=handle[1])
+
+		self._handle = handle
+		kind, name, shape, dtype = handle
+		if kind == "shm":
+			self._values = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+		else:
+			self._values = np.memmap(name, dtype=dtype, mode="r+", shape=shape)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	@property
+	def handle(self):
+		return self._handle
+
+	@property
+	def values(self):
+		return self._values
+
+
+	def close(self):
+		"""
+		配列を閉じるメソッド (作成したプロセスでは共有メモリやファイルも削除する)
+
+		Returns:
+			self
+		"""
+		if self._values is None:
+			return self
+
+		self._values = None
+		if self._shm is not None:
+			self._shm.close()
+			if self._owner:
+				self._shm.unlink()
+		elif self._owner:
+			os.remove(self._handle[1])
+		return self
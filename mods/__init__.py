@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+"""
+modules for cpf2csv
+"""
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import sys, signal
-signal.signal(signal.SIGINT, signal.SIG_DFL)
+import sys
 import os
 
 
@@ -53,7 +52,12 @@ def check_overwrite(file):
 		# Warn if file exists
 		sys.stderr.write("WARN: %s exists. Overwrite it? (y/N): " % file)
 		sys.stderr.flush()
-		user = sys.stdin.readline().strip()
+		user = sys.stdin.readline()
+		if user == "":
+			# When standard input is closed (e.g. consumed as input data)
+			sys.stderr.write("\nERROR: no answer from standard input (use -O to overwrite).\n")
+			sys.exit(1)
+		user = user.strip()
 
 		if user != "y":
 			# When there is no permission to overwrite
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for charge tables
+"""
+
+import sys
+
+
+
+# =============== constant =============== #
+CHARGE_SCHEMES = ["HF_Mulliken", "MP2_Mulliken", "HF_NBO", "MP2_NBO", "HF_ESP", "MP2_ESP"]
+DEFAULT_CHARGE_SCHEME = "HF_Mulliken"
+CHARGE_LEVELS = ["atom", "fragment", "residue"]
+
+
+
+# =============== function =============== #
+def get_charge_column(scheme):
+	"""
+	function to get column name of structure section for charge scheme
+
+	Args:
+		scheme (str): charge scheme in `CHARGE_SCHEMES`
+
+	Returns:
+		str
+	"""
+	if scheme not in CHARGE_SCHEMES:
+		sys.stderr.write("ERROR: undefined charge scheme ({0}).\n".format(scheme))
+		sys.exit(1)
+	return scheme + "Charge"
+
+
+def check_charge_level(level):
+	"""
+	function to check level of charge table
+
+	Args:
+		level (str): level in `CHARGE_LEVELS`
+
+	Returns:
+		str
+	"""
+	if level not in CHARGE_LEVELS:
+		sys.stderr.write("ERROR: undefined charge level ({0}).\n".format(level))
+		sys.exit(1)
+	return level
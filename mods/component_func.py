@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for components of interaction (columns of IFIE section and their linear combinations)
+"""
+
+import sys
+import re
+import numpy as np
+
+
+
+# =============== constant =============== #
+RE_FILE_LABEL = re.compile(r"[^0-9A-Za-z_.+-]")
+
+
+
+# =============== function =============== #
+def parse_component(expression):
+	"""
+	function to parse expression of component (`[LABEL=]TERM[+TERM ...]`; TERM is `COLUMN`, `-COLUMN` or `COEFFICIENT*COLUMN`)
+
+	Args:
+		expression (str): expression (e.g. `SCS-MP2-IFIE`, `BSSE=HF-IFIE-BSSE+MP2-IFIE-BSSE`, `X=0.5*MP2-IFIE+-1*PIEDA-EX`)
+
+	Returns:
+		list: [label (str), [[column (str), coefficient (float)], ...]]
+	"""
+	label, _, body = expression.rpartition("=")
+	body = body.strip()
+	if label == "":
+		label = body
+	label = label.strip()
+
+	terms = []
+	for term in body.split("+"):
+		term = term.strip()
+		coefficient = 1.0
+		if "*" in term:
+			value, _, term = term.partition("*")
+			try:
+				coefficient = float(value)
+			except ValueError:
+				sys.stderr.write("ERROR: invalid coefficient ({0}) in component ({1}).\n".format(value, expression))
+				sys.exit(1)
+		elif term.startswith("-"):
+			coefficient = -1.0
+			term = term[1:]
+		term = term.strip()
+		if term == "" or label == "":
+			sys.stderr.write("ERROR: invalid component ({0}).\n".format(expression))
+			sys.exit(1)
+		terms.append([term, coefficient])
+	return [label, terms]
+
+
+def get_component_weights(expressions, columns, factors=None):
+	"""
+	function to get coefficients of components for columns
+
+	Args:
+		expressions (list): expressions of components (see `parse_component()`)
+		columns (list): available column names
+		factors (list, optional): unit conversion factors of columns (Default: None (1.0))
+
+	Returns:
+		list: [labels (list), weights (ndarray; (len(expressions), len(columns)))]
+	"""
+	if factors is None:
+		factors = [1.0] * len(columns)
+	labels = []
+	weights = np.zeros((len(expressions), len(columns)))
+	for k, expression in enumerate(expressions):
+		label, terms = parse_component(expression)
+		if label in labels:
+			sys.stderr.write("ERROR: duplicate component ({0}).\n".format(label))
+			sys.exit(1)
+		labels.append(label)
+		for column, coefficient in terms:
+			if column not in columns:
+				sys.stderr.write("ERROR: undefined component ({0}; available: {1}).\n".format(column, ", ".join(columns)))
+				sys.exit(1)
+			c = columns.index(column)
+			weights[k, c] += coefficient * factors[c]
+	return [labels, weights]
+
+
+def get_file_label(label):
+	"""
+	function to get label of component for file name (characters other than alphanumerics, `_`, `.`, `+` and `-` are replaced with `_`)
+
+	Args:
+		label (str): label of component
+
+	Returns:
+		str
+	"""
+	return RE_FILE_LABEL.sub("_", label)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for differential IFIE of two systems (fragments are aligned by residue)
+"""
+
+import sys
+import numpy as np
+
+
+
+# =============== constant =============== #
+DIFF_ENERGY_TYPES = ["Total", "ES", "EX", "CT", "DI", "Q"]
+
+
+
+# =============== function =============== #
+def get_fragment_keys(data_FMO):
+	"""
+	function to get keys of fragments for alignment ((chain, residue number, residue name, occurrence); occurrence distinguishes fragments of the same residue)
+
+	Args:
+		data_FMO (FileCpf): loaded data
+
+	Returns:
+		list: [(str, int, str, int), ...]
+	"""
+	columns, rows = data_FMO.get_fragment_table()
+	if "chain" not in columns or "residue_number" not in columns:
+		sys.stderr.write("ERROR: residue information is required for alignment of fragments (only .cpf).\n")
+		sys.exit(1)
+
+	chain_idx, number_idx, name_idx = [columns.index(column) for column in ["chain", "residue_number", "residue_name"]]
+	keys = []
+	counter = {}
+	for row in rows:
+		key = (row[chain_idx], row[number_idx], row[name_idx])
+		keys.append(key + (counter.get(key, 0),))
+		counter[key] = counter.get(key, 0) + 1
+	return keys
+
+
+def format_key(key):
+	"""
+	function to format key of fragment as label (`chain:residue_name residue_number`, followed by `#occurrence` for the second and later fragments of the same residue)
+
+	Args:
+		key (tuple): (chain, residue number, residue name, occurrence)
+
+	Returns:
+		str
+	"""
+	label = "{0}:{2}{1}".format(*key)
+	if key[3] != 0:
+		label += "#{0}".format(key[3] + 1)
+	return label
+
+
+def align_fragments(data_first, data_second, index=None):
+	"""
+	function to align fragments of two systems by hash index on (chain, residue number, residue name)
+
+	Args:
+		data_first (FileCpf): first system (reference)
+		data_second (FileCpf): second system
+		index (ndarray, optional): 0-origin fragment indices of the first system to align (Default: None (all))
+
+	Returns:
+		dict: {"keys": keys of common fragments (list), "first": indices in first system (ndarray), "second": indices in second system (ndarray), "first_only": indices of unmatched fragments of first system (ndarray), "second_only": indices of unmatched fragments of second system (ndarray), "keys_first": keys of first system (list), "keys_second": keys of second system (list)}
+	"""
+	keys_first = get_fragment_keys(data_first)
+	keys_second = get_fragment_keys(data_second)
+	dict_second = {key: idx for idx, key in enumerate(keys_second)}
+	if index is None:
+		index = np.arange(len(keys_first))
+
+	pairs = [[idx, dict_second.get(keys_first[idx])] for idx in np.asarray(index, dtype=np.int64).tolist()]
+	index_first = np.array([i for i, j in pairs if j is not None], dtype=np.int64)
+	index_second = np.array([j for i, j in pairs if j is not None], dtype=np.int64)
+	matched = np.zeros(len(keys_second), dtype=bool)
+	matched[index_second] = True
+	dict_first = {key: idx for idx, key in enumerate(keys_first)}
+	second_only = np.array([j for j in np.flatnonzero(~matched).tolist() if keys_second[j] not in dict_first], dtype=np.int64)
+	return {
+		"keys": [keys_first[i] for i in index_first.tolist()],
+		"first": index_first,
+		"second": index_second,
+		"first_only": np.array([i for i, j in pairs if j is None], dtype=np.int64),
+		"second_only": second_only,
+		"keys_first": keys_first,
+		"keys_second": keys_second,
+	}
+
+
+def diff_energy_matrix(data_first, data_second, energy_type, index_first, index_second, rows=None):
+	"""
+	function to calculate difference of energy matrices (second - first) over aligned fragments
+
+	Args:
+		data_first (FileCpf): first system
+		data_second (FileCpf): second system
+		energy_type (str): energy type in `DIFF_ENERGY_TYPES`
+		index_first (ndarray): 0-origin indices of aligned fragments in first system
+		index_second (ndarray): 0-origin indices of aligned fragments in second system (same length as `index_first`)
+		rows (ndarray, optional): positions of rows in aligned fragments (Default: None (all))
+
+	Returns:
+		ndarray: (rows, aligned fragments)
+	"""
+	if rows is None:
+		rows = np.arange(len(index_first))
+	rows = np.asarray(rows, dtype=np.int64)
+	matrix = data_second.get_energy_matrix(energy_type, index_second[rows], index_second)
+	matrix -= data_first.get_energy_matrix(energy_type, index_first[rows], index_first)
+	return matrix
+
+
+def check_diff_types(data_first, data_second, energy_types):
+	"""
+	function to check that energy types are available for differential IFIE in both systems
+
+	Args:
+		data_first (FileCpf): first system
+		data_second (FileCpf): second system
+		energy_types (list): energy types
+
+	Returns:
+		None
+	"""
+	for energy_type in energy_types:
+		if energy_type not in DIFF_ENERGY_TYPES:
+			sys.stderr.write("ERROR: {0} is not available for differential IFIE.\n".format(energy_type))
+			sys.exit(1)
+		for data_FMO in [data_first, data_second]:
+			if not data_FMO.has_energy_type(energy_type):
+				sys.stderr.write("ERROR: {0} is not included in {1}.\n".format(energy_type, data_FMO.path))
+				sys.exit(1)
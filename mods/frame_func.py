@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for pandas DataFrame / Arrow Table views of loaded data (pandas and pyarrow are optional)
+"""
+
+import sys
+import numpy as np
+
+from mods.group_func import factorize
+
+
+
+# =============== constant =============== #
+FRAME_BACKENDS = ["pandas", "arrow"]
+
+
+
+# =============== function =============== #
+def import_backend(backend):
+	"""
+	function to import module for backend of table on demand (pandas and pyarrow are optional and take time to import)
+
+	Args:
+		backend (str): backend in `FRAME_BACKENDS`
+
+	Returns:
+		module: pandas or pyarrow
+	"""
+	if backend not in FRAME_BACKENDS:
+		sys.stderr.write("ERROR: undefined backend ({0}).\n".format(backend))
+		sys.exit(1)
+	try:
+		if backend == "pandas":
+			import pandas as module
+		else:
+			import pyarrow as module
+	except ImportError:
+		sys.stderr.write("ERROR: {0} is required for this table (pip install {0}).\n".format("pandas" if backend == "pandas" else "pyarrow"))
+		sys.exit(1)
+	return module
+
+
+def get_index_dtype(max_value):
+	"""
+	function to get the smallest integer type for values from 0 to max_value
+
+	Args:
+		max_value (int): maximum value
+
+	Returns:
+		numpy.dtype
+	"""
+	return np.min_scalar_type(max(int(max_value), 0))
+
+
+def get_pair_labels(labels):
+	"""
+	function to get labels of fragment pairs in packed order (`PairMatrix`; pair k is the element [i][j] (i < j) of the matrix)
+
+	Args:
+		labels (list): fragment labels (int)
+
+	Returns:
+		list: [labels of i (ndarray), labels of j (ndarray)] (the smallest integer type)
+	"""
+	labels = np.asarray(labels, dtype=np.int64)
+	n_fragment = len(labels)
+	n_pair = n_fragment * (n_fragment - 1) // 2
+	labels = labels.astype(get_index_dtype(labels.max() if n_fragment != 0 else 0))
+	labels_i = np.empty(n_pair, dtype=labels.dtype)
+	labels_j = np.empty(n_pair, dtype=labels.dtype)
+
+	# 列 (大きい方のインデックス) ごとに書き込む (ペア数分の int64 の中間配列を作らない)
+	start = 0
+	for j in range(1, n_fragment):
+		labels_i[start : start + j] = labels[:j]
+		labels_j[start : start + j] = labels[j]
+		start += j
+	return [labels_i, labels_j]
+
+
+def encode_categorical(values):
+	"""
+	function to encode values as categories in order of first appearance (surrounding spaces of strings are removed)
+
+	Args:
+		values (ndarray): values
+
+	Returns:
+		list: [codes (ndarray; the smallest signed integer type), categories (ndarray)]
+	"""
+	values = np.asarray(values)
+	if values.dtype.kind in ["U", "S", "O"]:
+		values = np.char.strip(values.astype(str))
+	codes, first = factorize(values)
+	return [codes.astype(np.min_scalar_type(-max(len(first), 1))), values[first]]
+
+
+def create_frame(columns, values, backend="pandas", categorical=None):
+	"""
+	function to create DataFrame or Arrow Table from column arrays (numerical arrays are wrapped without copy)
+
+	Args:
+		columns (list): column names
+		values (list): column values ([ndarray, ...])
+		backend (str, optional): `pandas` or `arrow` (Default: "pandas")
+		categorical (list, optional): column names to be categorical (Default: None)
+
+	Returns:
+		pandas.DataFrame or pyarrow.Table
+	"""
+	module = import_backend(backend)
+	categorical = set(categorical or [])
+
+	data = {}
+	for column, value in zip(columns, values):
+		if column in categorical:
+			codes, categories = encode_categorical(value)
+			if backend == "pandas":
+				data[column] = module.Categorical.from_codes(codes, categories=categories)
+			else:
+				data[column] = module.DictionaryArray.from_arrays(codes, categories)
+		elif backend == "pandas":
+			data[column] = np.asarray(value)
+		else:
+			data[column] = module.array(np.asarray(value))
+
+	if backend == "pandas":
+		return module.DataFrame(data, columns=list(columns), copy=False)
+	return module.table(data)
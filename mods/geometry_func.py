@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for geometry (inter-fragment minimum distances from atomic coordinates)
+"""
+
+import sys
+import itertools
+import numpy as np
+
+from mods.PairMatrix import n_pair, pair_index
+
+
+
+# =============== constant =============== #
+BLOCK_SIZE = 1 << 22
+CHUNK_ATOMS = 1 << 12
+
+
+
+# =============== function =============== #
+def iter_atom_pairs(coordinates, cutoff, chunk_atoms=CHUNK_ATOMS):
+	"""
+	generator to find atom pairs within cutoff by cell list (linear in the number of atoms)
+
+	Args:
+		coordinates (ndarray): atomic coordinates (n_atom, 3)
+		cutoff (float): cutoff distance (same unit as coordinates)
+		chunk_atoms (int, optional): number of atoms processed at once (Default: 4096)
+
+	Yields:
+		list: [atom_i (ndarray), atom_j (ndarray), distance (ndarray)] (0-origin atom indices; atom_i != atom_j, each pair appears once)
+	"""
+	if cutoff <= 0:
+		sys.stderr.write("ERROR: cutoff must be positive ({0}).\n".format(cutoff))
+		sys.exit(1)
+
+	coordinates = np.asarray(coordinates, dtype=np.float64)
+	n_atom = len(coordinates)
+	if n_atom == 0:
+		return
+
+	# セルのキー (隣接セルの計算で折り返さないように両端に 1 セルずつ余白を設ける)
+	cell = np.floor((coordinates - coordinates.min(axis=0)) / cutoff).astype(np.int64) + 1
+	shape = cell.max(axis=0) + 2
+	key = (cell[:, 0] * shape[1] + cell[:, 1]) * shape[2] + cell[:, 2]
+	order = np.argsort(key, kind="stable")
+	sorted_key = key[order]
+	sorted_x, sorted_y, sorted_z = [np.ascontiguousarray(coordinates[order, k]) for k in range(3)]
+	cutoff2 = cutoff * cutoff
+	# 半分の隣接セル (同じセルと、辞書順で後ろの 13 セル) のみを調べ、各ペアを 1 回だけ数える
+	offsets = [(dx * shape[1] + dy) * shape[2] + dz for dx, dy, dz in itertools.product([-1, 0, 1], repeat=3) if (dx, dy, dz) >= (0, 0, 0)]
+
+	for start in range(0, n_atom, chunk_atoms):
+		end = min(start + chunk_atoms, n_atom)
+		position = np.arange(start, end)
+		for offset in offsets:
+			neighbor_key = sorted_key[start:end] + offset
+			lower = np.searchsorted(sorted_key, neighbor_key, side="left")
+			count = np.searchsorted(sorted_key, neighbor_key, side="right") - lower
+			total = int(count.sum())
+			if total == 0:
+				continue
+
+			# 各原子について、隣接セル内の原子 (ソート後の位置) を展開する
+			atom_i = np.repeat(position, count)
+			atom_j = np.arange(total) - np.repeat(np.cumsum(count) - count, count) + np.repeat(lower, count)
+			if offset == 0:
+				flag = atom_i < atom_j
+				atom_i = atom_i[flag]
+				atom_j = atom_j[flag]
+
+			# 距離の 2 乗で判定し、カットオフ内のペアのみ平方根を取る
+			distance = np.square(sorted_x[atom_i] - sorted_x[atom_j])
+			distance += np.square(sorted_y[atom_i] - sorted_y[atom_j])
+			distance += np.square(sorted_z[atom_i] - sorted_z[atom_j])
+			flag = np.flatnonzero(distance <= cutoff2)
+			yield [order[atom_i[flag]], order[atom_j[flag]], np.sqrt(distance[flag])]
+
+
+def reduce_pair_minimum(pair_idx, distance):
+	"""
+	function to take minimum distance for each packed pair index
+
+	Args:
+		pair_idx (ndarray): packed pair indices
+		distance (ndarray): distances
+
+	Returns:
+		list: [unique packed pair indices (ndarray), minimum distances (ndarray)]
+	"""
+	if len(pair_idx) == 0:
+		return [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)]
+	order = np.argsort(pair_idx, kind="stable")
+	pair_idx = pair_idx[order]
+	distance = distance[order]
+	start = np.flatnonzero(np.concatenate([[True], pair_idx[1:] != pair_idx[:-1]]))
+	return [pair_idx[start], np.minimum.reduceat(distance, start)]
+
+
+def min_distance_pairs(coordinates, atom_fragment, cutoff, chunk_atoms=CHUNK_ATOMS):
+	"""
+	function to get minimum atom-atom distances of fragment pairs within cutoff by cell list
+
+	Args:
+		coordinates (ndarray): atomic coordinates (n_atom, 3)
+		atom_fragment (ndarray): 0-origin fragment index of each atom
+		cutoff (float): cutoff distance (same unit as coordinates)
+		chunk_atoms (int, optional): number of atoms processed at once (Default: 4096)
+
+	Returns:
+		list: [packed pair indices (ndarray), minimum distances (ndarray)] (only pairs whose minimum distance is within cutoff)
+	"""
+	atom_fragment = np.asarray(atom_fragment, dtype=np.int64)
+	list_pair_idx = []
+	list_distance = []
+	for atom_i, atom_j, distance in iter_atom_pairs(coordinates, cutoff, chunk_atoms):
+		fragment_i = atom_fragment[atom_i]
+		fragment_j = atom_fragment[atom_j]
+		flag = fragment_i != fragment_j
+		pair_idx, distance = reduce_pair_minimum(pair_index(fragment_i[flag], fragment_j[flag]), distance[flag])
+		list_pair_idx.append(pair_idx)
+		list_distance.append(distance)
+
+	if len(list_pair_idx) == 0:
+		return reduce_pair_minimum(np.zeros(0, dtype=np.int64), np.zeros(0))
+	return reduce_pair_minimum(np.concatenate(list_pair_idx), np.concatenate(list_distance))
+
+
+def min_distance_packed(coordinates, atom_fragment, n_fragment, cutoff=None, fill_value=np.inf, block_size=BLOCK_SIZE, out=None):
+	"""
+	function to get minimum atom-atom distances of all fragment pairs as packed array (same order as `PairMatrix`)
+
+	Args:
+		coordinates (ndarray): atomic coordinates (n_atom, 3)
+		atom_fragment (ndarray): 0-origin fragment index of each atom
+		n_fragment (int): number of fragments
+		cutoff (float, optional): cutoff distance; pairs farther than cutoff are `fill_value` (Default: None (exact values for all pairs))
+		fill_value (float, optional): value for pairs without atoms within cutoff (Default: inf)
+		block_size (int, optional): number of atom-atom distances computed at once without cutoff (Default: 1 << 22)
+		out (ndarray, optional): output array (N(N-1)/2,) (np.memmap is also available) (Default: None (new array))
+
+	Returns:
+		ndarray: (N(N-1)/2,)
+	"""
+	coordinates = np.asarray(coordinates, dtype=np.float64)
+	atom_fragment = np.asarray(atom_fragment, dtype=np.int64)
+	if out is None:
+		packed = np.full(n_pair(n_fragment), fill_value, dtype=np.float64)
+	else:
+		packed = out
+		packed[:] = fill_value
+
+	if cutoff is not None:
+		pair_idx, distance = min_distance_pairs(coordinates, atom_fragment, cutoff)
+		packed[pair_idx] = distance
+		return packed
+
+	# カットオフなし: フラグメント順に並べた原子について、行ブロックごとに全原子との距離を計算して縮約する
+	order = np.argsort(atom_fragment, kind="stable")
+	coordinates = coordinates[order]
+	atom_fragment = atom_fragment[order]
+	fragment_list, fragment_start = np.unique(atom_fragment, return_index=True)
+	fragment_end = np.append(fragment_start[1:], len(atom_fragment))
+
+	idx = 0
+	while idx < len(fragment_list):
+		# 行ブロックのフラグメント範囲 [idx, idx_end)
+		idx_end = idx + 1
+		while idx_end < len(fragment_list) and (fragment_end[idx_end] - fragment_start[idx]) * fragment_start[idx_end] <= block_size:
+			idx_end += 1
+		n_col_atom = fragment_start[idx_end - 1]
+		if n_col_atom == 0:
+			idx = idx_end
+			continue
+
+		# 行ブロックの原子と、それより前のフラグメントの原子との距離
+		rows = coordinates[fragment_start[idx] : fragment_end[idx_end - 1]]
+		delta = rows[:, np.newaxis, :] - coordinates[np.newaxis, :n_col_atom, :]
+		distance = np.sqrt(np.einsum("ijk,ijk->ij", delta, delta))
+		col_start = fragment_start[fragment_start < n_col_atom]
+		distance = np.minimum.reduceat(distance, col_start, axis=1)
+		distance = np.minimum.reduceat(distance, fragment_start[idx:idx_end] - fragment_start[idx], axis=0)
+
+		for k in range(idx, idx_end):
+			n_col = np.count_nonzero(fragment_start < fragment_start[k])
+			if n_col != 0:
+				packed[pair_index(fragment_list[k], fragment_list[:n_col])] = distance[k - idx, :n_col]
+		idx = idx_end
+
+	return packed
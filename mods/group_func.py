@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for group reductions (e.g. atoms grouped by fragment or residue)
+"""
+
+import numpy as np
+
+
+
+# =============== function =============== #
+def group_sum(values, groups, n_group):
+	"""
+	function to sum rows of values by group (rows of each group are added in order)
+
+	Args:
+		values (ndarray): values (n_row, n_column)
+		groups (ndarray): 0-origin group index of each row (n_row)
+		n_group (int): number of groups
+
+	Returns:
+		ndarray: (n_group, n_column)
+	"""
+	values = np.asarray(values, dtype=np.float64).reshape(len(groups), -1)
+	result = np.zeros((n_group, values.shape[1]), dtype=np.float64)
+	for idx in range(values.shape[1]):
+		result[:, idx] = np.bincount(groups, weights=values[:, idx], minlength=n_group)
+	return result
+
+
+def factorize(*keys):
+	"""
+	function to number combinations of keys in order of first appearance
+
+	Args:
+		*keys (ndarray): keys of the same length (numbers or strings)
+
+	Returns:
+		list: [group index of each row (ndarray), row index of the first appearance of each group (ndarray)]
+	"""
+	n_row = len(keys[0])
+	if n_row == 0:
+		return [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)]
+
+	codes = np.column_stack([np.unique(np.asarray(key), return_inverse=True)[1].reshape(n_row) for key in keys])
+	_, first, inverse = np.unique(codes, axis=0, return_index=True, return_inverse=True)
+	inverse = inverse.reshape(n_row)
+
+	# np.unique の順 (キーの昇順) を最初に現れた順に並べ替える
+	order = np.argsort(first, kind="stable")
+	rank = np.empty_like(order)
+	rank[order] = np.arange(len(order))
+	return [rank[inverse], first[order]]
+
+
+def group_mode(groups, n_group, *keys):
+	"""
+	function to find the most frequent combination of keys in each group (ties are broken by first appearance in the group)
+
+	Args:
+		groups (ndarray): 0-origin group index of each row
+		n_group (int): number of groups
+		*keys (ndarray): keys of the same length as groups (numbers or strings)
+
+	Returns:
+		ndarray: row index of the first appearance of the most frequent combination in each group (-1 for empty group)
+	"""
+	result = np.full(n_group, -1, dtype=np.int64)
+	groups = np.asarray(groups, dtype=np.int64)
+	if len(groups) == 0:
+		return result
+
+	# (グループ, キー) の組ごとに出現数と最初に現れた行を数える
+	codes, _ = factorize(groups, *keys)
+	counts = np.bincount(codes)
+	first = np.full(len(counts), len(groups), dtype=np.int64)
+	np.minimum.at(first, codes, np.arange(len(groups)))
+	pair_group = groups[first]
+
+	# グループごとに、出現数が最大で最初に現れた組を選ぶ
+	order = np.lexsort((first, -counts, pair_group))
+	head = np.ones(len(order), dtype=bool)
+	head[1:] = pair_group[order][1:] != pair_group[order][:-1]
+	selected = order[head]
+	result[pair_group[selected]] = first[selected]
+	return result
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for input (files, standard input and pipes; readers consume input in one forward pass)
+and registry of readers (backends) chosen by type or by sniffing the head of input
+"""
+
+import sys
+import os
+import contextlib
+
+
+
+# =============== constant =============== #
+STDIN = "-"
+SNIFF_SIZE = 1 << 12
+LOG_MARKERS = [b"ABINIT-MP", b"Frag.   Elec.   ATOM"]
+
+
+
+# =============== function =============== #
+@contextlib.contextmanager
+def open_input(input_data):
+	"""
+	function to open input as binary stream (standard input and file objects given by caller are not closed)
+
+	Args:
+		input_data (str or file): file path, `-` (standard input) or file object (binary or text mode)
+
+	Yields:
+		file: binary file object
+	"""
+	if isinstance(input_data, str) and input_data != STDIN:
+		with open(input_data, "rb") as obj_input:
+			yield obj_input
+		return
+
+	obj_input = sys.stdin if input_data == STDIN else input_data
+	yield getattr(obj_input, "buffer", obj_input)
+
+
+def get_input_path(input_data):
+	"""
+	function to get path of input (`-` for standard input and streams without path)
+
+	Args:
+		input_data (str or file): file path, `-` or file object
+
+	Returns:
+		str
+	"""
+	if isinstance(input_data, str):
+		return input_data
+	name = getattr(input_data, "name", None)
+	if isinstance(name, str) and os.path.isfile(name):
+		return name
+	return STDIN
+
+
+def is_regular_file(input_data):
+	"""
+	function to check whether input is a regular file that can be reopened by path (e.g. by worker processes)
+
+	Args:
+		input_data (str or file): file path, `-` or file object
+
+	Returns:
+		bool
+	"""
+	return isinstance(input_data, str) and input_data != STDIN and os.path.isfile(input_data)
+
+
+def read_head(input_data, size=SNIFF_SIZE):
+	"""
+	function to read the head of input without consuming it (streams are peeked, or read and rewound if seekable)
+
+	Args:
+		input_data (str or file): file path, `-` or file object
+		size (int, optional): number of bytes (Default: 4096)
+
+	Returns:
+		bytes: head of input (empty if it cannot be read without consuming)
+	"""
+	if isinstance(input_data, str) and input_data != STDIN:
+		if not is_regular_file(input_data):
+			# 名前付きパイプなどは読むと消費されるため判定しない
+			return b""
+		with open(input_data, "rb") as obj_input:
+			return obj_input.read(size)
+
+	obj_input = sys.stdin if input_data == STDIN else input_data
+	obj_input = getattr(obj_input, "buffer", obj_input)
+	if hasattr(obj_input, "peek"):
+		return obj_input.peek(size)[:size]
+	if obj_input.seekable():
+		position = obj_input.tell()
+		head = obj_input.read(size)
+		obj_input.seek(position)
+		return head
+	return b""
+
+
+def sniff_cpf(head):
+	"""
+	function to check whether the first line is a header of supported CPF version
+
+	Args:
+		head (bytes): head of input
+
+	Returns:
+		bool
+	"""
+	from mods.CpfLayout import find_layout
+	line = head.split(b"\n", 1)[0].decode(errors="replace")
+	return line.startswith("CPF") and find_layout(line) is not None
+
+
+def sniff_log(head):
+	"""
+	function to check whether the head of input contains the banner of ABINIT-MP or the fragment table of .log
+
+	Args:
+		head (bytes): head of input
+
+	Returns:
+		bool
+	"""
+	return any(marker in head for marker in LOG_MARKERS)
+
+
+def load_cpf(input_data, dtype="float64", memmap_dir=None, n_process=1):
+	"""
+	function to load .cpf by text reader (`FileCpf`)
+
+	Args:
+		input_data (str or file): file path, `-` or binary file object
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (Default: None)
+		n_process (int, optional): number of processes for decoding large sections (Default: 1)
+
+	Returns:
+		FileCpf
+	"""
+	from mods.FileCpf import FileCpf
+	return FileCpf(input_data, dtype=dtype, memmap_dir=memmap_dir, n_process=n_process)
+
+
+def load_log(input_data, dtype="float64", memmap_dir=None, n_process=1):
+	"""
+	function to load .log / .out by text reader (`FileLogABINITMP`; n_process is not used)
+
+	Args:
+		input_data (str or file): file path, `-` or binary file object
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (Default: None)
+		n_process (int, optional): not used (Default: 1)
+
+	Returns:
+		FileLogABINITMP
+	"""
+	from mods.FileLogABINITMP import FileLogABINITMP
+	return FileLogABINITMP(input_data, dtype=dtype, memmap_dir=memmap_dir)
+
+
+# 読み込みクラス (バックエンド) の登録: 種類: [読み込み関数, 判定関数 (None は判定しない), 拡張子]
+READERS = {
+	"cpf": [load_cpf, sniff_cpf, [".cpf"]],
+	"log": [load_log, sniff_log, [".log", ".out"]],
+}
+
+
+def register_reader(input_type, loader, sniff=None, extensions=None):
+	"""
+	function to register reader (backend) for input type (registered readers are sniffed before the built-in ones)
+
+	Args:
+		input_type (str): name of input type (replaces existing one)
+		loader (function): function returning reader (`FMOReader`) (`loader(input_data, dtype, memmap_dir, n_process)`)
+		sniff (function, optional): function returning whether the head of input (bytes) is for this reader (Default: None (only by type or extension))
+		extensions (list, optional): file extensions (lower case, with `.`) used when no reader is found by sniffing (Default: None)
+
+	Returns:
+		None
+	"""
+	READERS.pop(input_type, None)
+	items = list(READERS.items())
+	READERS.clear()
+	READERS[input_type] = [loader, sniff, list(extensions or [])]
+	READERS.update(items)
+
+
+def get_input_types():
+	"""
+	function to get registered input types
+
+	Returns:
+		list
+	"""
+	return list(READERS)
+
+
+def get_input_type(input_data, input_type=None):
+	"""
+	function to get type of input from `input_type`, contents (sniffing the head) or extension of path (in this order)
+
+	Args:
+		input_data (str or file): file path, `-` or file object
+		input_type (str, optional): registered input type (`cpf`, `log`, ...) (Default: None (detect))
+
+	Returns:
+		str: input type (exit with error if not detected)
+	"""
+	if input_type is not None:
+		if input_type not in READERS:
+			sys.stderr.write("ERROR: undefined input type ({0}; available: {1}).\n".format(input_type, ", ".join(READERS)))
+			sys.exit(1)
+		return input_type
+
+	head = read_head(input_data)
+	for name, (_, sniff, _) in READERS.items():
+		if sniff is not None and sniff(head):
+			return name
+
+	extension = os.path.splitext(get_input_path(input_data))[1].lower()
+	for name, (_, _, extensions) in READERS.items():
+		if extension in extensions:
+			return name
+
+	sys.stderr.write("ERROR: cannot determine input type ({0}; use --type).\n".format(get_input_path(input_data)))
+	sys.exit(1)
+
+
+def open_reader(input_data, input_type=None, dtype="float64", memmap_dir=None, n_process=1):
+	"""
+	function to load input by reader for its type
+
+	Args:
+		input_data (str or file): file path (regular file, named pipe, ...), `-` or file object
+		input_type (str, optional): registered input type (Default: None (detect by `get_input_type()`))
+		dtype (str, optional): data type for interaction matrices (Default: "float64")
+		memmap_dir (str, optional): directory for disk-backed (np.memmap) matrices (Default: None)
+		n_process (int, optional): number of processes for decoding large sections (Default: 1)
+
+	Returns:
+		list: [input type (str), reader (FMOReader)]
+	"""
+	if isinstance(input_data, str) and input_data != STDIN and not is_regular_file(input_data):
+		# 名前付きパイプやプロセス置換 (/dev/fd/N) は 1 回だけ開き、判定と読み込みで同じストリームを使う
+		with open(input_data, "rb") as obj_input:
+			return open_reader(obj_input, input_type, dtype, memmap_dir, n_process)
+
+	input_type = get_input_type(input_data, input_type)
+	return [input_type, READERS[input_type][0](input_data, dtype, memmap_dir, n_process)]
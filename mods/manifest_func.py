@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for manifest of outputs (incremental re-export)
+"""
+
+import os
+import json
+import hashlib
+
+
+
+# =============== constant =============== #
+MANIFEST_SUFFIX = ".manifest.json"
+HASH_BLOCK_SIZE = 1 << 24
+
+
+
+# =============== function =============== #
+def get_manifest_path(prefix):
+	"""
+	function to get manifest path for output prefix
+
+	Args:
+		prefix (str): prefix for output
+
+	Returns:
+		str
+	"""
+	return prefix + MANIFEST_SUFFIX
+
+
+def get_file_signature(path, previous=None):
+	"""
+	function to get signature of file (hash is reused when size and mtime are unchanged from previous signature)
+
+	Args:
+		path (str): file path
+		previous (dict, optional): previous signature (Default: None)
+
+	Returns:
+		dict: {"size": int, "mtime_ns": int, "sha256": str}
+	"""
+	stat = os.stat(path)
+	signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+	if previous is not None and all(previous.get(key) == value for key, value in signature.items()) and "sha256" in previous:
+		signature["sha256"] = previous["sha256"]
+		return signature
+
+	obj_hash = hashlib.sha256()
+	with open(path, "rb") as obj_input:
+		for block in iter(lambda: obj_input.read(HASH_BLOCK_SIZE), b""):
+			obj_hash.update(block)
+	signature["sha256"] = obj_hash.hexdigest()
+	return signature
+
+
+def get_output_stat(path):
+	"""
+	function to get size and mtime of output (to detect modification after recording)
+
+	Args:
+		path (str): file path
+
+	Returns:
+		list: [size, mtime_ns] (None if the file does not exist)
+	"""
+	if not os.path.isfile(path):
+		return None
+	stat = os.stat(path)
+	return [stat.st_size, stat.st_mtime_ns]
+
+
+def load_manifest(path):
+	"""
+	function to load manifest (empty manifest if the file does not exist or is broken)
+
+	Args:
+		path (str): manifest path
+
+	Returns:
+		dict: {"input": signature of input, "outputs": {output file name: {"options": dict, "input": sha256, "output": [size, mtime_ns], "files": {file name: [size, mtime_ns]} (files written with the output, e.g. tiles)}}}
+	"""
+	manifest = {"input": None, "outputs": {}}
+	if os.path.isfile(path):
+		try:
+			with open(path, "r") as obj_input:
+				manifest.update(json.load(obj_input))
+		except (ValueError, OSError):
+			pass
+	return manifest
+
+
+def save_manifest(path, manifest):
+	"""
+	function to save manifest (replaced atomically)
+
+	Args:
+		path (str): manifest path
+		manifest (dict): manifest
+
+	Returns:
+		str: manifest path
+	"""
+	path_tmp = path + ".tmp"
+	with open(path_tmp, "w") as obj_output:
+		json.dump(manifest, obj_output, indent=1, sort_keys=True)
+	os.replace(path_tmp, path)
+	return path
+
+
+def is_current(manifest, input_signature, output, options):
+	"""
+	function to check whether output is up to date (made from the same input with the same options, and neither output nor files recorded with it are modified or removed since)
+
+	Args:
+		manifest (dict): manifest
+		input_signature (dict): signature of input (`get_file_signature()`)
+		output (str): output path
+		options (dict): options affecting output (JSON-serializable)
+
+	Returns:
+		bool
+	"""
+	entry = manifest["outputs"].get(os.path.basename(output))
+	if entry is None or entry["input"] != input_signature["sha256"] or entry["options"] != options or entry["output"] != get_output_stat(output):
+		return False
+	directory = os.path.dirname(output)
+	return all(get_output_stat(os.path.join(directory, name)) == stat for name, stat in entry.get("files", {}).items())
+
+
+def record_output(manifest, input_signature, output, options, files=None):
+	"""
+	function to record output in manifest
+
+	Args:
+		manifest (dict): manifest
+		input_signature (dict): signature of input (`get_file_signature()`)
+		output (str): output path (already written)
+		options (dict): options affecting output (JSON-serializable)
+		files (list, optional): paths of files written with output in the same directory (e.g. tiles listed in index of tiles) (Default: None)
+
+	Returns:
+		dict: manifest
+	"""
+	entry = {"input": input_signature["sha256"], "options": options, "output": get_output_stat(output)}
+	if files is not None:
+		entry["files"] = {os.path.basename(path): get_output_stat(path) for path in files}
+	manifest["input"] = input_signature
+	manifest["outputs"][os.path.basename(output)] = entry
+	return manifest
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for aggregation of many-body (trimer and tetramer) corrections of FMO3/FMO4
+"""
+
+import itertools
+import numpy as np
+
+from mods.PairMatrix import pair_index, pair_from_index
+
+
+
+# =============== constant =============== #
+# トリマー・テトラマーセクションのエネルギーのカラム (.cpf の IFIE セクションと同じ順)
+MULTIMER_COLUMNS = ["HF", "MP2", "SCS-MP2", "MP3", "SCS-MP3"]
+MULTIMER_ORDER = {"trimer": 3, "tetramer": 4}
+
+
+
+# =============== function =============== #
+def sum_multimer_pairs(terms):
+	"""
+	function to sum many-body terms over fragment pairs included in each term (each term is added to all of its pairs)
+
+	Args:
+		terms (list): [[0-origin fragment indices of terms (ndarray; (n_term, order)), energies of terms (ndarray; (n_term, n_column))], ...]
+
+	Returns:
+		list: [0-origin smaller fragment indices (ndarray), 0-origin larger fragment indices (ndarray), sums (ndarray; (n_pair, total n_column of terms))] (pairs in packed order)
+	"""
+	keys = []
+	for index, _ in terms:
+		keys.append([pair_index(index[:, a], index[:, b]) for a, b in itertools.combinations(range(index.shape[1]), 2)])
+	pair_keys = np.unique(np.concatenate([np.zeros(0, dtype=np.int64)] + [key for list_key in keys for key in list_key]))
+
+	# 項に含まれるペアごとに、ペアの位置へ足し合わせる
+	sums = np.zeros((len(pair_keys), sum([energies.shape[1] for _, energies in terms])))
+	offset = 0
+	for (_, energies), list_key in zip(terms, keys):
+		for key in list_key:
+			position = np.searchsorted(pair_keys, key)
+			for c in range(energies.shape[1]):
+				sums[:, offset + c] += np.bincount(position, weights=energies[:, c], minlength=len(pair_keys))
+		offset += energies.shape[1]
+	rows, cols = pair_from_index(pair_keys)
+	return [rows, cols, sums]
+
+
+def sum_multimer_fragments(terms, n_fragment):
+	"""
+	function to sum many-body terms over fragments included in each term (each term is added to all of its fragments)
+
+	Args:
+		terms (list): [[0-origin fragment indices of terms (ndarray; (n_term, order)), energies of terms (ndarray; (n_term, n_column))], ...]
+		n_fragment (int): number of fragments
+
+	Returns:
+		ndarray: sums (n_fragment, total n_column of terms)
+	"""
+	sums = np.zeros((n_fragment, sum([energies.shape[1] for _, energies in terms])))
+	offset = 0
+	for index, energies in terms:
+		for a in range(index.shape[1]):
+			for c in range(energies.shape[1]):
+				sums[:, offset + c] += np.bincount(index[:, a], weights=energies[:, c], minlength=n_fragment)
+		offset += energies.shape[1]
+	return sums
+
+
+def select_multimer_terms(index, selected):
+	"""
+	function to get terms including at least one of selected fragments
+
+	Args:
+		index (ndarray): 0-origin fragment indices of terms (n_term, order)
+		selected (ndarray): flags of selected fragments (n_fragment; bool)
+
+	Returns:
+		ndarray: 0-origin term indices
+	"""
+	return np.flatnonzero(np.any(selected[index], axis=1))
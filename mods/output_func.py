@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for output
+"""
+
+import sys
+import numpy as np
+
+
+
+# =============== constant =============== #
+DIGIT = 4
+SEPARATOR = {
+	"csv": ",",
+	"tsv": "\t",
+}
+BLOCK_SIZE = 1 << 20
+
+
+
+# =============== function =============== #
+def format_fixed_point(values, row_labels, digit=DIGIT, separator=",", trim_zeros=True):
+	"""
+	function to format rounded matrix rows to fixed-point text by vectorized byte operations
+
+	Args:
+		values (ndarray): rounded matrix block (n_row, n_col); all values must be finite and smaller than 10^(15 - digit)
+		row_labels (list): labels at the head of rows
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+
+	Returns:
+		str: formatted rows (each row ends with "\n")
+	"""
+	n_row, n_col = values.shape
+	n_frac = max(digit, 1) if trim_zeros else digit
+
+	# 固定小数点の整数に変換する
+	scaled = np.abs(np.rint(values * 10.0 ** n_frac).astype(np.int64))
+	int_part = scaled // (10 ** n_frac)
+	frac_part = scaled % (10 ** n_frac)
+	n_int = len(str(int(int_part.max()))) if values.size > 0 else 1
+
+	# 1 要素を固定幅のバイト列 ([区切り文字][符号][整数部][.][小数部]) とし、空き部分は 0 で埋める
+	separator = np.frombuffer(separator.encode(), dtype=np.uint8)
+	width = len(separator) + 1 + n_int + (1 + n_frac if n_frac > 0 else 0)
+	field = np.zeros((n_row, n_col, width), dtype=np.uint8)
+	field[:, :, :len(separator)] = separator
+	pos = len(separator)
+	field[:, :, pos] = np.where(np.signbit(values), ord("-"), 0)
+
+	# 整数部 (下の桁から; 最上位より上の桁は 0 埋め)
+	remain = int_part
+	for m in range(n_int):
+		mask = remain > 0 if m > 0 else True
+		remain, value = np.divmod(remain, 10)
+		field[:, :, pos + n_int - m] = (value.astype(np.uint8) + ord("0")) * mask
+	pos += n_int + 1
+
+	# 小数部 (下の桁から; trim_zeros の場合は末尾の 0 を 0 埋め)
+	if n_frac > 0:
+		field[:, :, pos] = ord(".")
+		remain = frac_part
+		nonzero = np.zeros(frac_part.shape, dtype=bool)
+		for m in range(n_frac - 1, -1, -1):
+			remain, value = np.divmod(remain, 10)
+			mask = True
+			if trim_zeros and m > 0:
+				nonzero |= value != 0
+				mask = nonzero
+			field[:, :, pos + 1 + m] = (value.astype(np.uint8) + ord("0")) * mask
+
+	labels = np.array([str(v).encode() for v in row_labels], dtype=bytes)
+	labels = labels.view(np.uint8).reshape(n_row, -1)
+	newline = np.full((n_row, 1), ord("\n"), dtype=np.uint8)
+	text = np.concatenate([labels, field.reshape(n_row, n_col * width), newline], axis=1).ravel()
+	return text[text != 0].tobytes().decode()
+
+
+def format_rows(values, row_labels, digit=DIGIT, separator=",", trim_zeros=True):
+	"""
+	function to format matrix rows to text in bulk
+
+	Args:
+		values (ndarray): matrix block (n_row, n_col)
+		row_labels (list): labels at the head of rows
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+
+	Returns:
+		str: formatted rows (each row ends with "\n")
+	"""
+	values = np.round(np.asarray(values, dtype=np.float64), digit)
+	if len(row_labels) == 0:
+		return ""
+
+	magnitude = np.abs(values)
+	if not np.isfinite(values).all() or (values.size > 0 and magnitude.max() >= 10.0 ** (15 - digit)) or (trim_zeros and digit > 4 and np.any((0 < magnitude) & (magnitude < 1e-4))):
+		# 固定小数点にできない値や、repr() が指数表記になる値を含む場合
+		if trim_zeros:
+			return "".join([separator.join([str(label)] + [repr(v) for v in row]) + "\n" for label, row in zip(row_labels, values.tolist())])
+		else:
+			row_format = "%s" + ("{0}%.{1}f".format(separator.replace("%", "%%"), digit) * values.shape[1]) + "\n"
+			return "".join([row_format % ((label,) + tuple(row)) for label, row in zip(row_labels, values.tolist())])
+
+	return format_fixed_point(values, row_labels, digit, separator, trim_zeros)
+
+
+def write_matrix(obj_output, labels, index, get_block, digit=DIGIT, separator=",", trim_zeros=True, block_size=BLOCK_SIZE, col_labels=None):
+	"""
+	function to write labeled square matrix (or rectangular block of it) by row blocks
+
+	Args:
+		obj_output (file): output file object
+		labels (list): labels for rows (and columns if `col_labels` is None)
+		index (ndarray): 0-origin fragment indices corresponding to labels
+		get_block (function): function returning matrix block (float64) for given row indices (`get_block(rows)`)
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+		block_size (int, optional): number of matrix elements per block (Default: 1 << 20)
+		col_labels (list, optional): labels for columns (Default: None (same as labels))
+
+	Returns:
+		None
+	"""
+	index = np.asarray(index, dtype=np.int64)
+	if col_labels is None:
+		col_labels = labels
+	obj_output.write(separator.join([""] + [str(v) for v in col_labels]) + "\n")
+
+	n_row = max(1, block_size // max(1, len(col_labels)))
+	for start in range(0, len(index), n_row):
+		rows = index[start : start + n_row]
+		obj_output.write(format_rows(get_block(rows), labels[start : start + n_row], digit, separator, trim_zeros))
+
+
+def write_matrices(obj_outputs, labels, index, get_blocks, digit=DIGIT, separator=",", trim_zeros=True, block_size=BLOCK_SIZE):
+	"""
+	function to write several labeled square matrices of the same fragments to each file by row blocks in one pass
+
+	Args:
+		obj_outputs (list): output file objects (one for each matrix)
+		labels (list): labels for rows and columns
+		index (ndarray): 0-origin fragment indices corresponding to labels
+		get_blocks (function): function returning matrix blocks (float64; (n_matrix, n_block, n_col)) for given row indices (`get_blocks(rows)`)
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+		block_size (int, optional): number of matrix elements per block (Default: 1 << 20)
+
+	Returns:
+		None
+	"""
+	index = np.asarray(index, dtype=np.int64)
+	header = separator.join([""] + [str(v) for v in labels]) + "\n"
+	for obj_output in obj_outputs:
+		obj_output.write(header)
+
+	n_row = max(1, block_size // max(1, len(index) * len(obj_outputs)))
+	for start in range(0, len(index), n_row):
+		rows = index[start : start + n_row]
+		for obj_output, block in zip(obj_outputs, get_blocks(rows)):
+			obj_output.write(format_rows(block, labels[start : start + n_row], digit, separator, trim_zeros))
+
+
+def write_pairs(obj_output, header, labels, rows, cols, get_values, digit=DIGIT, separator=",", trim_zeros=True, block_size=BLOCK_SIZE):
+	"""
+	function to write values of fragment pairs as list (`I, J, value`) by blocks
+
+	Args:
+		obj_output (file): output file object
+		header (list): column names
+		labels (list): labels for all fragments
+		rows (ndarray): 0-origin fragment indices I
+		cols (ndarray): 0-origin fragment indices J
+		get_values (function): function returning values (float64) for given block of pairs (`get_values(start, end)`)
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+		block_size (int, optional): number of pairs per block (Default: 1 << 20)
+
+	Returns:
+		None
+	"""
+	obj_output.write(separator.join(header) + "\n")
+	for start in range(0, len(rows), block_size):
+		end = min(start + block_size, len(rows))
+		row_labels = ["{0}{1}{2}".format(labels[i], separator, labels[j]) for i, j in zip(rows[start:end].tolist(), cols[start:end].tolist())]
+		values = np.asarray(get_values(start, end), dtype=np.float64).reshape(-1, 1)
+		obj_output.write(format_rows(values, row_labels, digit, separator, trim_zeros))
+
+
+def write_terms(obj_output, header, labels, index, get_values, digit=DIGIT, separator=",", trim_zeros=True, block_size=BLOCK_SIZE):
+	"""
+	function to write values of fragment combinations as list (`I, J, ..., values`) by blocks
+
+	Args:
+		obj_output (file): output file object
+		header (list): column names
+		labels (list): labels for all fragments
+		index (ndarray): 0-origin fragment indices of combinations (n_row, n_fragment_column)
+		get_values (function): function returning values (float64; (n_block, n_column)) for given block of rows (`get_values(start, end)`)
+		digit (int, optional): number of decimal places (Default: 4)
+		separator (str, optional): separator (Default: ",")
+		trim_zeros (bool, optional): trim trailing zeros as `repr()` of rounded float (Default: True)
+		block_size (int, optional): number of rows per block (Default: 1 << 20)
+
+	Returns:
+		None
+	"""
+	obj_output.write(separator.join(header) + "\n")
+	labels = [str(v) for v in labels]
+	for start in range(0, len(index), block_size):
+		end = min(start + block_size, len(index))
+		row_labels = [separator.join([labels[i] for i in row]) for row in index[start:end].tolist()]
+		values = np.asarray(get_values(start, end), dtype=np.float64).reshape(end - start, -1)
+		obj_output.write(format_rows(values, row_labels, digit, separator, trim_zeros))
+
+
+def open_output(output, compression=None, executor=None):
+	"""
+	function to open output text file (compressed on the fly if `compression` is specified)
+
+	Args:
+		output (str): output file path
+		compression (str, optional): `gzip` or `xz` (Default: None)
+		executor (concurrent.futures.Executor, optional): thread pool for compressing blocks in parallel (Default: None)
+
+	Returns:
+		file or CompressedWriter
+	"""
+	if compression is None:
+		return open(output, "w")
+	from mods.CompressedWriter import CompressedWriter
+	return CompressedWriter(output, compression, executor)
+
+
+def get_output_index(labels, output_range=None):
+	"""
+	function to get 0-origin indices of labels in output range (in order of labels)
+
+	Args:
+		labels (list): all labels
+		output_range (list, optional): labels for output (Default: None (all))
+
+	Returns:
+		ndarray
+	"""
+	if output_range is None:
+		return np.arange(len(labels))
+	output_range = set(output_range)
+	return np.array([idx for idx, label in enumerate(labels) if label in output_range], dtype=np.int64)
+
+
+def check_digit(digit):
+	"""
+	function to check number of decimal places
+
+	Args:
+		digit (int): number of decimal places
+
+	Returns:
+		int
+	"""
+	if digit < 0:
+		sys.stderr.write("ERROR: number of decimal places must be a non-negative integer ({0}).\n".format(digit))
+		sys.exit(1)
+	return digit
+
+
+def get_separator(output_format):
+	"""
+	function to get separator for output format
+
+	Args:
+		output_format (str): `csv` or `tsv`
+
+	Returns:
+		str
+	"""
+	if output_format not in SEPARATOR:
+		sys.stderr.write("ERROR: undefined output format ({0}).\n".format(output_format))
+		sys.exit(1)
+	return SEPARATOR[output_format]
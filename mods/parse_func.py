@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for parsing
+"""
+
+import numpy as np
+
+
+
+# =============== function =============== #
+def decode_lines(lines, columns):
+	"""
+	function to decode fixed-width lines at once
+
+	Args:
+		lines (list or ndarray): lines (bytes), or byte table of fixed-length lines (uint8; (n_line, line_length))
+		columns (list): [[start(int), end(int), dtype], ...]
+
+	Returns:
+		list: [ndarray, ...]
+	"""
+	if len(lines) == 0:
+		return [np.zeros(0, dtype=dtype) for _, _, dtype in columns]
+
+	if isinstance(lines, np.ndarray):
+		table = lines
+	else:
+		table = np.array(lines, dtype=bytes)
+		width = max([table.itemsize] + [pos_end for _, pos_end, _ in columns])
+		if width > table.itemsize:
+			# 短い行は 0 埋めして列の範囲を確保する
+			table = table.astype("S{0}".format(width))
+		table = table.view(np.uint8).reshape(len(lines), width)
+	values = []
+	for pos_start, pos_end, dtype in columns:
+		column = np.ascontiguousarray(table[:, pos_start : pos_end])
+		values.append(column.view("S{0}".format(column.shape[1])).ravel().astype(dtype))
+	return values
+
+
+def decode_fixed_width(body, columns):
+	"""
+	function to decode fixed-width rows at once
+
+	Args:
+		body (bytes): rows
+		columns (list): [[start(int), end(int), dtype], ...]
+
+	Returns:
+		list: [ndarray, ...]
+	"""
+	lines = body.split(b"\n")
+	if len(lines[-1]) == 0:
+		lines = lines[:-1]
+	return decode_lines(lines, columns)
+
+
+def read_fixed_length(obj_input, offset, line_length, n_line):
+	"""
+	function to read fixed-length lines as byte table
+
+	Args:
+		obj_input (file): file object (binary mode)
+		offset (int): byte offset of the first line
+		line_length (int): length of each line including newline
+		n_line (int): number of lines
+
+	Returns:
+		ndarray: byte table (uint8; (n_line, line_length)), or None if lines are not fixed-length
+	"""
+	obj_input.seek(offset)
+	body = obj_input.read(line_length * n_line)
+	if len(body) != line_length * n_line:
+		return None
+	table = np.frombuffer(body, dtype=np.uint8).reshape(n_line, line_length)
+	newline = table == ord("\n")
+	if not newline[:, -1].all() or newline[:, :-1].any():
+		return None
+	return table
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for SQLite export
+"""
+
+import os
+import sqlite3
+import numpy as np
+
+
+
+# =============== constant =============== #
+BLOCK_SIZE = 1 << 16
+SQL_TYPE = [
+	[bool, "INTEGER"],
+	[int, "INTEGER"],
+	[float, "REAL"],
+	[str, "TEXT"],
+]
+
+
+
+# =============== function =============== #
+def quote_identifier(name):
+	"""
+	function to quote SQL identifier (column names such as `HF-ES` contain symbols)
+
+	Args:
+		name (str): identifier
+
+	Returns:
+		str
+	"""
+	return "\"{0}\"".format(name.replace("\"", "\"\""))
+
+
+def get_column_types(rows, n_column):
+	"""
+	function to determine SQL types of columns from the first non-null values
+
+	Args:
+		rows (list): [[value, ...], ...]
+		n_column (int): number of columns
+
+	Returns:
+		list: SQL types
+	"""
+	types = [None] * n_column
+	for row in rows:
+		for idx, value in enumerate(row):
+			if types[idx] is None and value is not None:
+				types[idx] = "REAL"
+				for python_type, sql_type in SQL_TYPE:
+					if isinstance(value, python_type):
+						types[idx] = sql_type
+						break
+		if None not in types:
+			break
+	return [v if v is not None else "REAL" for v in types]
+
+
+def create_table(connection, table, columns, rows, primary_key=None):
+	"""
+	function to create table and insert rows at once
+
+	Args:
+		connection (sqlite3.Connection): database
+		table (str): table name
+		columns (list): column names
+		rows (list): [[value, ...], ...]
+		primary_key (str, optional): column name of primary key (Default: None)
+
+	Returns:
+		None
+	"""
+	definitions = []
+	for column, sql_type in zip(columns, get_column_types(rows, len(columns))):
+		definition = "{0} {1}".format(quote_identifier(column), sql_type)
+		if column == primary_key:
+			definition += " PRIMARY KEY"
+		definitions.append(definition)
+	connection.execute("CREATE TABLE {0} ({1})".format(table, ", ".join(definitions)))
+	connection.executemany("INSERT INTO {0} VALUES ({1})".format(table, ", ".join(["?"] * len(columns))), rows)
+
+
+def export_sqlite(data_FMO, output, index=None, cutoff=None, block_size=BLOCK_SIZE):
+	"""
+	function to export fragments, atoms and fragment pair interactions to SQLite database
+
+	Tables:
+		fragments: one row per fragment (`fragment` is fragment number; index on `chain` if exists)
+		atoms: one row per atom (index on `FragmentNumber`)
+		pairs: one row per fragment pair (`i`, `j`: fragment numbers (i appears first); `distance`: minimum distance (Å); values of `get_pair_table()` of the reader) (indices on (i, j), j and distance)
+
+	Args:
+		data_FMO (FileCpf or FileLogABINITMP): loaded data
+		output (str): database file path (existing file is replaced)
+		index (ndarray, optional): 0-origin fragment indices for output (Default: None (all fragments))
+		cutoff (float, optional): output only fragment pairs within cutoff (Å) (Default: None (all pairs))
+		block_size (int, optional): number of pairs inserted at once (Default: 1 << 16)
+
+	Returns:
+		str: database file path
+	"""
+	labels = np.array(data_FMO.get_label())
+	neighbor_list = data_FMO.get_neighbor_list(cutoff)
+	if index is not None:
+		neighbor_list = neighbor_list.select(index)
+
+	if os.path.exists(output):
+		os.remove(output)
+	connection = sqlite3.connect(output)
+	try:
+		# 作成中のデータベースは破棄してよいため、ジャーナルと同期を省く
+		connection.execute("PRAGMA journal_mode = OFF")
+		connection.execute("PRAGMA synchronous = OFF")
+		with connection:
+			columns, rows = data_FMO.get_fragment_table(index)
+			create_table(connection, "fragments", columns, rows, primary_key="fragment")
+			if "chain" in columns:
+				connection.execute("CREATE INDEX fragments_chain ON fragments (chain)")
+
+			columns, rows = data_FMO.get_atom_table(index)
+			create_table(connection, "atoms", columns, rows)
+			if "FragmentNumber" in columns:
+				connection.execute("CREATE INDEX atoms_fragment ON atoms (FragmentNumber)")
+
+			# ペアは行ブロックごとにまとめて挿入し、インデックスは挿入後に作成する
+			columns, _ = data_FMO.get_pair_table(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+			definitions = ["i INTEGER", "j INTEGER", "distance REAL"] + ["{0} {1}".format(quote_identifier(column), "INTEGER" if column == "connected" else "REAL") for column in columns]
+			connection.execute("CREATE TABLE pairs ({0})".format(", ".join(definitions)))
+			sql_insert = "INSERT INTO pairs VALUES ({0})".format(", ".join(["?"] * (len(columns) + 3)))
+			for start in range(0, len(neighbor_list), block_size):
+				rows = neighbor_list.rows[start : start + block_size]
+				cols = neighbor_list.cols[start : start + block_size]
+				_, values = data_FMO.get_pair_table(rows, cols)
+				values = [labels[rows].tolist(), labels[cols].tolist(), neighbor_list.distances[start : start + block_size].tolist()] + [v.tolist() for v in values]
+				connection.executemany(sql_insert, zip(*values))
+			connection.execute("CREATE INDEX pairs_ij ON pairs (i, j)")
+			connection.execute("CREATE INDEX pairs_j ON pairs (j)")
+			connection.execute("CREATE INDEX pairs_distance ON pairs (distance)")
+	finally:
+		connection.close()
+	return output
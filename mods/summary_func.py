@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for per-fragment summary of interactions
+"""
+
+import numpy as np
+
+
+
+# =============== constant =============== #
+SUMMARY_CUTOFF = 4.0
+SUMMARY_ENERGY_TYPES = ["Total", "ES", "EX", "CT", "DI"]
+BLOCK_SIZE = 1 << 22
+
+
+
+# =============== function =============== #
+def summarize_fragments(data_FMO, index=None, cutoff=SUMMARY_CUTOFF, block_size=BLOCK_SIZE):
+	"""
+	function to summarize interactions of each fragment with all other fragments of the system by row blocks
+	(sums of energies, number of contacts within cutoff, the most attractive partner (Total) and net transferred charge (sum of Q))
+
+	Args:
+		data_FMO (FileCpf or FileLogABINITMP): loaded data
+		index (ndarray, optional): 0-origin fragment indices of rows (Default: None (all fragments))
+		cutoff (float, optional): cutoff distance for contacts (Å) (Default: 4.0)
+		block_size (int, optional): number of matrix elements per block (Default: 1 << 22)
+
+	Returns:
+		list: [header (list), rows ([[value, ...], ...])]
+	"""
+	labels = data_FMO.get_label()
+	n_fragment = len(labels)
+	if index is None:
+		index = np.arange(n_fragment)
+	index = np.asarray(index, dtype=np.int64)
+	cols = np.arange(n_fragment)
+
+	# フラグメントのラベル (.cpf では残基名・鎖)
+	columns, fragment_rows = data_FMO.get_fragment_table(index)
+	label_columns = [[name, columns.index(column)] for name, column in [["Residue", "name"], ["Chain", "chain"]] if column in columns]
+	header = ["Fragment"] + [name for name, _ in label_columns]
+	table = [[row[0]] + [row[idx] for _, idx in label_columns] for row in fragment_rows]
+
+	energy_types = [energy_type for energy_type in SUMMARY_ENERGY_TYPES if data_FMO.has_energy_type(energy_type)]
+	contact_name = "Contacts (<= {0} A)".format(cutoff)
+	value_header = energy_types + [contact_name]
+	if "Total" in energy_types:
+		value_header += ["Strongest partner", "Strongest Total"]
+	if data_FMO.has_energy_type("Q"):
+		value_header += ["Net transferred charge"]
+	if len(index) == 0:
+		return [header + value_header, []]
+
+	# 行ブロックごとに、各エネルギーの行を一度だけ展開してまとめて縮約する
+	contacts = data_FMO.get_neighbor_list(cutoff).count()
+	results = {name: [] for name in value_header}
+	n_row = max(1, block_size // max(1, n_fragment))
+	for start in range(0, len(index), n_row):
+		rows = index[start : start + n_row]
+		diagonal = (np.arange(len(rows)), rows)
+		for energy_type in energy_types:
+			matrix = data_FMO.get_energy_matrix(energy_type, rows, cols)
+			results[energy_type].append(matrix.sum(axis=1))
+			if energy_type == "Total":
+				# 最も安定化する (Total が最小の) 相手
+				matrix[diagonal] = np.inf
+				partner = np.argmin(matrix, axis=1)
+				results["Strongest partner"].append(partner)
+				results["Strongest Total"].append(matrix[np.arange(len(rows)), partner])
+		results[contact_name].append(contacts[rows])
+		if "Net transferred charge" in results:
+			results["Net transferred charge"].append(data_FMO.get_energy_matrix("Q", rows, cols).sum(axis=1))
+
+	values = [np.concatenate(results[name]).tolist() for name in value_header]
+	if "Total" in energy_types:
+		partner_idx = value_header.index("Strongest partner")
+		if n_fragment > 1:
+			values[partner_idx] = [labels[j] for j in values[partner_idx]]
+		else:
+			# 相手のフラグメントがない場合
+			values[partner_idx] = [None] * len(index)
+			values[partner_idx + 1] = [None] * len(index)
+	return [header + value_header, [row + list(value) for row, value in zip(table, zip(*values))]]
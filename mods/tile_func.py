@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+functions for tiled output of matrices (each block of fragment groups is written to its own file)
+"""
+
+import sys
+import json
+import numpy as np
+
+from mods.group_func import factorize
+
+
+
+# =============== constant =============== #
+TILE_BY_CHAIN = "chain"
+TILE_INDEX_SUFFIX = "_tiles.json"
+
+
+
+# =============== function =============== #
+def check_tile(tile):
+	"""
+	function to check specification of tiles
+
+	Args:
+		tile (str): `chain` or number of fragments per tile (N)
+
+	Returns:
+		str or int: `chain` or N
+	"""
+	if tile == TILE_BY_CHAIN:
+		return tile
+	try:
+		n_fragment = int(tile)
+	except (TypeError, ValueError):
+		n_fragment = 0
+	if n_fragment <= 0:
+		sys.stderr.write("ERROR: invalid tile specification ({0}; `chain` or positive number of fragments).\n".format(tile))
+		sys.exit(1)
+	return n_fragment
+
+
+def get_tile_groups(data_FMO, index, tile):
+	"""
+	function to divide output fragments into groups for rows and columns of tiles
+
+	Args:
+		data_FMO (FileCpf or FileLogABINITMP): loaded data
+		index (ndarray): 0-origin indices of output fragments
+		tile (str or int): `chain` (groups of chains in order of first appearance; only .cpf) or number of fragments per group
+
+	Returns:
+		list: [[group name (str), positions in `index` (ndarray)], ...]
+	"""
+	tile = check_tile(tile)
+	index = np.asarray(index, dtype=np.int64)
+	if tile != TILE_BY_CHAIN:
+		return [[str(k + 1), np.arange(start, min(start + tile, len(index)))] for k, start in enumerate(range(0, len(index), tile))]
+
+	columns, rows = data_FMO.get_fragment_table(index)
+	if "chain" not in columns:
+		sys.stderr.write("ERROR: tiles by chain are only available for .cpf.\n")
+		sys.exit(1)
+	chains = np.array([str(row[columns.index("chain")]).strip() for row in rows], dtype=str)
+	codes, first = factorize(chains)
+	return [[chains[first[k]], np.flatnonzero(codes == k)] for k in range(len(first))]
+
+
+def create_tile_index(output_type, output_name, tile, labels, groups, tile_files):
+	"""
+	function to create index of tiles (label ranges of groups and file of each tile)
+
+	Args:
+		output_type (str): output type
+		output_name (str): name of output
+		tile (str or int): specification of tiles
+		labels (list): labels of output fragments
+		groups (list): groups from `get_tile_groups()`
+		tile_files (dict): {(row group, column group) (0-origin): file name}
+
+	Returns:
+		dict
+	"""
+	list_group = []
+	for k, (name, positions) in enumerate(groups):
+		group_labels = [labels[p] for p in positions.tolist()]
+		list_group.append({"group": k + 1, "name": name, "n_fragment": len(group_labels), "first": group_labels[0], "last": group_labels[-1], "fragments": group_labels})
+	list_tile = []
+	for (row, col), tile_file in sorted(tile_files.items()):
+		list_tile.append({"row": row + 1, "col": col + 1, "file": tile_file, "rows": [list_group[row]["first"], list_group[row]["last"]], "cols": [list_group[col]["first"], list_group[col]["last"]]})
+	return {"type": output_type, "name": output_name, "tile": tile, "groups": list_group, "tiles": list_tile}
+
+
+def save_tile_index(path, tile_index):
+	"""
+	function to save index of tiles as JSON
+
+	Args:
+		path (str): output path
+		tile_index (dict): index from `create_tile_index()`
+
+	Returns:
+		str: output path
+	"""
+	with open(path, "w") as obj_output:
+		json.dump(tile_index, obj_output, indent=1)
+	return path